@@ -1,11 +1,42 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ValidationError
+from typing import AsyncIterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import os
 import re
 from datetime import datetime
 
+from keyword_matcher import KeywordMatch, KeywordMatcher
+from hotspots import HotspotAggregator
+from near_duplicate import NearDuplicateIndex
+from result_cache import ResultCache
+from semantic_classifier import SemanticCrisisClassifier
+
 app = FastAPI(title="Claim Extractor - Mumbai Misinformation Detection")
 
+# Worker processes for /extract/batch (CPU-bound regex work stays off the event loop)
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+MAX_BATCH_SIZE = int(os.getenv("EXTRACT_MAX_BATCH_SIZE", "1000"))
+# /extract/stream limits: longest accepted NDJSON line, and chunks in flight on the pool
+STREAM_MAX_LINE_BYTES = int(os.getenv("EXTRACT_STREAM_MAX_LINE_BYTES", str(1 << 20)))
+STREAM_MAX_CHUNK_ITEMS = 32
+STREAM_MAX_IN_FLIGHT = EXTRACT_WORKERS * 2
+
+# Recently seen claims, so forwarded copies of the same rumour share a cluster
+NEAR_DUPLICATES = NearDuplicateIndex(
+    threshold=float(os.getenv("NEAR_DUP_THRESHOLD", "0.6")),
+    max_entries=int(os.getenv("NEAR_DUP_MAX_ENTRIES", "50000")),
+    ttl_seconds=float(os.getenv("NEAR_DUP_TTL_SECONDS", "86400")),
+)
+
 # Mumbai-specific keywords and patterns
 MUMBAI_LOCATIONS = [
     'mumbai', 'bandra', 'andheri', 'dadar', 'kurla', 'thane', 'borivali', 'malad',
@@ -17,14 +48,19 @@ MUMBAI_LOCATIONS = [
     'western line', 'central line', 'harbour line', 'local train', 'best bus'
 ]
 
+# Keywords match whole words only, so inflected forms are listed explicitly
 CRISIS_KEYWORDS = {
-    'flood': ['flood', 'flooded', 'waterlog', 'submerge', 'drowning', 'rain', 'heavy rain', 'pani'],
-    'accident': ['accident', 'crash', 'collision', 'derail', 'injured', 'dead', 'death', 'killed'],
-    'fire': ['fire', 'blaze', 'burning', 'smoke', 'explosion', 'blast'],
-    'riot': ['riot', 'violence', 'protest', 'bandh', 'strike', 'mob', 'clash'],
+    'flood': ['flood', 'floods', 'flooded', 'flooding', 'waterlog', 'waterlogged', 'waterlogging',
+              'submerge', 'submerged', 'drowning', 'rain', 'rains', 'raining', 'rainfall',
+              'heavy rain', 'pani'],
+    'accident': ['accident', 'accidents', 'crash', 'crashed', 'collision', 'derail', 'derailed',
+                 'derailment', 'injured', 'dead', 'death', 'deaths', 'killed'],
+    'fire': ['fire', 'fires', 'blaze', 'burning', 'smoke', 'explosion', 'blast'],
+    'riot': ['riot', 'riots', 'violence', 'protest', 'protests', 'bandh', 'strike', 'mob', 'clash', 'clashes'],
     'health': ['epidemic', 'outbreak', 'virus', 'disease', 'hospital', 'cases', 'infected'],
-    'traffic': ['traffic', 'jam', 'congestion', 'blocked', 'diverted', 'closed'],
-    'infrastructure': ['bridge', 'building', 'collapse', 'crack', 'damage', 'repair']
+    'traffic': ['traffic', 'jam', 'jammed', 'congestion', 'blocked', 'diverted', 'closed'],
+    'infrastructure': ['bridge', 'building', 'collapse', 'collapsed', 'crack', 'cracks', 'damage',
+                       'damaged', 'repair']
 }
 
 MISINFORMATION_INDICATORS = [
@@ -45,6 +81,36 @@ MISINFORMATION_INDICATORS = [
 
 OFFICIAL_SOURCES = ['bmc', 'mumbai police', 'indian railways', 'mcgm', 'best', 'mhada', 'msrtc']
 
+# Sliding-window claim counts per area for the live map
+HOTSPOTS = HotspotAggregator(
+    window_seconds=float(os.getenv("HOTSPOT_WINDOW_SECONDS", "3600")),
+    bucket_seconds=float(os.getenv("HOTSPOT_BUCKET_SECONDS", "60")),
+)
+
+# Extraction results keyed by content, so exact forwards skip the CPU work
+RESULT_CACHE = ResultCache(
+    max_entries=int(os.getenv("EXTRACT_CACHE_SIZE", "10000")),
+    ttl_seconds=float(os.getenv("EXTRACT_CACHE_TTL_SECONDS", "3600")),
+)
+
+# Optional embedding tier on top of CRISIS_KEYWORDS; off unless SEMANTIC_CLASSIFIER=on.
+# The model is only loaded on first use, and keywords remain the fallback.
+SEMANTIC_ENABLED = os.getenv("SEMANTIC_CLASSIFIER", "off").lower() in ("on", "true", "1")
+SEMANTIC = SemanticCrisisClassifier(
+    prototypes={t: f"{t}: " + ", ".join(kws) for t, kws in CRISIS_KEYWORDS.items()},
+    model_name=os.getenv("SEMANTIC_MODEL", "sentence-transformers/all-MiniLM-L6-v2"),
+    threshold=float(os.getenv("SEMANTIC_THRESHOLD", "0.45")),
+    max_batch_size=int(os.getenv("SEMANTIC_MAX_BATCH_SIZE", "32")),
+    max_wait_ms=float(os.getenv("SEMANTIC_MAX_WAIT_MS", "10")),
+)
+
+# All gazetteers compiled once into a single matcher, scanned once per text
+GAZETTEER = KeywordMatcher()
+GAZETTEER.add_all(MUMBAI_LOCATIONS, kind="location")
+for _crisis_type, _keywords in CRISIS_KEYWORDS.items():
+    GAZETTEER.add_all(_keywords, kind="crisis", label=_crisis_type)
+GAZETTEER.add_all(OFFICIAL_SOURCES, kind="official_source")
+
 class ExtractRequest(BaseModel):
     text: str
     media: List[str] = []
@@ -54,6 +120,16 @@ class ClaimEntity(BaseModel):
     type: str
     value: str
     confidence: float
+    start: Optional[int] = None  # span of the first occurrence in original_text
+    end: Optional[int] = None
+
+class BatchExtractRequest(BaseModel):
+    items: List[ExtractRequest]
+
+class NearestClaim(BaseModel):
+    text: str
+    similarity: float
+    first_seen: str
 
 class ExtractedClaim(BaseModel):
     original_text: str
@@ -66,15 +142,26 @@ class ExtractedClaim(BaseModel):
     priority_score: int
     requires_verification: bool
     extraction_timestamp: str
+    cluster_id: Optional[str] = None
+    nearest_claim: Optional[NearestClaim] = None
 
-def extract_locations(text: str) -> List[str]:
+def find_gazetteer_matches(text: str) -> List[KeywordMatch]:
+    """Find locations, crisis keywords and official sources in one pass"""
+    return GAZETTEER.find_all(text)
+
+def first_match_spans(matches: List[KeywordMatch], kind: str) -> dict:
+    """Map each label of the given kind to the span of its first occurrence"""
+    spans = {}
+    for m in matches:
+        if m.kind == kind and m.label not in spans:
+            spans[m.label] = (m.start, m.end)
+    return spans
+
+def extract_locations(text: str, matches: Optional[List[KeywordMatch]] = None) -> List[str]:
     """Extract Mumbai-specific locations from text"""
-    text_lower = text.lower()
-    found = []
-    for loc in MUMBAI_LOCATIONS:
-        if loc in text_lower:
-            found.append(loc.title())
-    return list(set(found))
+    if matches is None:
+        matches = find_gazetteer_matches(text)
+    return [loc.title() for loc in first_match_spans(matches, "location")]
 
 def extract_numbers(text: str) -> List[str]:
     """Extract significant numbers (casualties, measurements, etc.)"""
@@ -91,19 +178,20 @@ def extract_numbers(text: str) -> List[str]:
         numbers.extend(matches)
     return numbers
 
-def identify_crisis_types(text: str) -> List[str]:
+def identify_crisis_types(text: str, matches: Optional[List[KeywordMatch]] = None) -> List[str]:
     """Identify the type(s) of crisis mentioned"""
-    text_lower = text.lower()
-    types = []
-    for crisis_type, keywords in CRISIS_KEYWORDS.items():
-        if any(kw in text_lower for kw in keywords):
-            types.append(crisis_type)
-    return types
+    if matches is None:
+        matches = find_gazetteer_matches(text)
+    found = first_match_spans(matches, "crisis")
+    return [crisis_type for crisis_type in CRISIS_KEYWORDS if crisis_type in found]
 
-def calculate_misinformation_score(text: str, has_media: bool) -> float:
+def calculate_misinformation_score(text: str, has_media: bool,
+                                   matches: Optional[List[KeywordMatch]] = None) -> float:
     """Calculate likelihood of misinformation (0-1)"""
     score = 0.0
     text_lower = text.lower()
+    if matches is None:
+        matches = find_gazetteer_matches(text)
     
     # Check for misinformation indicators
     for pattern in MISINFORMATION_INDICATORS:
@@ -112,7 +200,7 @@ def calculate_misinformation_score(text: str, has_media: bool) -> float:
     
     # Unverified claims with numbers are suspicious
     if re.search(r'\d+\s*(dead|killed|injured)', text_lower):
-        if not any(src in text_lower for src in OFFICIAL_SOURCES):
+        if not any(m.kind == "official_source" for m in matches):
             score += 0.2
     
     # All caps text is often sensational
@@ -166,28 +254,28 @@ def normalize_text(text: str) -> str:
         text = text.title()
     return text.strip()
 
-@app.post("/extract")
-async def extract(req: ExtractRequest):
-    """
-    Extract and analyze claims from text for fact-checking
-    Returns structured claim data with priority and misinformation indicators
-    """
-    text = req.text
-    has_media = len(req.media) > 0
+def extract_claim(text: str, media: List[str]) -> ExtractedClaim:
+    """Run the full extraction pipeline on a single text"""
+    has_media = len(media) > 0
     
-    # Extract components
-    locations = extract_locations(text)
-    crisis_types = identify_crisis_types(text)
+    # Extract components (gazetteers are scanned once and shared)
+    matches = find_gazetteer_matches(text)
+    locations = extract_locations(text, matches)
+    crisis_types = identify_crisis_types(text, matches)
     numbers = extract_numbers(text)
-    misinformation_score = calculate_misinformation_score(text, has_media)
+    misinformation_score = calculate_misinformation_score(text, has_media, matches)
     priority = calculate_priority(crisis_types, misinformation_score, locations)
     
     # Build entities list
     entities = []
+    location_spans = first_match_spans(matches, "location")
+    crisis_spans = first_match_spans(matches, "crisis")
     for loc in locations:
-        entities.append(ClaimEntity(type="location", value=loc, confidence=0.9))
+        start, end = location_spans[loc.lower()]
+        entities.append(ClaimEntity(type="location", value=loc, confidence=0.9, start=start, end=end))
     for crisis in crisis_types:
-        entities.append(ClaimEntity(type="crisis_type", value=crisis, confidence=0.85))
+        start, end = crisis_spans[crisis]
+        entities.append(ClaimEntity(type="crisis_type", value=crisis, confidence=0.85, start=start, end=end))
     for num in numbers:
         entities.append(ClaimEntity(type="statistic", value=num, confidence=0.8))
     
@@ -211,11 +299,136 @@ async def extract(req: ExtractRequest):
         requires_verification=requires_verification,
         extraction_timestamp=datetime.now().isoformat()
     )
+    return claim
+
+def extract_chunk(items: List[dict]) -> List[dict]:
+    """
+    Process-pool entry point: extract a chunk of requests, capturing per-item errors
+    Each claim's near-duplicate signature is computed here too, off the event loop;
+    the caller pops it before the result is sent.
+    """
+    results = []
+    for item in items:
+        try:
+            claim = extract_claim(item["text"], item.get("media") or []).dict()
+            results.append({"claim": claim, "error": None, "signature": claim_signature(claim)})
+        except Exception as e:
+            results.append({"claim": None, "error": str(e)})
+    return results
+
+def claim_signature(claim: dict) -> Tuple[int, ...]:
+    """Near-duplicate signature of a claim, cached alongside it so hits skip MinHash"""
+    return NEAR_DUPLICATES.signature(claim["normalized_text"])
+
+def assign_cluster(claim: dict, signature: Optional[Tuple[int, ...]] = None) -> dict:
+    """Attach the near-duplicate cluster and nearest prior claim to an extracted claim"""
+    match = NEAR_DUPLICATES.lookup_and_add(claim["normalized_text"], signature=signature)
+    claim["cluster_id"] = match.cluster_id
+    if match.nearest:
+        claim["nearest_claim"] = NearestClaim(
+            text=match.nearest.text,
+            similarity=match.nearest.similarity,
+            first_seen=datetime.fromtimestamp(match.nearest.first_seen).isoformat()
+        ).dict()
+    return claim
+
+async def apply_semantic_tier(claim: dict) -> dict:
+    """Add crisis types found only by the embedding classifier and re-rank the claim"""
+    if not SEMANTIC_ENABLED:
+        return claim
+    scores = await SEMANTIC.classify(claim["original_text"])
+    added = [t for t in CRISIS_KEYWORDS if t in scores and t not in claim["crisis_types"]]
+    if not added:
+        return claim
+    claim["crisis_types"] = [t for t in CRISIS_KEYWORDS if t in claim["crisis_types"] or t in added]
+    for crisis in added:
+        claim["entities"].append(
+            ClaimEntity(type="crisis_type", value=crisis, confidence=scores[crisis]).dict()
+        )
+    claim["priority_score"] = calculate_priority(
+        claim["crisis_types"], claim["misinformation_score"], claim["locations"]
+    )
+    claim["requires_verification"] = True
+    return claim
+
+def register_claim(claim: dict, signature: Optional[Tuple[int, ...]] = None) -> dict:
+    """Record a finished claim in the near-duplicate index and hotspot counters"""
+    assign_cluster(claim, signature)
+    HOTSPOTS.record(claim["locations"], claim["crisis_types"])
+    return claim
+
+def claim_cache_key(text: str, has_media: bool) -> str:
+    """
+    Content address of a request: everything the extractor reads, which is the raw
+    text up to case and whitespace runs (URLs included), plus the media flag and the
+    all-caps signal that lowercasing throws away
+    """
+    shouting = sum(1 for c in text if c.isupper()) / max(len(text), 1) > 0.5
+    content = f"{' '.join(text.lower().split())}\0{int(has_media)}{int(shouting)}"
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+def get_cached_claim(key: str, text: str) -> Optional[Tuple[dict, Tuple[int, ...]]]:
+    """Return a cached (claim, signature) with the claim adapted to this request's text, or None"""
+    cached = RESULT_CACHE.get(key)
+    if cached is None:
+        return None
+    claim, signature = cached
+    return adapt_claim(claim, text), signature
+
+def adapt_claim(claim: dict, text: str) -> dict:
+    """Reuse a claim extracted from an identically keyed text for this request"""
+    cached_text = claim["original_text"]
+    if cached_text != text:
+        # Same text up to case and whitespace: spans survive only a change of case
+        claim["original_text"] = text
+        claim["normalized_text"] = normalize_text(text)
+        if len(cached_text) != len(text) or cached_text.lower() != text.lower():
+            for entity in claim["entities"]:
+                entity["start"] = entity["end"] = None
+    claim["extraction_timestamp"] = datetime.now().isoformat()
+    return claim
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Create the extraction worker pool on first use"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+    return _process_pool
+
+def reset_process_pool():
+    """Drop a pool whose worker died so the next batch starts a fresh one"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+@app.on_event("shutdown")
+def shutdown_process_pool():
+    reset_process_pool()
+
+@app.post("/extract")
+async def extract(req: ExtractRequest):
+    """
+    Extract and analyze claims from text for fact-checking
+    Returns structured claim data with priority and misinformation indicators
+    """
+    key = claim_cache_key(req.text, len(req.media) > 0)
+    cached = get_cached_claim(key, req.text)
+    if cached is None:
+        claim = extract_claim(req.text, req.media).dict()
+        signature = claim_signature(claim)
+        RESULT_CACHE.put(key, (claim, signature))
+    else:
+        claim, signature = cached
+    await apply_semantic_tier(claim)
+    register_claim(claim, signature)
     
-    print(f"[ClaimExtractor] Extracted claim with priority {priority}, misinfo score {misinformation_score:.2f}")
+    print(f"[ClaimExtractor] Extracted claim with priority {claim['priority_score']}, misinfo score {claim['misinformation_score']:.2f}, cluster {claim['cluster_id']}")
     
     return {
-        "claims": [claim.dict()],
+        "claims": [claim],
         "metadata": {
             "source": req.source,
             "media_count": len(req.media),
@@ -223,11 +436,229 @@ async def extract(req: ExtractRequest):
         }
     }
 
+@app.post("/extract/batch")
+async def extract_batch(req: BatchExtractRequest):
+    """
+    Extract claims from many texts at once, fanned out over worker processes
+    Results come back in input order; a failing item reports its error without failing the batch
+    """
+    if len(req.items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"Maximum {MAX_BATCH_SIZE} items per batch")
+    
+    # Cache hits are answered here; only misses are shipped to the worker pool
+    results: List[Optional[dict]] = []
+    misses = []  # (position, cache key, item)
+    repeats = []  # (position, cache key) of misses already queued earlier in this batch
+    queued_keys = set()
+    for position, item in enumerate(req.items):
+        key = claim_cache_key(item.text, len(item.media) > 0)
+        cached = None if key in queued_keys else get_cached_claim(key, item.text)
+        if cached is not None:
+            claim, signature = cached
+            results.append({"claim": claim, "error": None, "signature": signature})
+            continue
+        results.append(None)
+        if key in queued_keys:
+            repeats.append((position, key))
+        else:
+            queued_keys.add(key)
+            misses.append((position, key, {"text": item.text, "media": item.media}))
+    
+    # A few chunks per worker keeps the pool busy without paying IPC per item
+    chunk_size = max(1, math.ceil(len(misses) / (EXTRACT_WORKERS * 4)))
+    chunks = [misses[i:i + chunk_size] for i in range(0, len(misses), chunk_size)]
+    
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool() if chunks else None
+    chunk_results = await asyncio.gather(
+        *(loop.run_in_executor(pool, extract_chunk, [item for _, _, item in chunk]) for chunk in chunks),
+        return_exceptions=True
+    )
+    
+    extracted = {}
+    for chunk, outcome in zip(chunks, chunk_results):
+        if isinstance(outcome, BrokenProcessPool):
+            reset_process_pool()
+        if isinstance(outcome, Exception):
+            outcome = [{"claim": None, "error": f"Worker failed: {outcome}"} for _ in chunk]
+        for (position, key, _), result in zip(chunk, outcome):
+            if result["claim"]:
+                RESULT_CACHE.put(key, (result["claim"], result["signature"]))
+            extracted[key] = result
+            results[position] = result
+    
+    for position, key in repeats:
+        result = copy.deepcopy(extracted[key])
+        if result["claim"]:
+            adapt_claim(result["claim"], req.items[position].text)
+        results[position] = result
+    
+    await asyncio.gather(*(apply_semantic_tier(r["claim"]) for r in results if r["claim"]))
+    for index, (item, result) in enumerate(zip(req.items, results)):
+        signature = result.pop("signature", None)
+        result["index"] = index
+        result["source"] = item.source
+        if result["claim"]:
+            register_claim(result["claim"], signature)
+    
+    failed = sum(1 for r in results if r["error"])
+    print(f"[ClaimExtractor] Batch extracted {len(results) - failed}/{len(results)} claims")
+    
+    return {
+        "results": results,
+        "metadata": {
+            "total": len(results),
+            "failed": failed,
+            "processing_time": datetime.now().isoformat()
+        }
+    }
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    Streaming response that leaves the request body to the body iterator
+    StreamingResponse normally listens for disconnects by draining receive(), which
+    would swallow the request body chunks the iterator is still reading.
+    """
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+async def iter_ndjson_lines(request: Request) -> AsyncIterator[Optional[bytes]]:
+    """
+    Yield the lines of a chunked NDJSON body as each network chunk arrives
+    Yields None for a line longer than STREAM_MAX_LINE_BYTES (its bytes are discarded)
+    and b"" after every network chunk, so callers can flush partial work.
+    """
+    buffer = b""
+    oversized = False
+    async for chunk in request.stream():
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            if oversized:
+                oversized = False
+                yield None
+            elif line.strip():
+                yield line
+        if len(buffer) > STREAM_MAX_LINE_BYTES:
+            buffer = b""
+            oversized = True
+        yield b""
+    if oversized:
+        yield None
+    elif buffer.strip():
+        yield buffer
+
+async def stream_extractions(request: Request) -> AsyncIterator[bytes]:
+    """Extract claims line by line, keeping a bounded window of chunks on the pool"""
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    in_flight = deque()  # (first_index, cache_keys, future) in input order
+    pending: List[dict] = []
+    pending_keys: List[str] = []
+    first_pending_index = 0
+    index = 0
+
+    def submit():
+        nonlocal pending, pending_keys, first_pending_index
+        if pending:
+            future = loop.run_in_executor(pool, extract_chunk, pending)
+            in_flight.append((first_pending_index, pending_keys, future))
+            pending, pending_keys = [], []
+        first_pending_index = index
+
+    async def drain(limit: int):
+        # Emit finished chunks in order until at most `limit` remain in flight
+        while len(in_flight) > limit:
+            start, keys, future = in_flight.popleft()
+            try:
+                results = await future
+            except Exception as e:
+                if isinstance(e, BrokenProcessPool):
+                    reset_process_pool()
+                results = [{"claim": None, "error": f"Worker failed: {e}"} for _ in keys]
+            for key, result in zip(keys, results):
+                if key and result["claim"]:
+                    RESULT_CACHE.put(key, (result["claim"], result["signature"]))
+            await asyncio.gather(*(apply_semantic_tier(r["claim"]) for r in results if r["claim"]))
+            for offset, result in enumerate(results):
+                signature = result.pop("signature", None)
+                result["index"] = start + offset
+                if result["claim"]:
+                    register_claim(result["claim"], signature)
+                yield (json.dumps(result, ensure_ascii=False) + "\n").encode("utf-8")
+
+    async for line in iter_ndjson_lines(request):
+        if line == b"":
+            # End of a network chunk: don't hold parsed items back waiting for more input
+            submit()
+        else:
+            try:
+                if line is None:
+                    raise ValueError(f"Line exceeds {STREAM_MAX_LINE_BYTES} bytes")
+                item = ExtractRequest(**json.loads(line))
+                key = claim_cache_key(item.text, len(item.media) > 0)
+                cached = get_cached_claim(key, item.text)
+                if cached is None:
+                    pending.append({"text": item.text, "media": item.media})
+                    pending_keys.append(key)
+                else:
+                    # Queue the hit behind earlier lines so output stays in input order
+                    submit()
+                    claim, signature = cached
+                    done = loop.create_future()
+                    done.set_result([{"claim": claim, "error": None, "signature": signature}])
+                    in_flight.append((index, [None], done))
+                    first_pending_index = index + 1
+            except (ValueError, TypeError, ValidationError) as e:
+                # Flush what precedes the bad line so output stays in input order
+                submit()
+                async for out in drain(0):
+                    yield out
+                error = {"index": index, "claim": None, "error": f"Invalid request line: {e}"}
+                yield (json.dumps(error, ensure_ascii=False) + "\n").encode("utf-8")
+                index += 1
+                first_pending_index = index
+                continue
+            index += 1
+            if len(pending) >= STREAM_MAX_CHUNK_ITEMS:
+                submit()
+        async for out in drain(STREAM_MAX_IN_FLIGHT):
+            yield out
+
+    submit()
+    async for out in drain(0):
+        yield out
+    print(f"[ClaimExtractor] Streamed {index} extraction results")
+
+@app.post("/extract/stream")
+async def extract_stream(request: Request):
+    """
+    Extract claims from a chunked NDJSON body of ExtractRequest lines
+    Streams one NDJSON result per input line, in input order, as soon as it is ready.
+    Memory stays bounded: only a small window of lines is buffered at any time, and a
+    slow reader stops further body reads until it catches up.
+    """
+    return NDJSONStreamingResponse(stream_extractions(request), media_type="application/x-ndjson")
+
+@app.get("/hotspots")
+async def hotspots(window_seconds: Optional[float] = None):
+    """
+    Live claim counts per Mumbai area, with ward, coordinates and crisis breakdown
+    Counts cover the configured window, or the most recent window_seconds of it
+    """
+    return HOTSPOTS.snapshot(window_seconds)
+
 @app.get("/health")
 async def health():
     return {
         "status": "healthy",
         "service": "claim-extractor",
         "supported_locations": len(MUMBAI_LOCATIONS),
-        "crisis_types": list(CRISIS_KEYWORDS.keys())
+        "gazetteer_patterns": GAZETTEER.pattern_count,
+        "crisis_types": list(CRISIS_KEYWORDS.keys()),
+        "near_duplicate_index": NEAR_DUPLICATES.stats(),
+        "semantic_classifier": {"enabled": SEMANTIC_ENABLED, **SEMANTIC.status()},
+        "result_cache": RESULT_CACHE.stats()
     }
@@ -0,0 +1,228 @@
+"""
+Offline benchmark for the claim-extractor.
+
+Generates a reproducible synthetic corpus of Mumbai claims (English, Hinglish and
+Devanagari, with varied length, casing and emoji density), times the individual
+extraction functions and drives /extract through the ASGI app in-process. Nothing
+touches the network. Results are written as JSON so runs can be compared across
+commits.
+
+Usage (from services/claim-extractor, needs httpx from requirements-dev.txt):
+    python benchmark.py --corpus-size 2000 --requests 2000 --output bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+ENGLISH_TEMPLATES = [
+    "Heavy rain in {loc}, water up to {n} feet near the station",
+    "BREAKING: {n} dead after building collapse in {loc}",
+    "Fire broke out at a godown in {loc}, {n} injured",
+    "{line} services suspended between {loc} and {loc2} due to waterlogging",
+    "Share this: bridge at {loc} has cracks, avoid the route",
+    "Confirmed by sources, riot in {loc}, police lathi charge",
+    "Traffic jam on the highway near {loc}, {n} hours stuck",
+    "Missing child near {loc} station, blood needed at KEM hospital",
+    "BMC says schools in {loc} closed tomorrow due to heavy rain",
+]
+
+HINGLISH_TEMPLATES = [
+    "{loc} mein bahut pani bhar gaya hai, {n} feet water flood",
+    "Bhai {loc} station pe accident hua, {n} log injured",
+    "Urgent!!! {loc} mein aag lagi hai, sab log door raho",
+    "{line} band hai aaj, {loc} se {loc2} tak traffic jam",
+    "Forward to all: {loc} mein danga ho gaya, {n} dead",
+]
+
+DEVANAGARI_TEMPLATES = [
+    "{loc} में भारी बारिश, {n} फीट पानी भरा",
+    "{loc} स्टेशन के पास हादसा, {n} लोग घायल",
+    "मुंबई में {loc} इलाके में आग, तुरंत शेयर करें",
+    "{loc} मध्ये पूर आला आहे, {n} लोक अडकले",
+]
+
+LOCATIONS = ['Bandra', 'Andheri', 'Dadar', 'Kurla', 'Thane', 'Borivali', 'Sion', 'Chembur',
+             'Ghatkopar', 'Powai', 'Colaba', 'Worli', 'Lower Parel', 'Vile Parle', 'Navi Mumbai',
+             'CST', 'Mumbai Central', 'Kalyan', 'Vasai', 'Virar', 'Malad', 'Goregaon']
+LINES = ['Western line', 'Central line', 'Harbour line', 'Local train', 'BEST bus']
+FILLERS = [
+    "Please verify before sharing.", "Forwarded many times.", "Saw it on a WhatsApp group.",
+    "My cousin lives nearby and confirmed.", "https://example.com/news/123", "Stay safe everyone!!",
+    "Police have not said anything yet.", "This is happening right now.",
+]
+EMOJIS = ['🚨', '⚠️', '🙏', '😱', '🌧️', '🔥', '🚆', '‼️', '📢', '💔']
+
+def generate_corpus(size: int, seed: int) -> List[Dict]:
+    """Build a reproducible list of ExtractRequest payloads"""
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(size):
+        language = rng.choices(['en', 'hinglish', 'hi'], weights=[5, 3, 2])[0]
+        templates = {'en': ENGLISH_TEMPLATES, 'hinglish': HINGLISH_TEMPLATES,
+                     'hi': DEVANAGARI_TEMPLATES}[language]
+        loc, loc2 = rng.sample(LOCATIONS, 2)
+        text = rng.choice(templates).format(
+            loc=loc, loc2=loc2, n=rng.randint(1, 50), line=rng.choice(LINES)
+        )
+
+        # Length: from a bare claim up to a long forward with many filler sentences
+        fillers = rng.choice([0, 0, 1, 2, 4, 8, 16])
+        text = " ".join([text] + [rng.choice(FILLERS) for _ in range(fillers)])
+
+        casing = rng.choice(['as_is', 'as_is', 'lower', 'upper', 'title'])
+        text = {'as_is': text, 'lower': text.lower(), 'upper': text.upper(),
+                'title': text.title()}[casing]
+
+        emoji_density = rng.choice([0.0, 0.0, 0.05, 0.2, 0.5])
+        words = []
+        for word in text.split(' '):
+            words.append(word)
+            if rng.random() < emoji_density:
+                words.append(rng.choice(EMOJIS) * rng.randint(1, 3))
+        text = ' '.join(words)
+
+        media = [f"https://example.com/img/{rng.randint(1, 10**6)}.jpg"] if rng.random() < 0.3 else []
+        corpus.append({"text": text, "media": media, "source": "benchmark"})
+    return corpus
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(latencies_s: List[float], wall_s: float) -> Dict:
+    ms = [x * 1000 for x in latencies_s]
+    return {
+        "count": len(ms),
+        "throughput_per_s": round(len(ms) / wall_s, 1) if wall_s else None,
+        "mean_ms": round(statistics.fmean(ms), 4),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "max_ms": round(max(ms), 4),
+    }
+
+def time_function(fn: Callable, inputs: List, repeat: int) -> Dict:
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for args in inputs:
+            t0 = time.perf_counter()
+            fn(*args)
+            latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, time.perf_counter() - start)
+
+def bench_functions(app_module, corpus: List[Dict], repeat: int) -> Dict:
+    texts = [(item["text"],) for item in corpus]
+    with_media = [(item["text"], bool(item["media"])) for item in corpus]
+    return {
+        "find_gazetteer_matches": time_function(app_module.find_gazetteer_matches, texts, repeat),
+        "extract_locations": time_function(app_module.extract_locations, texts, repeat),
+        "identify_crisis_types": time_function(app_module.identify_crisis_types, texts, repeat),
+        "extract_numbers": time_function(app_module.extract_numbers, texts, repeat),
+        "calculate_misinformation_score": time_function(
+            app_module.calculate_misinformation_score, with_media, repeat),
+        "normalize_text": time_function(app_module.normalize_text, texts, repeat),
+        "near_duplicate_signature": time_function(app_module.NEAR_DUPLICATES.signature, texts, repeat),
+        "extract_claim": time_function(
+            app_module.extract_claim, [(item["text"], item["media"]) for item in corpus], repeat),
+    }
+
+async def bench_endpoint(app_module, corpus: List[Dict], requests: int, concurrency: int) -> Dict:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    latencies = []
+    errors = 0
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        # Warm up routing, pydantic models and the regex cache
+        for item in corpus[:20]:
+            await client.post("/extract", json=item)
+
+        queue = asyncio.Queue()
+        for i in range(requests):
+            queue.put_nowait(corpus[i % len(corpus)])
+
+        async def worker():
+            nonlocal errors
+            while not queue.empty():
+                item = queue.get_nowait()
+                t0 = time.perf_counter()
+                response = await client.post("/extract", json=item)
+                latencies.append(time.perf_counter() - t0)
+                if response.status_code != 200:
+                    errors += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    result = summarize(latencies, wall)
+    result["concurrency"] = concurrency
+    result["errors"] = errors
+    return result
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline claim-extractor benchmark")
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the corpus per function")
+    parser.add_argument("--requests", type=int, default=2000, help="/extract calls to time")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--with-cache", action="store_true",
+                        help="keep the result cache on (it is disabled so repeats measure real work)")
+    parser.add_argument("--output", default="benchmark-results.json")
+    args = parser.parse_args()
+
+    # Configure the app before importing it: the cache would otherwise absorb repeats
+    if not args.with_cache:
+        os.environ["EXTRACT_CACHE_SIZE"] = "0"
+    os.environ.setdefault("SEMANTIC_CLASSIFIER", "off")
+    import app as app_module
+
+    corpus = generate_corpus(args.corpus_size, args.seed)
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "corpus": {
+            "size": len(corpus),
+            "mean_chars": round(statistics.fmean(len(item["text"]) for item in corpus), 1),
+            "max_chars": max(len(item["text"]) for item in corpus),
+            "with_media": sum(1 for item in corpus if item["media"]),
+        },
+        "functions": bench_functions(app_module, corpus, args.repeat),
+        "endpoint": asyncio.run(
+            bench_endpoint(app_module, corpus, args.requests, args.concurrency)),
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    for name, stats in results["functions"].items():
+        print(f"{name:32s} p50 {stats['p50_ms']:.4f} ms  p99 {stats['p99_ms']:.4f} ms")
+    endpoint = results["endpoint"]
+    print(f"{'/extract':32s} p50 {endpoint['p50_ms']:.3f} ms  p99 {endpoint['p99_ms']:.3f} ms  "
+          f"{endpoint['throughput_per_s']} req/s")
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    sys.exit(main())
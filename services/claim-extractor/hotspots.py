@@ -0,0 +1,159 @@
+"""
+Real-time geo hotspot aggregation over extracted claim locations.
+
+Every gazetteer location with a fixed position is mapped to approximate
+coordinates and its BMC ward (or neighbouring municipal corporation). Claims are
+counted per area and per (area, crisis type) in sliding-window ring buffers, so
+recording a claim is O(1) and reading the current counts never rescans claims.
+"""
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+# gazetteer name -> (latitude, longitude, ward); city-wide names and rail lines are left out
+LOCATION_GEO: Dict[str, Tuple[float, float, str]] = {
+    'colaba': (18.9067, 72.8147, 'A'),
+    'churchgate': (18.9322, 72.8264, 'A'),
+    'cst': (18.9398, 72.8355, 'A'),
+    'vt': (18.9398, 72.8355, 'A'),
+    'marine lines': (18.9440, 72.8230, 'C'),
+    'grant road': (18.9630, 72.8150, 'D'),
+    'mumbai central': (18.9690, 72.8205, 'E'),
+    'sion': (19.0390, 72.8619, 'F/N'),
+    'matunga': (19.0270, 72.8553, 'F/N'),
+    'wadala': (19.0169, 72.8630, 'F/N'),
+    'dadar': (19.0178, 72.8478, 'G/N'),
+    'mahim': (19.0380, 72.8397, 'G/N'),
+    'worli': (19.0176, 72.8172, 'G/S'),
+    'lower parel': (18.9950, 72.8300, 'G/S'),
+    'prabhadevi': (19.0166, 72.8290, 'G/S'),
+    'santacruz': (19.0809, 72.8416, 'H/E'),
+    'bandra': (19.0596, 72.8295, 'H/W'),
+    'khar': (19.0728, 72.8326, 'H/W'),
+    'andheri': (19.1136, 72.8697, 'K/E'),
+    'vile parle': (19.0990, 72.8440, 'K/E'),
+    'jogeshwari': (19.1363, 72.8492, 'K/E'),
+    'kurla': (19.0726, 72.8845, 'L'),
+    'chembur': (19.0522, 72.9005, 'M/W'),
+    'ghatkopar': (19.0790, 72.9080, 'N'),
+    'goregaon': (19.1663, 72.8526, 'P/S'),
+    'malad': (19.1874, 72.8484, 'P/N'),
+    'kandivali': (19.2047, 72.8397, 'R/S'),
+    'borivali': (19.2307, 72.8567, 'R/C'),
+    'vikhroli': (19.1110, 72.9280, 'S'),
+    'powai': (19.1176, 72.9060, 'S'),
+    'bhandup': (19.1439, 72.9380, 'S'),
+    'mulund': (19.1726, 72.9565, 'T'),
+    'nahur': (19.1550, 72.9460, 'T'),
+    'thane': (19.2183, 72.9781, 'Thane MC'),
+    'kalyan': (19.2437, 73.1355, 'Kalyan-Dombivli MC'),
+    'dombivli': (19.2183, 73.0868, 'Kalyan-Dombivli MC'),
+    'navi mumbai': (19.0330, 73.0297, 'Navi Mumbai MC'),
+    'panvel': (18.9894, 73.1175, 'Panvel MC'),
+    'vasai': (19.3919, 72.8397, 'Vasai-Virar MC'),
+    'virar': (19.4559, 72.8114, 'Vasai-Virar MC'),
+}
+
+
+class SlidingWindowCounter:
+    """Event count over the last num_buckets * bucket_seconds, kept in a ring buffer"""
+
+    __slots__ = ("bucket_seconds", "counts", "total", "_epoch")
+
+    def __init__(self, num_buckets: int, bucket_seconds: float):
+        self.bucket_seconds = bucket_seconds
+        self.counts = [0] * num_buckets
+        self.total = 0
+        self._epoch: Optional[int] = None  # bucket index of the newest slot
+
+    def _advance(self, now: float):
+        epoch = int(now // self.bucket_seconds)
+        if self._epoch is None:
+            self._epoch = epoch
+            return
+        n = len(self.counts)
+        # Clear every slot that has rotated out since the last call (at most n)
+        for e in range(self._epoch + 1, min(epoch, self._epoch + n) + 1):
+            slot = e % n
+            self.total -= self.counts[slot]
+            self.counts[slot] = 0
+        self._epoch = max(self._epoch, epoch)
+
+    def add(self, now: float, amount: int = 1):
+        self._advance(now)
+        self.counts[self._epoch % len(self.counts)] += amount
+        self.total += amount
+
+    def count(self, now: float, last_buckets: Optional[int] = None) -> int:
+        self._advance(now)
+        n = len(self.counts)
+        if last_buckets is None or last_buckets >= n:
+            return self.total
+        return sum(self.counts[(self._epoch - i) % n] for i in range(last_buckets))
+
+
+class HotspotAggregator:
+    """Sliding-window claim counts per area and per (area, crisis type)"""
+
+    def __init__(self, window_seconds: float = 3600, bucket_seconds: float = 60):
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = max(1, int(window_seconds // bucket_seconds))
+        self.window_seconds = self.num_buckets * bucket_seconds
+        self._areas: Dict[str, SlidingWindowCounter] = {}
+        self._crises: Dict[str, Dict[str, SlidingWindowCounter]] = {}
+        self._lock = threading.Lock()
+
+    def _counter(self) -> SlidingWindowCounter:
+        return SlidingWindowCounter(self.num_buckets, self.bucket_seconds)
+
+    def record(self, locations: List[str], crisis_types: List[str], now: Optional[float] = None):
+        """Count one claim against every mapped location it mentions"""
+        now = time.time() if now is None else now
+        areas = {loc.lower() for loc in locations if loc.lower() in LOCATION_GEO}
+        if not areas:
+            return
+        with self._lock:
+            for area in areas:
+                if area not in self._areas:
+                    self._areas[area] = self._counter()
+                    self._crises[area] = {}
+                self._areas[area].add(now)
+                for crisis in crisis_types or ["unspecified"]:
+                    counters = self._crises[area]
+                    if crisis not in counters:
+                        counters[crisis] = self._counter()
+                    counters[crisis].add(now)
+
+    def snapshot(self, window_seconds: Optional[float] = None, now: Optional[float] = None) -> dict:
+        """Current per-area counts and hourly rates, busiest areas first"""
+        now = time.time() if now is None else now
+        last_buckets = None
+        window = self.window_seconds
+        if window_seconds is not None and window_seconds < self.window_seconds:
+            last_buckets = max(1, int(window_seconds // self.bucket_seconds))
+            window = last_buckets * self.bucket_seconds
+
+        hotspots = []
+        with self._lock:
+            for area, counter in self._areas.items():
+                count = counter.count(now, last_buckets)
+                if not count:
+                    continue
+                crises = {}
+                for crisis, crisis_counter in self._crises[area].items():
+                    crisis_count = crisis_counter.count(now, last_buckets)
+                    if crisis_count:
+                        crises[crisis] = crisis_count
+                lat, lon, ward = LOCATION_GEO[area]
+                hotspots.append({
+                    "area": area.title(),
+                    "ward": ward,
+                    "lat": lat,
+                    "lon": lon,
+                    "count": count,
+                    "rate_per_hour": round(count * 3600 / window, 2),
+                    "crisis_types": crises,
+                })
+        hotspots.sort(key=lambda h: h["count"], reverse=True)
+        return {"window_seconds": window, "hotspots": hotspots}
@@ -0,0 +1,66 @@
+"""
+Multi-pattern keyword matcher for the claim-extractor gazetteers.
+
+Patterns are compiled once into a word-level trie, so a text is scanned in a
+single pass over its tokens regardless of how many entries the gazetteers hold.
+Matches always start and end on word boundaries and carry character spans.
+"""
+
+import re
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Sentinel key under which a trie node stores the patterns ending at it
+_TERMINAL = "\0"
+
+
+class KeywordMatch(NamedTuple):
+    kind: str       # gazetteer the pattern came from, e.g. "location"
+    label: str      # category within the gazetteer, e.g. "flood"
+    keyword: str    # the pattern as it was registered
+    start: int      # character offset in the original text
+    end: int
+
+
+class KeywordMatcher:
+    """Word-level trie over multi-word keywords from several gazetteers"""
+
+    def __init__(self):
+        self._root: Dict[str, dict] = {}
+        self._max_words = 0
+        self.pattern_count = 0
+
+    def add(self, keyword: str, kind: str, label: str = None):
+        """Register a keyword; multi-word keywords match consecutive tokens"""
+        words = TOKEN_PATTERN.findall(keyword.lower())
+        if not words:
+            return
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        node.setdefault(_TERMINAL, []).append((kind, label or keyword, keyword))
+        self._max_words = max(self._max_words, len(words))
+        self.pattern_count += 1
+
+    def add_all(self, keywords: Iterable[str], kind: str, label: str = None):
+        for keyword in keywords:
+            self.add(keyword, kind, label)
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Return every (possibly overlapping) keyword occurrence in text"""
+        tokens: List[Tuple[str, int, int]] = [
+            (m.group().lower(), m.start(), m.end()) for m in TOKEN_PATTERN.finditer(text)
+        ]
+        matches = []
+        for i, (word, start, _) in enumerate(tokens):
+            node = self._root.get(word)
+            j = i
+            while node is not None:
+                for kind, label, keyword in node.get(_TERMINAL, ()):
+                    matches.append(KeywordMatch(kind, label, keyword, start, tokens[j][2]))
+                j += 1
+                if j >= len(tokens) or j - i >= self._max_words:
+                    break
+                node = node.get(tokens[j][0])
+        return matches
@@ -0,0 +1,190 @@
+"""
+In-memory MinHash/LSH index for recognising near-duplicate claims.
+
+Forwarded rumours come back with extra emojis, "Forwarded many times" banners and
+different punctuation. Texts are canonicalised, shingled into character n-grams and
+summarised by a MinHash signature; LSH banding finds likely matches without
+comparing against every stored claim. Memory is bounded by a maximum entry count
+and entries expire after a TTL.
+"""
+
+import hashlib
+import re
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+# Boilerplate that messaging apps and forwarders add around the actual claim
+_BOILERPLATE_PATTERNS = [
+    re.compile(r'forwarded\s+many\s+times'),
+    re.compile(r'forwarded(\s+as\s+received)?'),
+    re.compile(r'\[url\]'),
+]
+# Runs of anything but letters and digits. re's \w leaves out combining marks, which
+# would cut Indic words apart at every vowel sign and anusvara, so the Indic blocks
+# (Devanagari to Sinhala, less the shared danda punctuation) are kept whole.
+_NON_WORD = re.compile(r'(?:[^\w\u0900-\u0963\u0966-\u0DFF]|_)+')
+
+
+class NearestClaim(NamedTuple):
+    text: str
+    similarity: float
+    first_seen: float
+
+
+class DuplicateMatch(NamedTuple):
+    cluster_id: str
+    nearest: Optional[NearestClaim]
+
+
+class _Entry:
+    __slots__ = ("signature", "band_keys", "cluster_id", "text", "first_seen", "last_seen")
+
+    def __init__(self, signature, band_keys, cluster_id, text, now):
+        self.signature = signature
+        self.band_keys = band_keys
+        self.cluster_id = cluster_id
+        self.text = text
+        self.first_seen = now
+        self.last_seen = now
+
+
+def canonicalize(text: str) -> str:
+    """Strip case, forwarding boilerplate, emojis and punctuation"""
+    text = text.lower()
+    for pattern in _BOILERPLATE_PATTERNS:
+        text = pattern.sub(' ', text)
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+class NearDuplicateIndex:
+    """MinHash signatures bucketed by LSH bands, with LRU + TTL eviction"""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.6,
+                 max_entries: int = 50000, ttl_seconds: float = 86400,
+                 shingle_size: int = 5, refresh_similarity: float = 0.95,
+                 max_text_chars: int = 280):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shingle_size = shingle_size
+        self.refresh_similarity = refresh_similarity
+        self.max_text_chars = max_text_chars
+
+        # One SHAKE digest per shingle yields num_perm independent 32-bit hashes
+        self._unpack = struct.Struct(f'<{num_perm}I').unpack
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()
+        self._buckets: List[Dict[Tuple[int, ...], Set[int]]] = [{} for _ in range(bands)]
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def shingles(self, text: str) -> Set[str]:
+        canonical = canonicalize(text)
+        k = self.shingle_size
+        if len(canonical) <= k:
+            return {canonical}
+        return {canonical[i:i + k] for i in range(len(canonical) - k + 1)}
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        digest_size = self.num_perm * 4
+        rows = [
+            self._unpack(hashlib.shake_128(g.encode('utf-8')).digest(digest_size))
+            for g in self.shingles(text)
+        ]
+        return tuple(map(min, zip(*rows)))
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        r = self.rows
+        return [signature[i * r:(i + 1) * r] for i in range(self.bands)]
+
+    def _similarity(self, a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+        return sum(1 for x, y in zip(a, b) if x == y) / self.num_perm
+
+    def _remove(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        for band, key in enumerate(entry.band_keys):
+            bucket = self._buckets[band].get(key)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band][key]
+
+    def _evict(self, now: float):
+        # Entries are kept in last-seen order, so expired ones are at the front
+        while self._entries:
+            oldest_id, oldest = next(iter(self._entries.items()))
+            if len(self._entries) <= self.max_entries and now - oldest.last_seen <= self.ttl_seconds:
+                break
+            self._remove(oldest_id)
+            self.evictions += 1
+
+    def lookup_and_add(self, text: str, now: Optional[float] = None,
+                       signature: Optional[Tuple[int, ...]] = None) -> DuplicateMatch:
+        """
+        Find the nearest stored claim, assign a cluster and remember this text
+        Pass the text's signature if it is already known, to skip recomputing it.
+        """
+        now = time.time() if now is None else now
+        if signature is None:
+            signature = self.signature(text)
+        band_keys = self._band_keys(signature)
+
+        with self._lock:
+            self._evict(now)
+
+            candidates: Set[int] = set()
+            for band, key in enumerate(band_keys):
+                candidates |= self._buckets[band].get(key, set())
+
+            best_id, best_similarity = None, 0.0
+            for entry_id in candidates:
+                similarity = self._similarity(signature, self._entries[entry_id].signature)
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            nearest = None
+            cluster_id = None
+            if best_id is not None:
+                best = self._entries[best_id]
+                nearest = NearestClaim(best.text, round(best_similarity, 3), best.first_seen)
+                if best_similarity >= self.threshold:
+                    cluster_id = best.cluster_id
+                if best_similarity >= self.refresh_similarity:
+                    # Practically the same text: refresh it instead of storing another copy.
+                    # It is the same claim whatever the cluster threshold is set to.
+                    best.last_seen = now
+                    self._entries.move_to_end(best_id)
+                    return DuplicateMatch(best.cluster_id, nearest)
+
+            if cluster_id is None:
+                cluster_id = uuid.uuid4().hex[:12]
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = _Entry(
+                signature, band_keys, cluster_id, text[:self.max_text_chars], now
+            )
+            for band, key in enumerate(band_keys):
+                self._buckets[band].setdefault(key, set()).add(entry_id)
+            self._evict(now)
+
+        return DuplicateMatch(cluster_id, nearest)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "threshold": self.threshold,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,124 @@
+"""
+Optional embedding-based crisis classifier for the claim-extractor.
+
+The sentence-transformers model is heavy, so it is only imported and loaded the
+first time a classification is requested, in a background thread. Until it is
+ready (or if it cannot be loaded at all) classify() returns no scores and callers
+keep the keyword results. Concurrent requests are queued and encoded together in
+CPU micro-batches, flushed when full or when the oldest request has waited
+max_wait_ms.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+
+class SemanticCrisisClassifier:
+    """Lazily loaded, micro-batched sentence-embedding classifier"""
+
+    def __init__(self, prototypes: Dict[str, str], model_name: str,
+                 threshold: float = 0.45, max_batch_size: int = 32,
+                 max_wait_ms: float = 10, timeout_seconds: float = 2.0):
+        self.prototypes = prototypes
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.timeout_seconds = timeout_seconds
+
+        self.state = "not_loaded"  # not_loaded -> loading -> loaded | unavailable
+        self.error: Optional[str] = None
+        self.batches = 0
+        self.items = 0
+
+        self._model = None
+        self._labels: List[str] = []
+        self._prototype_matrix = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        # One thread: loading and encoding never compete with each other for cores
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="semantic")
+
+    def _load(self):
+        try:
+            from sentence_transformers import SentenceTransformer
+
+            model = SentenceTransformer(self.model_name, device="cpu")
+            labels = list(self.prototypes)
+            self._prototype_matrix = model.encode(
+                [self.prototypes[label] for label in labels], normalize_embeddings=True
+            )
+            self._labels = labels
+            self._model = model
+            self.state = "loaded"
+            print(f"[ClaimExtractor] Semantic classifier loaded ({self.model_name})")
+        except Exception as e:
+            self.error = str(e)
+            self.state = "unavailable"
+            print(f"[ClaimExtractor] Semantic classifier unavailable, using keywords only: {e}")
+
+    def _score(self, texts: List[str]) -> List[Dict[str, float]]:
+        embeddings = self._model.encode(texts, batch_size=len(texts), normalize_embeddings=True)
+        similarities = embeddings @ self._prototype_matrix.T
+        return [
+            {label: round(float(score), 3)
+             for label, score in zip(self._labels, row) if score >= self.threshold}
+            for row in similarities
+        ]
+
+    def _ensure_started(self):
+        if self.state == "not_loaded":
+            self.state = "loading"
+            asyncio.get_running_loop().run_in_executor(self._executor, self._load)
+        if self.state == "loaded" and self._batcher is None:
+            self._queue = asyncio.Queue()
+            self._batcher = asyncio.create_task(self._run_batches())
+
+    async def _run_batches(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                scores = await loop.run_in_executor(self._executor, self._score, texts)
+            except Exception as e:
+                print(f"[ClaimExtractor] Semantic batch failed: {e}")
+                scores = [{} for _ in batch]
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, scores):
+                if not future.done():
+                    future.set_result(result)
+
+    async def classify(self, text: str) -> Dict[str, float]:
+        """Return crisis types scoring above threshold, or {} while the model is not ready"""
+        self._ensure_started()
+        if self.state != "loaded":
+            return {}
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        try:
+            return await asyncio.wait_for(future, self.timeout_seconds)
+        except asyncio.TimeoutError:
+            return {}
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "loaded": self.state == "loaded",
+            "model": self.model_name,
+            "error": self.error,
+            "batches": self.batches,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+        }
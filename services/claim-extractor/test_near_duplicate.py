@@ -0,0 +1,50 @@
+"""
+Near-duplicate clustering of claims, including Indic scripts.
+
+Run from services/claim-extractor (needs requirements-dev.txt):
+    python -m pytest -q test_near_duplicate.py
+"""
+
+from near_duplicate import NearDuplicateIndex, canonicalize
+
+CLAIM_HI = "मुंबई में भारी बारिश, 5 फीट पानी भरा"
+FORWARDED_HI = "Forwarded many times 🙏 मुंबई में भारी बारिश!! 5 फीट पानी भरा।।"
+UNRELATED_HI = "मुंबई में लोकल ट्रेनें आज समय पर चल रही हैं"
+UNRELATED_MR = "मुंबईत आज पाऊस नाही, लोकल गाड्या वेळेवर"
+# Same consonants as CLAIM_HI with other vowel signs: identical once the signs are lost
+SAME_CONSONANTS_HI = "मुंबई मे भीर बेरोश, 5 फ़ीट पाना भरो"
+ATTRIBUTED_HI = "मौसम विभाग: मुंबई में भारी बारिश, 5 फीट पानी भरा"
+
+
+def test_canonicalize_keeps_devanagari_vowel_signs():
+    assert canonicalize(CLAIM_HI) == "मुंबई में भारी बारिश 5 फीट पानी भरा"
+
+
+def test_canonicalize_strips_punctuation_and_boilerplate():
+    assert canonicalize(FORWARDED_HI) == canonicalize(CLAIM_HI)
+    assert canonicalize("Water_logging at Andheri!!!") == "water logging at andheri"
+
+
+def test_forwarded_devanagari_claims_join_the_cluster():
+    index = NearDuplicateIndex()
+    first = index.lookup_and_add(CLAIM_HI, now=0)
+    for text in (FORWARDED_HI, ATTRIBUTED_HI):
+        again = index.lookup_and_add(text, now=1)
+        assert again.cluster_id == first.cluster_id
+        assert again.nearest is not None and again.nearest.similarity >= index.threshold
+
+
+def test_unrelated_devanagari_claims_get_their_own_clusters():
+    index = NearDuplicateIndex()
+    first = index.lookup_and_add(CLAIM_HI, now=0)
+    for text in (UNRELATED_HI, UNRELATED_MR, SAME_CONSONANTS_HI):
+        match = index.lookup_and_add(text, now=1)
+        assert match.cluster_id != first.cluster_id
+        assert match.nearest is None or match.nearest.similarity < index.threshold
+
+
+def test_unrelated_devanagari_claims_stay_dissimilar():
+    index = NearDuplicateIndex()
+    signature = index.signature(CLAIM_HI)
+    for text in (UNRELATED_HI, UNRELATED_MR, SAME_CONSONANTS_HI):
+        assert index._similarity(signature, index.signature(text)) < 0.3
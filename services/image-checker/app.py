@@ -1,14 +1,20 @@
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request
 from pydantic import BaseModel
 from typing import List, Optional
-from PIL import Image
-import imagehash
+import asyncio
+import csv
+import json
+import os
 import io
-import requests
 import urllib.parse
-from bs4 import BeautifulSoup
 from datetime import datetime
-import hashlib
+
+from cpu_pool import CpuPool, PoolSaturated, container_cpus
+from hamming_index import hex_to_int
+from image_analysis import analyze_image
+from image_cache import ImageCache, content_digest
+from image_fetch import ImageFetcher, run_with_deadline
+from known_fakes_store import KnownFakesStore
 
 app = FastAPI(title="Image Checker - Reverse Image Search")
 
@@ -16,27 +22,113 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
-# Known fake/recycled Mumbai images database (phash -> metadata)
-known_fake_images = {
-    # These would be populated with known viral fake images
-    # "phash_value": {"id": "fake1", "original_date": "2018-07-05", "desc": "Old flood photo from 2018", "original_url": "..."}
-}
+# The backend gives /check 15 s in total, so all downloads must finish well inside that
+CHECK_DEADLINE_SECONDS = float(os.getenv("CHECK_DEADLINE_SECONDS", "12"))
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "10"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(10 * 1024 * 1024)))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "20"))
 
-# Cache for recent image checks
-image_cache = {}
+FETCHER = ImageFetcher(HEADERS, timeout=FETCH_TIMEOUT_SECONDS, max_bytes=FETCH_MAX_BYTES,
+                       max_connections=FETCH_MAX_CONNECTIONS)
 
-def compute_phash_bytes(img_bytes):
-    """Compute perceptual hash of image"""
-    try:
-        img = Image.open(io.BytesIO(img_bytes)).convert("RGB")
-        return str(imagehash.phash(img))
-    except Exception as e:
-        print(f"[ImageChecker] Error computing phash: {e}")
-        return None
+# Decoding and hashing run in worker processes sized to the container's CPUs
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", "0")) or container_cpus()
+CPU_POOL = CpuPool(
+    workers=CPU_WORKERS,
+    max_pending=int(os.getenv("CPU_QUEUE_SIZE", str(CPU_WORKERS * 4))),
+    task_timeout=float(os.getenv("CPU_TASK_TIMEOUT_SECONDS", "5")),
+    max_pixels=int(os.getenv("MAX_IMAGE_PIXELS", "50000000")),
+    # Imports and admin adds wait for one of these slots; the rest stay free for /check
+    max_background=int(os.getenv("CPU_BACKGROUND_SLOTS", "0")) or None,
+)
+
+@app.on_event("startup")
+def start_cpu_pool():
+    CPU_POOL.start(preload="image_analysis")
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await FETCHER.aclose()
+    CPU_POOL.shutdown()
+
+def saturated_response(detail: str) -> HTTPException:
+    return HTTPException(status_code=503, detail=detail, headers={"Retry-After": "1"})
+
+# Known fake/recycled Mumbai images database, shared on disk by all workers
+# (memory-mapped phashes + SQLite metadata, see known_fakes_store.py)
+KNOWN_FAKES_DIR = os.getenv("KNOWN_FAKES_DIR", "data/known_fakes")
+IMPORT_MAX_RECORDS = int(os.getenv("IMPORT_MAX_RECORDS", "100000"))
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "8"))
+
+# Cropped/captioned copies of known fakes are found by voting over tile hashes
+# (see tile_index.py); checked images then carry ~4000 query tiles (~80 KB).
+# Off by default until size sweeps show its latency staying flat as the database grows
+TILE_MATCHING = os.getenv("TILE_MATCHING", "off").lower() in ("on", "true", "1")
+QUERY_TILES = "query" if TILE_MATCHING else None
+# With it off, fakes are stored without tiles and no tile index is built
+INDEX_TILES = "index" if TILE_MATCHING else None
+# Tile matching runs in threads of this process; at most this many at once
+TILE_MATCH_SLOTS = asyncio.Semaphore(int(os.getenv("TILE_MATCH_SLOTS", "0")) or max(1, CPU_WORKERS // 2))
 
-def compute_md5(img_bytes):
-    """Compute MD5 hash for caching"""
-    return hashlib.md5(img_bytes).hexdigest()
+known_fakes = KnownFakesStore(KNOWN_FAKES_DIR, tile_matching=TILE_MATCHING)
+
+@app.on_event("startup")
+def open_known_fakes():
+    known_fakes.open()
+
+# Later scenes of animations are checked until one is at most this many bits from a known fake
+FRAME_STRONG_MATCH_BITS = int(os.getenv("FRAME_STRONG_MATCH_BITS", "4"))
+
+# Analysis results for recently seen URLs and image contents (never match results)
+IMAGE_CACHE = ImageCache(
+    max_entries=int(os.getenv("IMAGE_CACHE_SIZE", "2000")),
+    max_bytes=int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    ttl_seconds=float(os.getenv("IMAGE_CACHE_TTL_SECONDS", "3600")),
+)
+
+async def analyze_bytes(img_bytes: bytes, tiles: Optional[str] = None, background: bool = False) -> dict:
+    """
+    analyze_image() in the CPU pool, through the content-digest cache
+    Background analyses wait for a pool slot instead of failing with PoolSaturated.
+    """
+    digest = content_digest(img_bytes)
+    analysis = IMAGE_CACHE.analysis(digest, tiles)
+    if analysis is not None:
+        IMAGE_CACHE.record("content_hits")
+        return dict(analysis, digest=digest, cache="content")
+    IMAGE_CACHE.record("misses")
+    analysis = await CPU_POOL.run(analyze_image, img_bytes, tiles, background=background)
+    if analysis["hashes"] is not None:
+        IMAGE_CACHE.put_analysis(digest, analysis, tiles)
+    return dict(analysis, digest=digest, cache=None)
+
+async def analyze_url(url: str, tiles: Optional[str] = None, background: bool = False) -> dict:
+    """
+    Analysis of the image at url, skipping the download while the URL entry is fresh
+    and revalidating it with a conditional GET once stale
+    """
+    cached = IMAGE_CACHE.url(url)
+    fetched = None
+    if cached is not None:
+        entry, fresh = cached
+        analysis = IMAGE_CACHE.analysis(entry.digest, tiles)
+        if analysis is not None:
+            if fresh:
+                IMAGE_CACHE.record("url_hits")
+                return dict(analysis, digest=entry.digest, cache="url")
+            fetched = await FETCHER.fetch_response(url, entry.etag, entry.last_modified)
+            if fetched.body is None:
+                IMAGE_CACHE.record("revalidated")
+                IMAGE_CACHE.put_url(url, entry.digest, fetched.etag or entry.etag,
+                                    fetched.last_modified or entry.last_modified, fetched.cache_control)
+                return dict(analysis, digest=entry.digest, cache="revalidated")
+    if fetched is None or fetched.body is None:
+        fetched = await FETCHER.fetch_response(url)
+    analysis = await analyze_bytes(fetched.body, tiles, background)
+    if analysis["hashes"] is not None:
+        IMAGE_CACHE.put_url(url, analysis["digest"], fetched.etag, fetched.last_modified,
+                            fetched.cache_control)
+    return analysis
 
 def reverse_image_search_tineye(image_url: str):
     """
@@ -53,89 +145,110 @@ def reverse_image_search_tineye(image_url: str):
         print(f"[ImageChecker] Reverse search error: {e}")
     return matches
 
-def analyze_image_metadata(img_bytes):
-    """Extract and analyze image metadata for authenticity"""
-    analysis = {
-        "has_exif": False,
-        "creation_date": None,
-        "software": None,
-        "is_edited": False,
-        "warnings": []
+def known_fake_match(meta: dict, distance: int) -> dict:
+    return {
+        "id": meta.get("id"),
+        "url": meta.get("original_url"),
+        "meta": {
+            "date": meta.get("original_date"),
+            "desc": meta.get("desc"),
+            "similarity": f"{100 - (distance * 10)}%"
+        },
+        "distance": distance,
+        "match": "global",
+        "warning": f"⚠️ This image is similar to a known {meta.get('desc') or 'recycled image'}"
+    }
+
+def known_fake_tile_match(meta: dict, match: dict) -> dict:
+    return {
+        "id": meta.get("id"),
+        "url": meta.get("original_url"),
+        "meta": {
+            "date": meta.get("original_date"),
+            "desc": meta.get("desc"),
+            "similarity": f"{match['votes']} matching regions"
+        },
+        "match": "tiles",
+        "votes": match["votes"],
+        "score": match["score"],
+        "region": {"query": match["query_region"], "original": match["original_region"]},
+        "warning": f"⚠️ Part of this image matches a known {meta.get('desc') or 'recycled image'}"
+                   " (cropped, captioned or watermarked copy)"
     }
-    
-    try:
-        img = Image.open(io.BytesIO(img_bytes))
-        exif = img._getexif()
-        
-        if exif:
-            analysis["has_exif"] = True
-            # Check for editing software
-            if 306 in exif:  # DateTime
-                analysis["creation_date"] = exif[306]
-            if 305 in exif:  # Software
-                analysis["software"] = exif[305]
-                if any(editor in str(exif[305]).lower() for editor in ['photoshop', 'gimp', 'lightroom']):
-                    analysis["is_edited"] = True
-                    analysis["warnings"].append("Image appears to have been edited with photo editing software")
-        else:
-            analysis["warnings"].append("No EXIF metadata found - image may have been stripped or is a screenshot")
-    except Exception as e:
-        analysis["warnings"].append(f"Could not analyze metadata: {str(e)}")
-    
-    return analysis
 
 def check_against_known_fakes(phash: str, threshold: int = 10):
-    """Check if image matches known fake/viral images"""
-    matches = []
-    
+    """Check if image matches known fake/viral images (nearest first)"""
     if not phash:
-        return matches
-    
-    try:
-        query_hash = imagehash.hex_to_hash(phash)
-        
-        for known_phash, meta in known_fake_images.items():
-            try:
-                known_hash = imagehash.hex_to_hash(known_phash)
-                distance = query_hash - known_hash
-                
-                if distance <= threshold:
-                    matches.append({
-                        "id": meta.get("id"),
-                        "url": meta.get("original_url"),
-                        "meta": {
-                            "date": meta.get("original_date"),
-                            "desc": meta.get("desc"),
-                            "similarity": f"{100 - (distance * 10)}%"
-                        },
-                        "distance": distance,
-                        "warning": f"⚠️ This image is similar to a known {meta.get('desc', 'recycled image')}"
-                    })
-            except:
+        return []
+    query = hex_to_int(phash)
+    if query is None:
+        print(f"[ImageChecker] Error checking against known fakes: invalid phash {phash}")
+        return []
+    return [
+        known_fake_match(meta, distance)
+        for meta, distance in known_fakes.within(query, threshold)
+    ]
+
+def check_frames_against_known_fakes(frames: List[dict], matches: List[dict], threshold: int = 10):
+    """
+    Known fakes similar to later scenes of an animation, other than those already matched
+    Frames are checked in order and the search stops at the first strong match.
+    """
+    if any(match.get("distance", threshold + 1) <= FRAME_STRONG_MATCH_BITS for match in matches):
+        return []
+    seen = {match["id"] for match in matches}
+    found = []
+    for frame in frames or []:
+        frame_matches = check_against_known_fakes(frame["phash"], threshold)
+        for match in frame_matches:
+            if match["id"] in seen:
                 continue
-    except Exception as e:
-        print(f"[ImageChecker] Error checking against known fakes: {e}")
-    
-    return matches
+            seen.add(match["id"])
+            match["match"] = "frame"
+            match["frame"] = frame["index"]
+            match["warning"] = (f"⚠️ Frame {frame['index']} of this image is similar to a known "
+                                f"{match['meta']['desc'] or 'recycled image'}")
+            found.append(match)
+        if any(match["distance"] <= FRAME_STRONG_MATCH_BITS for match in frame_matches):
+            break
+    return found
+
+async def check_tiles_against_known_fakes(tiles, global_matches: List[dict]):
+    """Known fakes sharing a region with the image, other than those it already matched whole"""
+    if tiles is None or not len(tiles):
+        return []
+    matched = {match["id"] for match in global_matches}
+    async with TILE_MATCH_SLOTS:
+        found = await asyncio.to_thread(known_fakes.tile_matches, tiles)
+    return [known_fake_tile_match(meta, match) for meta, match in found if meta.get("id") not in matched]
 
 class CheckRequest(BaseModel):
     urls: List[str] = []
 
 @app.post("/check")
-async def check(request: CheckRequest = None, urls: List[str] = [], file: UploadFile = File(None)):
+async def check(http_request: Request, urls: List[str] = Query([]), file: UploadFile = File(None)):
     """
     Check images for:
     1. Known fake/recycled images
     2. Metadata analysis (editing, date)
     3. Perceptual hash matching
     """
+    if CPU_POOL.saturated():
+        raise saturated_response("Image checker is busy, retry shortly")
     results = {
         "matches": [],
         "analysis": [],
         "warnings": []
     }
     
-    # Get URLs from request body or parameter
+    # Get URLs from request body or parameter. The file upload makes FastAPI expect a
+    # form body, so a JSON body ({"urls": [...]}, as the backend sends) is read here
+    request = None
+    if http_request.headers.get("content-type", "").startswith("application/json"):
+        try:
+            request = CheckRequest(**await http_request.json())
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Invalid JSON body: {e}")
     url_list = []
     if request and request.urls:
         url_list = request.urls
@@ -146,63 +259,74 @@ async def check(request: CheckRequest = None, urls: List[str] = [], file: Upload
     if file:
         try:
             img_bytes = await file.read()
-            phash = compute_phash_bytes(img_bytes)
-            md5 = compute_md5(img_bytes)
-            
-            # Check cache
-            if md5 in image_cache:
-                return image_cache[md5]
             
-            # Analyze metadata
-            metadata_analysis = analyze_image_metadata(img_bytes)
+            # Decode once for metadata and hashes (cached by content digest)
+            image = await analyze_bytes(img_bytes, QUERY_TILES)
+            metadata_analysis = image["metadata"]
+            phash = image["hashes"]["phash"] if image["hashes"] else None
             results["analysis"].append({
                 "source": "uploaded_file",
-                "metadata": metadata_analysis
+                "hashes": image["hashes"],
+                "frame_count": image["frame_count"],
+                "frames": image["frames"],
+                "metadata": metadata_analysis,
+                "cache": image["cache"]
             })
             
             if metadata_analysis["warnings"]:
                 results["warnings"].extend(metadata_analysis["warnings"])
             
-            # Check against known fakes
+            # Check against known fakes: whole image, later animation scenes, then regions
             fake_matches = check_against_known_fakes(phash)
+            fake_matches += check_frames_against_known_fakes(image["frames"], fake_matches)
+            fake_matches += await check_tiles_against_known_fakes(image.get("tiles"), fake_matches)
             results["matches"].extend(fake_matches)
             
-            # Cache result
-            image_cache[md5] = results
-            
+        except PoolSaturated as e:
+            raise saturated_response(str(e))
         except Exception as e:
             results["warnings"].append(f"Error processing uploaded file: {str(e)}")
     
-    # Process URLs
+    # Process URLs (fetched and analysed concurrently under one deadline, once per unique URL)
+    if url_list:
+        print(f"[ImageChecker] Checking {len(url_list)} URLs")
+    unique_urls = list(dict.fromkeys(url_list))
+    analyses = dict(await run_with_deadline(
+        unique_urls, [analyze_url(url, QUERY_TILES) for url in unique_urls], CHECK_DEADLINE_SECONDS))
+    saturated = next((e for e in analyses.values() if isinstance(e, PoolSaturated)), None)
+    if saturated is not None:
+        raise saturated_response(str(saturated))
     for url in url_list:
         try:
-            print(f"[ImageChecker] Checking URL: {url}")
-            response = requests.get(url, headers=HEADERS, timeout=10)
+            image = analyses[url]
+            if isinstance(image, Exception):
+                raise image
+            metadata_analysis = image["metadata"]
+            phash = image["hashes"]["phash"] if image["hashes"] else None
+            results["analysis"].append({
+                "source": url,
+                "phash": phash,
+                "hashes": image["hashes"],
+                "frame_count": image["frame_count"],
+                "frames": image["frames"],
+                "metadata": metadata_analysis,
+                "cache": image["cache"]
+            })
+            
+            if metadata_analysis["warnings"]:
+                for warning in metadata_analysis["warnings"]:
+                    results["warnings"].append(f"{url}: {warning}")
+            
+            # Check against known fakes: whole image, later animation scenes, then regions
+            fake_matches = check_against_known_fakes(phash)
+            fake_matches += check_frames_against_known_fakes(image["frames"], fake_matches)
+            fake_matches += await check_tiles_against_known_fakes(image.get("tiles"), fake_matches)
+            for match in fake_matches:
+                match["checked_url"] = url
+            results["matches"].extend(fake_matches)
             
-            if response.status_code == 200:
-                img_bytes = response.content
-                phash = compute_phash_bytes(img_bytes)
-                
-                # Analyze metadata
-                metadata_analysis = analyze_image_metadata(img_bytes)
-                results["analysis"].append({
-                    "source": url,
-                    "phash": phash,
-                    "metadata": metadata_analysis
-                })
-                
-                if metadata_analysis["warnings"]:
-                    for warning in metadata_analysis["warnings"]:
-                        results["warnings"].append(f"{url}: {warning}")
-                
-                # Check against known fakes
-                fake_matches = check_against_known_fakes(phash)
-                for match in fake_matches:
-                    match["checked_url"] = url
-                results["matches"].extend(fake_matches)
-                
         except Exception as e:
-            results["warnings"].append(f"Error checking {url}: {str(e)}")
+            results["warnings"].append(f"Error checking {url}: {str(e) or type(e).__name__}")
     
     print(f"[ImageChecker] Checked {len(url_list)} URLs, found {len(results['matches'])} matches")
     
@@ -212,26 +336,125 @@ async def check(request: CheckRequest = None, urls: List[str] = [], file: Upload
 async def add_known_fake(image_url: str, original_date: str, description: str):
     """Add an image to the known fake images database"""
     try:
-        response = requests.get(image_url, headers=HEADERS, timeout=10)
-        if response.status_code == 200:
-            phash = compute_phash_bytes(response.content)
-            if phash:
-                known_fake_images[phash] = {
-                    "id": f"fake_{len(known_fake_images) + 1}",
-                    "original_date": original_date,
-                    "desc": description,
-                    "original_url": image_url
-                }
-                return {"success": True, "phash": phash, "message": "Image added to known fakes database"}
-        return {"success": False, "error": "Could not fetch image"}
+        image = await analyze_url(image_url, INDEX_TILES, background=True)
+        phash = image["hashes"]["phash"] if image["hashes"] else None
+        if phash:
+            added, _ = await asyncio.to_thread(known_fakes.add_many, [(phash, hex_to_int(phash), {
+                "original_date": original_date,
+                "desc": description,
+                "original_url": image_url,
+                "tiles": image.get("tiles")
+            })])
+            if not added:
+                return {"success": True, "phash": phash, "message": "Image already in known fakes database"}
+            return {"success": True, "phash": phash, "message": "Image added to known fakes database"}
+        return {"success": False, "error": "Could not decode image"}
     except Exception as e:
-        return {"success": False, "error": str(e)}
+        return {"success": False, "error": str(e) or type(e).__name__}
+
+def parse_import_body(body: bytes, content_type: str):
+    """(line number, record dict) pairs from an NDJSON or CSV (with header row) body"""
+    text = body.decode("utf-8-sig")
+    if "csv" in content_type or not text.lstrip().startswith("{"):
+        for line, row in enumerate(csv.DictReader(io.StringIO(text)), start=2):
+            yield line, row
+        return
+    for line, raw in enumerate(text.splitlines(), start=1):
+        if not raw.strip():
+            continue
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            yield line, e
+            continue
+        yield line, record if isinstance(record, dict) else ValueError("expected a JSON object")
+
+async def fetch_known_fake_hashes(image_url: str):
+    """(phash, index tile records) for an image to be stored as a known fake"""
+    image = await analyze_url(image_url, INDEX_TILES, background=True)
+    if not image["hashes"]:
+        raise ValueError("could not decode image")
+    return image["hashes"]["phash"], image.get("tiles")
+
+@app.post("/known-fakes/import")
+async def import_known_fakes(request: Request):
+    """
+    Bulk-append known fakes from NDJSON or CSV
+    Fields: phash (16 hex digits) or image_url/original_url to download and hash,
+    plus original_date and desc/description. Existing hashes are skipped. Only
+    downloaded images get tile hashes, so fakes given by phash alone are matched
+    on the whole image only.
+    """
+    records = []
+    errors = []
+    for line, record in parse_import_body(await request.body(), request.headers.get("content-type", "")):
+        if isinstance(record, Exception):
+            errors.append({"line": line, "error": str(record)})
+            continue
+        if len(records) >= IMPORT_MAX_RECORDS:
+            raise HTTPException(status_code=413, detail=f"import is limited to {IMPORT_MAX_RECORDS} records")
+        records.append((line, record))
+
+    semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
+
+    async def resolve(line: int, record: dict):
+        url = (record.get("original_url") or record.get("image_url") or "").strip() or None
+        phash = (record.get("phash") or "").strip().lower()
+        tiles = None
+        try:
+            if not phash:
+                if not url:
+                    raise ValueError("record needs a phash or an image_url")
+                async with semaphore:
+                    phash, tiles = await fetch_known_fake_hashes(url)
+            value = hex_to_int(phash)
+            if value is None:
+                raise ValueError(f"invalid phash: {phash}")
+        except Exception as e:
+            errors.append({"line": line, "error": str(e)})
+            return None
+        return phash, value, {
+            "original_date": record.get("original_date"),
+            "desc": record.get("desc") or record.get("description"),
+            "original_url": url,
+            "tiles": tiles,
+        }
+
+    resolved = await asyncio.gather(*(resolve(line, record) for line, record in records))
+    entries = [entry for entry in resolved if entry is not None]
+    added, duplicates = await asyncio.to_thread(known_fakes.add_many, entries)
+    print(f"[ImageChecker] Imported {len(added)} known fakes ({duplicates} duplicates, {len(errors)} errors)")
+    return {
+        "added": len(added),
+        "duplicates": duplicates,
+        "errors": sorted(errors, key=lambda error: error["line"]),
+        "total": len(known_fakes),
+    }
+
+@app.get("/known-fakes/nearest")
+async def nearest_known_fakes(phash: str, k: int = Query(5, ge=1, le=100)):
+    """The k known fakes closest to a perceptual hash, nearest first"""
+    query = hex_to_int(phash)
+    if query is None:
+        raise HTTPException(status_code=400, detail="phash must be 16 hex digits")
+    return {
+        "phash": phash,
+        "matches": [
+            known_fake_match(meta, distance)
+            for meta, distance in known_fakes.nearest(query, k)
+        ]
+    }
 
 @app.get("/health")
 async def health():
     return {
         "status": "healthy",
         "service": "image-checker",
-        "known_fakes_count": len(known_fake_images),
-        "cache_size": len(image_cache)
+        "known_fakes_count": len(known_fakes),
+        "known_fakes_index": known_fakes.stats(),
+        "tile_matching": TILE_MATCHING,
+        "downloads": FETCHER.stats(),
+        "cache_size": len(IMAGE_CACHE.by_content),
+        "image_cache": IMAGE_CACHE.stats(),
+        "cpu_pool": CPU_POOL.stats()
     }
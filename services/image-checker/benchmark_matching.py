@@ -0,0 +1,439 @@
+"""
+Offline accuracy and latency benchmark for image-checker matching.
+
+Generates synthetic photos (1/f noise textures with solid shapes, which have the
+spectrum of natural images), and makes WhatsApp-style copies of each: JPEG
+recompression at several qualities, downscaling, crops, caption bars, text
+overlays and screenshot borders. The originals are loaded into a fresh
+known-fakes store at each requested size. The store is padded with random
+filler hashes, so sizes up to 1M do not need a million decoded images. Each
+filler also gets the index tiles of one of a pool of other generated photos,
+with a few bits flipped per tile. Real tile hashes are far from uniform, so
+random ones would understate how many candidates a query window meets.
+
+Every copy, plus photos that are not in the store, is then checked through
+POST /check on the ASGI app in-process. Image URLs are served from memory by an
+httpx mock transport, so nothing touches the network. Reported per size:
+- recall and precision of the global pHash at each Hamming threshold
+- recall and precision of /check as deployed, and of its tile matches alone
+  (which only name fakes the global hash did not already match)
+- p50/p99 /check latency one request at a time, with the image cache cleared
+- throughput with --concurrency requests in flight, and peak RSS
+
+Results are written as JSON so runs can be compared across commits.
+
+Usage (from services/image-checker):
+    python benchmark_matching.py --sizes 1000,100000 --originals 50 --output matching-bench.json
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import httpx
+import numpy as np
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+from tile_index import TILE_DTYPE
+
+FILLER_BATCH = 50000
+FILLER_TILE_FLIPS = 6  # bits flipped in each pool tile hash when it is reused for a filler
+FILLER_SEED_OFFSET = 500000  # filler pool photos are generated from seeds past the queried ones
+
+
+def synthetic_photo(seed: int, width: int, height: int) -> Image.Image:
+    """Deterministic photo-like RGB image: 1/f noise per channel, colour-mixed, plus shapes"""
+    rng = np.random.default_rng(seed)
+    fy = np.fft.fftfreq(height)[:, None]
+    fx = np.fft.rfftfreq(width)[None, :]
+    falloff = np.hypot(fx, fy)
+    falloff[0, 0] = 1
+    channels = []
+    for _ in range(3):
+        spectrum = (rng.normal(size=falloff.shape) + 1j * rng.normal(size=falloff.shape)) / falloff
+        channel = np.fft.irfft2(spectrum, s=(height, width))
+        channels.append((channel - channel.mean()) / channel.std())
+    mix = rng.normal(size=(3, 3)) * 0.5 + np.eye(3)
+    pixels = np.tensordot(mix, np.stack(channels), 1).transpose(1, 2, 0)
+    img = Image.fromarray(np.clip(128 + pixels * 40, 0, 255).astype(np.uint8))
+    draw = ImageDraw.Draw(img)
+    for _ in range(15):
+        x, y = rng.integers(0, width), rng.integers(0, height)
+        r = rng.integers(width // 40, width // 8)
+        box = [x - r, y - r, x + r, y + int(r * rng.uniform(0.5, 1.5))]
+        fill = tuple(int(v) for v in rng.integers(0, 255, 3))
+        (draw.ellipse if rng.random() < 0.5 else draw.rectangle)(box, fill=fill)
+    return img.filter(ImageFilter.GaussianBlur(1))
+
+
+def jpeg(img: Image.Image, quality: int) -> bytes:
+    out = io.BytesIO()
+    img.convert("RGB").save(out, "JPEG", quality=quality)
+    return out.getvalue()
+
+
+def resized(img: Image.Image, scale: float) -> Image.Image:
+    return img.resize((round(img.width * scale), round(img.height * scale)), Image.LANCZOS)
+
+
+def cropped(img: Image.Image, keep: float, rng: np.random.Generator) -> Image.Image:
+    """Crop to keep x keep of the image at a random offset"""
+    w, h = round(img.width * keep), round(img.height * keep)
+    x, y = rng.integers(0, img.width - w + 1), rng.integers(0, img.height - h + 1)
+    return img.crop((x, y, x + w, y + h))
+
+
+def font(size: int):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 only has the fixed bitmap font
+        return ImageFont.load_default()
+
+
+def captioned(img: Image.Image) -> Image.Image:
+    """News-channel style caption bar over the bottom fifth"""
+    img = img.copy()
+    draw = ImageDraw.Draw(img)
+    top = round(img.height * 0.8)
+    draw.rectangle([0, top, img.width, img.height], fill=(180, 0, 0))
+    draw.text((img.width // 30, top + img.height // 40), "BREAKING: MUMBAI FLOODS TODAY",
+              fill=(255, 255, 255), font=font(img.height // 12))
+    return img
+
+
+def text_overlay(img: Image.Image) -> Image.Image:
+    """Forwarded-meme style text across the middle"""
+    img = img.copy()
+    draw = ImageDraw.Draw(img)
+    draw.text((img.width // 12, img.height * 2 // 5), "SHARE BEFORE IT IS DELETED",
+              fill=(255, 255, 0), font=font(img.height // 10), stroke_width=3, stroke_fill=(0, 0, 0))
+    return img
+
+
+def screenshot(img: Image.Image) -> Image.Image:
+    """Phone screenshot: image letterboxed on a tall canvas with a status bar"""
+    width = img.width
+    canvas = Image.new("RGB", (width, round(width * 2.1)), (255, 255, 255))
+    top = (canvas.height - img.height) // 2
+    canvas.paste(img, (0, top))
+    draw = ImageDraw.Draw(canvas)
+    draw.rectangle([0, 0, width, canvas.height // 25], fill=(20, 20, 20))
+    draw.text((width // 20, canvas.height // 120), "9:41", fill=(255, 255, 255), font=font(width // 25))
+    return canvas
+
+
+# name -> (image, rng) -> bytes as the image would arrive after being forwarded
+TRANSFORMS: Dict[str, Callable[[Image.Image, np.random.Generator], bytes]] = {
+    "jpeg_q85": lambda img, rng: jpeg(img, 85),
+    "jpeg_q60": lambda img, rng: jpeg(img, 60),
+    "jpeg_q35": lambda img, rng: jpeg(img, 35),
+    "resize_50": lambda img, rng: jpeg(resized(img, 0.5), 75),
+    "crop_90": lambda img, rng: jpeg(cropped(img, 0.9, rng), 75),
+    "crop_70": lambda img, rng: jpeg(cropped(img, 0.7, rng), 75),
+    "caption": lambda img, rng: jpeg(captioned(img), 75),
+    "text_overlay": lambda img, rng: jpeg(text_overlay(img), 75),
+    "screenshot": lambda img, rng: jpeg(screenshot(img), 80),
+    "crop_caption_resize": lambda img, rng: jpeg(resized(captioned(cropped(img, 0.85, rng)), 0.6), 60),
+}
+# Photos that are not in the store arrive forwarded too
+NEGATIVE_TRANSFORM = "resize_50"
+
+
+class Query(NamedTuple):
+    url: str
+    transform: str
+    original: Optional[int]  # index into the originals, None for photos not in the store
+
+
+def build_fixtures(originals: int, negatives: int, width: int, height: int, seed: int):
+    """(original JPEG bytes, url path -> served bytes, queries)"""
+    rng = np.random.default_rng(seed)
+    sources, served, queries = [], {}, []
+    for i in range(originals):
+        img = synthetic_photo(seed * 1000003 + i, width, height)
+        sources.append(jpeg(img, 92))
+        for name, transform in TRANSFORMS.items():
+            path = f"/{name}/{i}.jpg"
+            served[path] = transform(img, rng)
+            queries.append(Query(f"http://fixtures.local{path}", name, i))
+    for i in range(negatives):
+        img = synthetic_photo(seed * 1000003 + originals + i, width, height)
+        path = f"/negative/{i}.jpg"
+        served[path] = TRANSFORMS[NEGATIVE_TRANSFORM](img, rng)
+        queries.append(Query(f"http://fixtures.local{path}", "negative", None))
+    return sources, served, queries
+
+
+def fixture_transport(served: Dict[str, bytes]) -> httpx.MockTransport:
+    def serve(request: httpx.Request) -> httpx.Response:
+        body = served.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=body, headers={"content-type": "image/jpeg"})
+    return httpx.MockTransport(serve)
+
+
+def filler_tile_pool(count: int, width: int, height: int, seed: int) -> List[np.ndarray]:
+    """index_tiles() records of generated photos that are neither stored nor queried"""
+    from image_analysis import analyze_image
+
+    return [analyze_image(jpeg(synthetic_photo(seed * 1000003 + FILLER_SEED_OFFSET + i, width, height), 92),
+                          "index")["tiles"] for i in range(count)]
+
+
+def load_store(store, originals: List[dict], size: int, tile_pool: List[np.ndarray],
+               filler_tiles: int, seed: int) -> List[str]:
+    """Add the analysed originals and fillers up to size; fake ids of the originals"""
+    rng = np.random.default_rng(seed)
+    rows, _ = store.add_many(
+        (a["hashes"]["phash"], int(a["hashes"]["phash"], 16),
+         {"desc": f"benchmark original {i}", "tiles": a.get("tiles")})
+        for i, a in enumerate(originals))
+    fillers = size - len(originals)
+    while fillers > 0:
+        batch = rng.integers(0, 2 ** 64, size=min(FILLER_BATCH, fillers), dtype=np.uint64)
+        store.add_many((f"{value:016x}", value,
+                        {"desc": "filler", "tiles": perturbed_tiles(rng, tile_pool, filler_tiles)})
+                       for value in batch.tolist())
+        fillers -= len(batch)
+    return [f"fake_{row + 1}" for row in rows]
+
+
+def perturbed_tiles(rng: np.random.Generator, pool: List[np.ndarray], count: int) -> Optional[np.ndarray]:
+    """Up to count tiles of a random pool photo, FILLER_TILE_FLIPS random bits flipped in each hash"""
+    if not count or not pool:
+        return None
+    tiles = np.array(pool[rng.integers(len(pool))][:count], dtype=TILE_DTYPE)
+    bits = rng.integers(0, 64, size=(len(tiles), FILLER_TILE_FLIPS), dtype=np.uint64)
+    tiles["hash"] ^= np.bitwise_or.reduce(np.uint64(1) << bits, axis=1)
+    return tiles
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_stats(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {}
+    return {
+        "mean_ms": round(statistics.fmean(latencies), 2),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+    }
+
+
+async def run_checks(client: httpx.AsyncClient, queries: List[Query], concurrency: int):
+    """([(query, response JSON or None, latency ms)], wall seconds) with at most concurrency in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def check(query: Query):
+        async with semaphore:
+            t0 = time.perf_counter()
+            response = await client.post("/check", json={"urls": [query.url]})
+            latency = (time.perf_counter() - t0) * 1000
+        return query, response.json() if response.status_code == 200 else None, latency
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(check(query) for query in queries))
+    return results, time.perf_counter() - start
+
+
+def accuracy(queries: List[Query], predictions: List[set], expected_ids: List[str]) -> Dict:
+    """Recall over copies of stored originals, precision over every predicted match"""
+    positives = [q.original is not None for q in queries]
+    true_positive = sum(1 for q, found in zip(queries, predictions)
+                        if q.original is not None and expected_ids[q.original] in found)
+    predicted = sum(len(found) for found in predictions)
+    negatives_flagged = sum(1 for q, found in zip(queries, predictions) if q.original is None and found)
+    per_transform = {}
+    for name in TRANSFORMS:
+        mine = [(q, found) for q, found in zip(queries, predictions) if q.transform == name]
+        if mine:
+            hits = sum(1 for q, found in mine if expected_ids[q.original] in found)
+            per_transform[name] = round(hits / len(mine), 4)
+    return {
+        "recall": round(true_positive / max(1, sum(positives)), 4),
+        "precision": round(true_positive / predicted, 4) if predicted else None,
+        "negatives_flagged": round(negatives_flagged / max(1, len(queries) - sum(positives)), 4),
+        "recall_by_transform": per_transform,
+    }
+
+
+async def bench_size(app_module, directory: str, size: int, originals: List[dict],
+                     queries: List[Query], tile_pool: List[np.ndarray], args) -> Dict:
+    from known_fakes_store import KnownFakesStore
+
+    store_dir = os.path.join(directory, f"known_fakes_{size}")
+    store = KnownFakesStore(store_dir, tile_matching=args.tile_matching)
+    store.open()
+    t0 = time.perf_counter()
+    expected_ids = load_store(store, originals, size, tile_pool, args.filler_tiles, args.seed)
+    load_seconds = time.perf_counter() - t0
+    app_module.known_fakes = store
+    app_module.IMAGE_CACHE.clear()
+
+    transport = httpx.ASGITransport(app=app_module.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://image-checker",
+                                 timeout=120) as client:
+        checked, _ = await run_checks(client, queries, concurrency=1)
+        throughput = None
+        if args.concurrency > 0:
+            app_module.IMAGE_CACHE.clear()
+            loaded, wall = await run_checks(client, queries, args.concurrency)
+            completed = [latency for _, body, latency in loaded if body is not None]
+            throughput = dict(
+                latency_stats(completed),
+                concurrency=args.concurrency,
+                checks_per_second=round(len(completed) / wall, 2),
+                rejected=len(loaded) - len(completed),
+            )
+
+    failed = sum(1 for _, body, _ in checked if body is None)
+    phashes = [next((a.get("phash") for a in body["analysis"]), None) if body else None
+               for _, body, _ in checked]
+    max_threshold = max(args.thresholds)
+    nearby = [store.within(int(phash, 16), max_threshold) if phash else [] for phash in phashes]
+    by_threshold = {
+        str(threshold): accuracy(queries, [{meta["id"] for meta, distance in found if distance <= threshold}
+                                           for found in nearby], expected_ids)
+        for threshold in args.thresholds
+    }
+    tile_predictions = [{m["id"] for m in body["matches"] if m.get("match") == "tiles"} if body else set()
+                        for _, body, _ in checked]
+    service_predictions = [{m["id"] for m in body["matches"]} if body else set() for _, body, _ in checked]
+    result = {
+        "known_fakes": len(store),
+        "tiles": len(store.tile_index),
+        "load_seconds": round(load_seconds, 2),
+        "queries": len(queries),
+        "failed_checks": failed,
+        "global_phash": by_threshold,
+        "tiles_beyond_global": accuracy(queries, tile_predictions, expected_ids),
+        "check_endpoint": accuracy(queries, service_predictions, expected_ids),
+        "latency": latency_stats([latency for _, body, latency in checked if body is not None]),
+        "throughput": throughput,
+        # Peak for the whole run so far, so it only grows from one size to the next
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+    }
+    if not args.keep_stores:
+        shutil.rmtree(store_dir, ignore_errors=True)
+    return result
+
+
+async def run(args) -> Dict:
+    directory = tempfile.mkdtemp(prefix="image-checker-bench-")
+    # app.py opens its store at startup, so point it somewhere disposable before importing
+    os.environ["KNOWN_FAKES_DIR"] = os.path.join(directory, "startup")
+    os.environ["TILE_MATCHING"] = "on" if args.tile_matching else "off"
+    import app as app_module
+    from image_analysis import analyze_image
+
+    print(f"Generating {args.originals} originals x {len(TRANSFORMS)} transforms "
+          f"+ {args.negatives} negatives ({args.width}x{args.height})")
+    sources, served, queries = build_fixtures(args.originals, args.negatives,
+                                              args.width, args.height, args.seed)
+    originals = [analyze_image(source, "index" if args.tile_matching else None) for source in sources]
+    tile_pool = []
+    if args.filler_tiles and args.tile_matching:
+        print(f"Generating {args.filler_photos} photos for filler tiles")
+        tile_pool = filler_tile_pool(args.filler_photos, args.width, args.height, args.seed)
+
+    results = {}
+    try:
+        async with app_module.app.router.lifespan_context(app_module.app):
+            await app_module.FETCHER.client.aclose()
+            app_module.FETCHER.client = httpx.AsyncClient(transport=fixture_transport(served))
+            for size in args.sizes:
+                print(f"Known fakes: {size}")
+                results[str(size)] = await bench_size(app_module, directory, size, originals, queries,
+                                                      tile_pool, args)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline image matching accuracy and latency benchmark")
+    parser.add_argument("--sizes", type=int_list, default=[1000, 10000],
+                        help="comma-separated known-fakes database sizes (1k to 1M)")
+    parser.add_argument("--originals", type=int, default=50, help="stored photos that get transformed copies")
+    parser.add_argument("--negatives", type=int, default=50, help="checked photos that are not stored")
+    parser.add_argument("--thresholds", type=int_list, default=[4, 6, 8, 10, 12, 14],
+                        help="global pHash Hamming thresholds to score")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="requests in flight for the throughput pass (0 skips it)")
+    parser.add_argument("--filler-tiles", type=int, default=125,
+                        help="index tiles per filler (about what a real photo gets; "
+                             "0 loads hashes only, e.g. for 1M-entry sweeps)")
+    parser.add_argument("--filler-photos", type=int, default=100,
+                        help="generated photos whose perturbed tiles are shared out among fillers")
+    parser.add_argument("--no-tile-matching", dest="tile_matching", action="store_false",
+                        help="check and store as with TILE_MATCHING=off (the service default)")
+    parser.add_argument("--width", type=int, default=960)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--keep-stores", action="store_true", help="leave the generated stores on disk")
+    parser.add_argument("--output", default="matching-benchmark-results.json")
+    args = parser.parse_args()
+    if min(args.sizes) < args.originals:
+        parser.error("every size must be at least --originals")
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "sizes": asyncio.run(run(args)),
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    for size, result in results["sizes"].items():
+        print(f"{size:>8s} known fakes  /check p50 {result['latency']['p50_ms']:.0f} ms  "
+              f"p99 {result['latency']['p99_ms']:.0f} ms"
+              + (f"  {result['throughput']['checks_per_second']:.1f} checks/s"
+                 if result["throughput"] else "")
+              + f"  peak RSS {result['max_rss_mb']} MB")
+        for threshold, scores in result["global_phash"].items():
+            print(f"{'':10s} pHash <= {threshold:>2s}  recall {scores['recall']:.3f}  "
+                  f"precision {scores['precision'] if scores['precision'] is not None else '-'}")
+        for name in ("tiles_beyond_global", "check_endpoint"):
+            scores = result[name]
+            print(f"{'':10s} {name:19s} recall {scores['recall']:.3f}  "
+                  f"precision {scores['precision'] if scores['precision'] is not None else '-'}")
+    print(f"Results written to {args.output}")
+    failed = any(result["failed_checks"] for result in results["sizes"].values())
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
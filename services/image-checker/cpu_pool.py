@@ -0,0 +1,175 @@
+"""
+Process pool for CPU-bound image work, kept off the event loop.
+
+Image decoding and hashing hold the GIL, so threads would not help. Tasks run
+in a ProcessPoolExecutor sized to the CPUs the container may actually use,
+which is the cgroup quota and not the host's core count. Admission is bounded:
+once max_pending tasks are queued or running, new work is refused with
+PoolSaturated so the caller can answer 503, rather than letting latency grow
+without limit. Background work (bulk imports, admin adds) is not refused but
+waits its turn, and at most max_background such tasks hold slots at once, so
+interactive requests always have the rest. Only as many tasks as there are
+workers are handed to the executor at a time, and a task's timeout starts then,
+so time spent queued never counts against it. A task that overruns its timeout
+cannot be interrupted inside its worker, so the pool is recycled: its processes
+are killed, and the other tasks running on it fail with BrokenProcessPool. Workers refuse images above
+max_pixels before decoding them, which stops decompression bombs.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from PIL import Image
+
+
+class PoolSaturated(Exception):
+    """Too many CPU tasks queued; retry later"""
+
+
+class TaskTimeout(Exception):
+    pass
+
+
+def container_cpus() -> int:
+    """CPUs this process may use: cgroup CPU quota if set, else the scheduler affinity"""
+    available = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:  # cgroup v2: "<quota> <period>" or "max <period>"
+            limit, period = f.read().split()
+            if limit != "max":
+                quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:  # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        available = min(available, max(1, int(quota)))
+    return max(1, available)
+
+
+def _init_worker(max_pixels: int):
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    # Pillow only warns between 1x and 2x the limit; refuse those images too
+    warnings.simplefilter("error", Image.DecompressionBombWarning)
+
+
+def _warm_up(module: str):
+    __import__(module)
+
+
+class CpuPool:
+    """Bounded-admission process pool with per-task timeouts"""
+
+    def __init__(self, workers: int, max_pending: int, task_timeout: float, max_pixels: int,
+                 max_background: Optional[int] = None):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_background = max(1, max_pending // 2 if max_background is None else max_background)
+        self._background = asyncio.Semaphore(self.max_background)
+        self.background_waiting = 0
+        # Tasks handed to the executor: no more than it has workers, so a task's timeout
+        # only starts once a worker is free to run it
+        self._running = asyncio.Semaphore(workers)
+        self.task_timeout = task_timeout
+        self.max_pixels = max_pixels
+        self._executor = None
+        self.preload = ""
+        self.pending = 0
+        self.counts = {"completed": 0, "failed": 0, "timeouts": 0, "rejected": 0, "recycled": 0}
+
+    def start(self, preload: str = ""):
+        """Start the workers, importing preload in each so the first request is not slowed"""
+        # forkserver: never fork the multi-threaded server process itself
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context(method),
+            initializer=_init_worker, initargs=(self.max_pixels,),
+        )
+        self.preload = preload
+        if preload:
+            for _ in range(self.workers):
+                self._executor.submit(_warm_up, preload)
+
+    def saturated(self) -> bool:
+        return self.pending >= self.max_pending
+
+    async def run(self, fn: Callable[..., Any], *args, background: bool = False) -> Any:
+        """
+        fn(*args) in a worker process; raises PoolSaturated or TaskTimeout
+        Background tasks wait for one of the max_background slots instead of being refused.
+        """
+        if background:
+            self.background_waiting += 1
+            try:
+                await self._background.acquire()
+            finally:
+                self.background_waiting -= 1
+            try:
+                return await self._submit(fn, *args)
+            finally:
+                self._background.release()
+        if self.saturated():
+            self.counts["rejected"] += 1
+            raise PoolSaturated(f"{self.pending} image tasks pending")
+        return await self._submit(fn, *args)
+
+    async def _submit(self, fn: Callable[..., Any], *args) -> Any:
+        self.pending += 1
+        try:
+            async with self._running:
+                if self._executor is None:
+                    self.start(self.preload)  # recycled while this task waited
+                executor = self._executor
+                future = asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+                result = await asyncio.wait_for(future, self.task_timeout)
+        except asyncio.TimeoutError:
+            self.counts["timeouts"] += 1
+            self._recycle(executor)
+            raise TaskTimeout(f"image processing exceeded {self.task_timeout:.0f}s")
+        except BrokenProcessPool:
+            self.counts["failed"] += 1
+            if executor is self._executor:
+                self._executor = None  # a worker died; start a fresh pool on the next task
+            raise
+        except Exception:
+            self.counts["failed"] += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.counts["completed"] += 1
+        return result
+
+    def _recycle(self, executor: ProcessPoolExecutor):
+        """Replace a pool whose worker is stuck on a task that timed out"""
+        if executor is not self._executor:
+            return  # already replaced by another timed-out task
+        self.counts["recycled"] += 1
+        self._executor = None
+        processes = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.kill()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return dict(self.counts, workers=self.workers, pending=self.pending,
+                    max_pending=self.max_pending, max_background=self.max_background,
+                    background_waiting=self.background_waiting,
+                    task_timeout_seconds=self.task_timeout,
+                    max_pixels=self.max_pixels)
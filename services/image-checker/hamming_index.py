@@ -0,0 +1,188 @@
+"""
+Multi-index hashing (MIH) over 64-bit perceptual hashes.
+
+Each hash is split into NUM_CHUNKS 16-bit chunks. By the pigeonhole principle,
+two hashes within Hamming distance r agree to within floor(r / 4) bits on at
+least one chunk. A radius-r query therefore only looks up the chunk values within
+that small radius of the query's chunks, then verifies the candidates with an
+exact popcount. Results are identical to a linear scan, and the cost grows with
+the number of near candidates rather than with the size of the database.
+
+The tables are sorted NumPy arrays (one argsort per chunk), so an index over a
+million memory-mapped hashes builds in tens of milliseconds. Entries appended
+after the last build sit in a small delta that is always scanned, and the tables
+are rebuilt once the delta grows past rebuild_threshold. Values and tables are
+published together as one snapshot that each query reads once, so a query in
+another thread never pairs one build's tables with another's entry ids.
+"""
+
+from itertools import combinations
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+HASH_BITS = 64
+NUM_CHUNKS = 4
+CHUNK_BITS = HASH_BITS // NUM_CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+# Beyond this per-chunk radius enumerating neighbours costs more than scanning
+MAX_PROBE_RADIUS = 3
+# Distance up to which probing every radius is guaranteed to find all entries
+PROBE_REACH = NUM_CHUNKS * (MAX_PROBE_RADIUS + 1) - 1
+
+
+def hex_to_int(phash: str) -> Optional[int]:
+    """64-bit integer for a 16-hex-digit imagehash string; None for anything else"""
+    if len(phash) != HASH_BITS // 4:
+        return None
+    try:
+        return int(phash, 16)
+    except ValueError:
+        return None
+
+
+def _shell_masks(radius: int) -> np.ndarray:
+    """All CHUNK_BITS-bit masks with exactly radius bits set"""
+    return np.array(
+        [sum(1 << b for b in bits) for bits in combinations(range(CHUNK_BITS), radius)],
+        dtype=np.uint16,
+    )
+
+
+SHELL_MASKS = [_shell_masks(r) for r in range(MAX_PROBE_RADIUS + 1)]
+
+BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Per-element set-bit count of a uint64 array"""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(values)
+    return BYTE_POPCOUNT[values.view(np.uint8)].reshape(-1, 8).sum(axis=1, dtype=np.uint8)
+
+
+def _ranked(distances: np.ndarray, entries: np.ndarray) -> List[Tuple[int, int]]:
+    """(entry, distance) pairs ordered by distance, then entry"""
+    order = np.lexsort((entries, distances))
+    return list(zip(entries[order].tolist(), distances[order].tolist()))
+
+
+class _Snapshot(NamedTuple):
+    values: np.ndarray
+    built: int                 # entries [0, built) are in the sorted tables
+    tables: List[np.ndarray]   # per chunk: chunk values, ascending
+    orders: List[np.ndarray]   # per chunk: entry ids in that order
+
+    def probe_shell(self, query: int, radius: int) -> np.ndarray:
+        """Built entries whose chunk i differs from the query's in exactly radius bits (any i)"""
+        found = []
+        for i in range(NUM_CHUNKS):
+            probes = np.uint16((query >> (i * CHUNK_BITS)) & CHUNK_MASK) ^ SHELL_MASKS[radius]
+            lo = np.searchsorted(self.tables[i], probes, side="left")
+            hi = np.searchsorted(self.tables[i], probes, side="right")
+            order = self.orders[i]
+            found.extend(order[l:h] for l, h in zip(lo.tolist(), hi.tolist()) if h > l)
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.intp)
+
+    def delta(self) -> np.ndarray:
+        return np.arange(self.built, len(self.values), dtype=np.intp)
+
+    def distances(self, entries: np.ndarray, query: int) -> np.ndarray:
+        return popcount64(self.values[entries] ^ np.uint64(query))
+
+    def scan(self, query: int) -> np.ndarray:
+        return popcount64(self.values ^ np.uint64(query))
+
+
+class HammingIndex:
+    """Threshold and k-nearest queries over a growing uint64 array of hashes"""
+
+    def __init__(self, rebuild_threshold: int = 4096):
+        self.rebuild_threshold = rebuild_threshold
+        # Replaced whole by update(), so a query running in another thread reads
+        # one consistent set of values and tables
+        self._snapshot = _Snapshot(np.zeros(0, dtype=np.uint64), 0, [], [])
+
+    def __len__(self):
+        return len(self._snapshot.values)
+
+    def update(self, values: np.ndarray):
+        """
+        Point the index at values, which must extend the previous array
+        New entries are scanned as a delta until there are enough to rebuild.
+        """
+        current = self._snapshot
+        if len(values) - current.built > self.rebuild_threshold or len(values) < current.built:
+            self._snapshot = self._build(values)
+        else:
+            self._snapshot = current._replace(values=values)
+
+    @staticmethod
+    def _build(values: np.ndarray) -> _Snapshot:
+        tables, orders = [], []
+        for i in range(NUM_CHUNKS):
+            chunk = ((values >> np.uint64(i * CHUNK_BITS)) & np.uint64(CHUNK_MASK)).astype(np.uint16)
+            order = np.argsort(chunk, kind="stable")
+            tables.append(chunk[order])
+            orders.append(order)
+        return _Snapshot(values, len(values), tables, orders)
+
+    def scan(self, query: int) -> np.ndarray:
+        """Distances from query to every entry, by entry id"""
+        return self._snapshot.scan(query)
+
+    def within(self, query: int, threshold: int) -> List[Tuple[int, int]]:
+        """(entry, distance) for every entry within threshold bits, nearest first"""
+        snapshot = self._snapshot
+        probe_radius = threshold // NUM_CHUNKS
+        if probe_radius > MAX_PROBE_RADIUS:
+            distances = snapshot.scan(query)
+            entries = np.flatnonzero(distances <= threshold)
+            return _ranked(distances[entries], entries)
+
+        parts = [snapshot.probe_shell(query, r) for r in range(probe_radius + 1)] if snapshot.built else []
+        entries = np.unique(np.concatenate(parts + [snapshot.delta()]))
+        distances = snapshot.distances(entries, query)
+        keep = distances <= threshold
+        return _ranked(distances[keep], entries[keep])
+
+    def nearest(self, query: int, k: int) -> List[Tuple[int, int]]:
+        """(entry, distance) for the k nearest entries, nearest first (ties by entry id)"""
+        snapshot = self._snapshot
+        n = len(snapshot.values)
+        if k <= 0 or not n:
+            return []
+        k = min(k, n)
+        if snapshot.built:
+            parts = [snapshot.delta()]
+            for radius in range(MAX_PROBE_RADIUS + 1):
+                parts.append(snapshot.probe_shell(query, radius))
+                entries = np.unique(np.concatenate(parts))
+                if len(entries) > n // 8:
+                    break  # a dense neighbourhood: scanning everything is cheaper
+                if len(entries) < k:
+                    continue
+                distances = snapshot.distances(entries, query)
+                kth = int(np.partition(distances, k - 1)[k - 1])
+                # Every entry within NUM_CHUNKS * (radius + 1) - 1 bits has now been seen,
+                # so once the k-th best is inside that bound (ties included) the answer is exact
+                if kth <= NUM_CHUNKS * (radius + 1) - 1:
+                    keep = distances <= kth
+                    return _ranked(distances[keep], entries[keep])[:k]
+                if radius >= 1 and kth > PROBE_REACH:
+                    break  # nothing close enough: deeper probes are unlikely to settle it
+
+        distances = snapshot.scan(query)
+        kth = np.partition(distances, k - 1)[k - 1]
+        entries = np.flatnonzero(distances <= kth)
+        return _ranked(distances[entries], entries)[:k]
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "entries": len(snapshot.values),
+            "indexed": snapshot.built,
+            "delta": len(snapshot.values) - snapshot.built,
+            "chunks": NUM_CHUNKS,
+        }
@@ -0,0 +1,229 @@
+"""
+Single-decode image analysis: EXIF checks plus pHash, dHash, aHash and colour hash.
+
+The image is opened once. EXIF is read from the header before any pixels are
+decoded. JPEGs are then decoded in draft mode, where libjpeg scales by 1/2, 1/4
+or 1/8 while decoding, so a 12-megapixel photo never exists at full size in
+memory. pHash, dHash and aHash are taken from that image converted straight to
+L, as imagehash does, and the colour hash, tiles and scene thumbnails from a
+copy box-reduced by an integer factor. The DCT for pHash is a pair of small
+NumPy matrix products, so scipy is not needed.
+
+For formats other than JPEG (and JPEGs too small for draft mode to scale) the
+pHash, dHash and aHash hex strings are exactly imagehash's, so hashes already
+stored in the known-fakes database stay comparable; test_hash_compat.py checks
+this. Draft decoding of larger JPEGs moves them by up to about 2 bits, as does
+the reduced input for the colour hash. On request, tile hashes for crop-robust
+matching (tile_index.py) are cut from the reduced image.
+
+Animated GIF/WebP/PNG and multi-picture JPEG (MPO) files also get a pHash for
+each later frame that starts a new scene: frames are skipped while their 32x32
+thumbnail stays close to the last hashed frame. Frames are scanned through a
+second decoder, because draft mode on the first frame breaks MPO seeking. The
+number of frames looked at, frames hashed and seconds spent are all capped, so
+a long animation costs no more than a short one.
+"""
+
+import io
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from tile_index import index_tiles, query_tiles
+
+HASH_SIZE = 8
+PHASH_SIZE = HASH_SIZE * 4
+# Decode to at least this many pixels on the short side before the final resizes,
+# so LANCZOS down to 32x32 sees nearly the same input as a full-size decode
+WORKING_SIZE = 256
+COLOR_BINBITS = 3
+
+EXIF_DATETIME = 306
+EXIF_SOFTWARE = 305
+EDITING_SOFTWARE = ('photoshop', 'gimp', 'lightroom')
+
+TILE_MODES = {"index": index_tiles, "query": query_tiles}
+
+FRAME_SCAN_LIMIT = 60        # frames looked at, spread evenly over longer animations
+FRAME_SAMPLE_LIMIT = 12      # frames hashed after the first
+FRAME_SCAN_SECONDS = 1.0
+SCENE_THUMB_SIZE = 32
+SCENE_CHANGE = 12.0          # mean absolute grey-level difference of thumbnails that starts a new scene
+
+
+def _dct_matrix(n: int, rows: int) -> np.ndarray:
+    """First rows of the (unnormalised) DCT-II basis for length n"""
+    k = np.arange(rows)[:, None]
+    x = np.arange(n)[None, :]
+    return np.cos(np.pi * (2 * x + 1) * k / (2 * n))
+
+
+PHASH_DCT = _dct_matrix(PHASH_SIZE, HASH_SIZE)
+
+
+def bits_to_hex(bits: np.ndarray) -> str:
+    """imagehash's hex form: bits row-major, most significant first"""
+    flat = bits.ravel().astype(bool)
+    width = -(-len(flat) // 4)
+    value = int.from_bytes(np.packbits(flat).tobytes(), "big") >> (-len(flat) % 8)
+    return f"{value:0{width}x}"
+
+
+def phash(gray: Image.Image) -> str:
+    pixels = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    # Rounding keeps flat regions' near-zero coefficients from flipping bits on float noise
+    lowfreq = np.round(PHASH_DCT @ pixels @ PHASH_DCT.T, 6)
+    return bits_to_hex(lowfreq > np.median(lowfreq))
+
+
+def dhash(gray: Image.Image) -> str:
+    pixels = np.asarray(gray.resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS))
+    return bits_to_hex(pixels[:, 1:] > pixels[:, :-1])
+
+
+def ahash(gray: Image.Image) -> str:
+    pixels = np.asarray(gray.resize((HASH_SIZE, HASH_SIZE), Image.LANCZOS))
+    return bits_to_hex(pixels > pixels.mean())
+
+
+def colorhash(rgb: Image.Image, gray: Image.Image, binbits: int = COLOR_BINBITS) -> str:
+    """Fractions of black, grey and 6 hue bins at two saturation levels (imagehash.colorhash)"""
+    intensity = np.asarray(gray).ravel()
+    hsv = np.asarray(rgb.convert("HSV")).reshape(-1, 3)
+    h, s = hsv[:, 0], hsv[:, 1]
+    black = intensity < 256 // 8
+    grey = s < 256 // 3
+    colors = ~black & ~grey
+    faint = colors & (s < 256 * 2 // 3)
+    bright = colors & (s > 256 * 2 // 3)
+    hue_bins = np.linspace(0, 255, 6 + 1)
+    maxvalue = 2 ** binbits
+    c = max(1, int(colors.sum()))
+    values = [min(maxvalue - 1, int(black.mean() * maxvalue)),
+              min(maxvalue - 1, int((~black & grey).mean() * maxvalue))]
+    for mask in (faint, bright):
+        counts = np.histogram(h[mask], bins=hue_bins)[0] if mask.any() else np.zeros(6)
+        values.extend(min(maxvalue - 1, int(count * maxvalue / c)) for count in counts)
+    # imagehash's encoding (not plain binary: the middle bit is set for any v >= 2 when binbits=3)
+    bits = [v // 2 ** (binbits - i - 1) % 2 ** (binbits - i) > 0 for v in values for i in range(binbits)]
+    return bits_to_hex(np.array(bits))
+
+
+def empty_metadata() -> dict:
+    return {
+        "has_exif": False,
+        "creation_date": None,
+        "software": None,
+        "is_edited": False,
+        "warnings": []
+    }
+
+
+def exif_analysis(img: Image.Image) -> dict:
+    """Metadata checks from the already-parsed header; no pixel data is decoded"""
+    analysis = empty_metadata()
+    try:
+        exif = img.getexif()
+        if exif:
+            analysis["has_exif"] = True
+            if EXIF_DATETIME in exif:
+                analysis["creation_date"] = exif[EXIF_DATETIME]
+            if EXIF_SOFTWARE in exif:
+                analysis["software"] = exif[EXIF_SOFTWARE]
+                if any(editor in str(exif[EXIF_SOFTWARE]).lower() for editor in EDITING_SOFTWARE):
+                    analysis["is_edited"] = True
+                    analysis["warnings"].append("Image appears to have been edited with photo editing software")
+        else:
+            analysis["warnings"].append("No EXIF metadata found - image may have been stripped or is a screenshot")
+    except Exception as e:
+        analysis["warnings"].append(f"Could not analyze metadata: {str(e)}")
+    return analysis
+
+
+def decoded(img: Image.Image, size: int = WORKING_SIZE) -> Tuple[Image.Image, Image.Image]:
+    """
+    (small RGB image whose short side is still >= size, full-size L image)
+    The L image is converted from img's own mode before any resizing, as imagehash does.
+    """
+    img.draft("RGB", (size, size))  # JPEG: DCT-domain downscale while decoding
+    return _box_reduced(img, size), img.convert("L")
+
+
+def _box_reduced(img: Image.Image, size: int = WORKING_SIZE) -> Image.Image:
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")  # reduce() does not handle palette images
+    factor = min(img.size) // size
+    return img.reduce(factor) if factor > 1 else img
+
+
+def _scene_thumb(gray: Image.Image) -> np.ndarray:
+    return np.asarray(gray.resize((SCENE_THUMB_SIZE, SCENE_THUMB_SIZE), Image.BILINEAR), dtype=np.float32)
+
+
+def sample_frames(img_bytes: bytes, first_gray: Image.Image) -> Tuple[int, List[dict]]:
+    """(frame count, [{"index", "phash"}] for later frames that start a new scene)"""
+    frames = Image.open(io.BytesIO(img_bytes))
+    count = getattr(frames, "n_frames", 1)
+    if count <= 1:
+        return count, []
+    step = -(-(count - 1) // FRAME_SCAN_LIMIT)
+    deadline = time.monotonic() + FRAME_SCAN_SECONDS
+    last = _scene_thumb(first_gray)
+    sampled = []
+    for index in range(step, count, step):
+        if len(sampled) >= FRAME_SAMPLE_LIMIT or time.monotonic() > deadline:
+            break
+        frames.seek(index)
+        gray = frames.convert("L")
+        thumb = _scene_thumb(_box_reduced(gray))
+        if np.abs(thumb - last).mean() < SCENE_CHANGE:
+            continue
+        last = thumb
+        sampled.append({"index": index, "phash": phash(gray)})
+    return count, sampled
+
+
+def analyze_image(img_bytes: bytes, tiles: Optional[str] = None) -> dict:
+    """
+    {"hashes": {phash, dhash, ahash, colorhash} or None, "metadata": {...}, "format", "size",
+     "frame_count", "frames": [{"index", "phash"}] for later scenes of multi-frame images}
+    Hashes (of the first frame) are None when the image cannot be decoded; the reason
+    is in metadata warnings.
+    tiles="index" (a known fake) or "query" (an image being checked) adds "tiles",
+    tile_index records for crop-robust matching.
+    """
+    result = {"hashes": None, "metadata": None, "format": None, "size": None,
+              "frame_count": 1, "frames": []}
+    try:
+        img = Image.open(io.BytesIO(img_bytes))
+    except Exception as e:
+        result["metadata"] = empty_metadata()
+        result["metadata"]["warnings"].append(f"Could not analyze metadata: {str(e)}")
+        return result
+    result["format"] = img.format
+    result["size"] = list(img.size)
+    result["metadata"] = exif_analysis(img)
+    try:
+        rgb, gray = decoded(img)
+        reduced_gray = _box_reduced(gray)
+        result["hashes"] = {
+            "phash": phash(gray),
+            "dhash": dhash(gray),
+            "ahash": ahash(gray),
+            "colorhash": colorhash(rgb, reduced_gray),
+        }
+        gray = reduced_gray
+        if tiles:
+            result["tiles"] = TILE_MODES[tiles](gray)
+    except Exception as e:
+        print(f"[ImageChecker] Error computing hashes: {e}")
+        result["metadata"]["warnings"].append(f"Could not decode image: {str(e)}")
+        return result
+    try:
+        result["frame_count"], result["frames"] = sample_frames(img_bytes, gray)
+    except Exception as e:
+        result["metadata"]["warnings"].append(f"Could not decode all frames: {str(e)}")
+    return result
+
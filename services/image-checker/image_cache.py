@@ -0,0 +1,186 @@
+"""
+Bounded caches for image analysis results.
+
+Two LRU maps with a TTL and an approximate byte budget:
+- by content digest (SHA-256 of the image bytes) and tile mode -> analysis (hashes,
+  EXIF checks, tile records), so identical bytes served from different URLs or
+  uploaded again skip decoding;
+- by URL -> the digest last served there plus its ETag / Last-Modified, so a
+  repeated URL skips the download while fresh and is revalidated with a
+  conditional GET after that (a 304 reuses the cached analysis).
+
+Freshness of a URL entry is the cache TTL capped by the response's Cache-Control
+max-age; no-store responses are not remembered by URL and no-cache ones are always
+revalidated. Only analyses are cached, never match results, so changes to the
+known-fakes database show up immediately. Sizes are estimated from the JSON size
+of each value plus the buffer size of any NumPy arrays in it, which is close
+enough to bound memory without walking objects.
+"""
+
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Rough per-entry cost of the OrderedDict slot, tuple and key object
+ENTRY_OVERHEAD_BYTES = 200
+
+MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def content_digest(img_bytes: bytes) -> str:
+    return hashlib.sha256(img_bytes).hexdigest()
+
+
+def estimated_size(value: Any) -> int:
+    """JSON length of value, with NumPy arrays counted by their buffer size instead"""
+    array_bytes = 0
+
+    def default(obj):
+        nonlocal array_bytes
+        if isinstance(obj, np.ndarray):
+            array_bytes += obj.nbytes
+            return None
+        return str(obj)
+
+    return len(json.dumps(value, default=default)) + array_bytes
+
+
+class _Entry(NamedTuple):
+    stored_at: float
+    ttl: float
+    size: int
+    value: Any
+
+
+class BoundedCache:
+    """LRU map bounded by entry count and estimated bytes, with per-entry TTL"""
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str, stale_ok: bool = False) -> Optional[Tuple[Any, bool]]:
+        """(value, fresh); expired entries are dropped unless stale_ok"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        fresh = time.monotonic() - entry.stored_at <= entry.ttl
+        if not fresh and not stale_ok:
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value, fresh
+
+    def put(self, key: str, value: Any, ttl: Optional[float] = None):
+        size = len(key) + estimated_size(value) + ENTRY_OVERHEAD_BYTES
+        if self.max_entries <= 0 or size > self.max_bytes:
+            return
+        self._remove(key)
+        self._entries[key] = _Entry(time.monotonic(),
+                                    self.ttl_seconds if ttl is None else ttl, size, value)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class UrlEntry(NamedTuple):
+    digest: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+
+
+class ImageCache:
+    """Analysis cache keyed by content digest, with a URL -> digest + validators layer"""
+
+    def __init__(self, max_entries: int = 2000, max_bytes: int = 16 * 1024 * 1024,
+                 ttl_seconds: float = 3600):
+        self.ttl_seconds = ttl_seconds
+        # Two URL entries per content entry is typical (same image at several URLs)
+        self.by_content = BoundedCache(max_entries, max_bytes * 3 // 4, ttl_seconds)
+        self.by_url = BoundedCache(max_entries * 2, max_bytes // 4, ttl_seconds)
+        self.counts = {"url_hits": 0, "revalidated": 0, "content_hits": 0, "misses": 0}
+
+    @staticmethod
+    def _content_key(digest: str, tiles: Optional[str]) -> str:
+        return f"{digest}:{tiles}" if tiles else digest
+
+    def analysis(self, digest: str, tiles: Optional[str] = None) -> Optional[dict]:
+        """Cached analysis of the image with this digest, made with the given tile mode"""
+        cached = self.by_content.get(self._content_key(digest, tiles))
+        return cached[0] if cached else None
+
+    def put_analysis(self, digest: str, analysis: dict, tiles: Optional[str] = None):
+        self.by_content.put(self._content_key(digest, tiles), analysis)
+
+    def url(self, url: str) -> Optional[Tuple[UrlEntry, bool]]:
+        """(entry, fresh) for url; stale entries are kept for their validators"""
+        cached = self.by_url.get(url, stale_ok=True)
+        if cached is None:
+            return None
+        return UrlEntry(*cached[0]), cached[1]
+
+    def put_url(self, url: str, digest: str, etag: Optional[str], last_modified: Optional[str],
+                cache_control: str = ""):
+        directives = cache_control.lower()
+        if "no-store" in directives:
+            return
+        ttl = self.ttl_seconds
+        if "no-cache" in directives:
+            ttl = 0
+        else:
+            max_age = MAX_AGE.search(directives)
+            if max_age:
+                ttl = min(ttl, int(max_age.group(1)))
+        self.by_url.put(url, list(UrlEntry(digest, etag, last_modified)), ttl=ttl)
+
+    def record(self, outcome: str):
+        self.counts[outcome] += 1
+
+    def clear(self):
+        """Drop every entry and reset the counters"""
+        self.by_content.clear()
+        self.by_url.clear()
+        self.counts = dict.fromkeys(self.counts, 0)
+
+    def stats(self) -> dict:
+        lookups = sum(self.counts.values())
+        hits = lookups - self.counts["misses"]
+        return dict(
+            self.counts,
+            hit_rate=round(hits / lookups, 3) if lookups else 0.0,
+            ttl_seconds=self.ttl_seconds,
+            bytes=self.by_content.bytes + self.by_url.bytes,
+            by_content=self.by_content.stats(),
+            by_url=self.by_url.stats(),
+        )
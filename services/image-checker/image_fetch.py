@@ -0,0 +1,165 @@
+"""
+Concurrent, size-capped image downloads on one pooled keep-alive client.
+
+Bodies are streamed. A download is abandoned as soon as the declared
+Content-Length or the bytes received pass max_bytes, or the first bytes do not
+carry a known image signature, so an HTML error page or a huge video never gets
+downloaded in full. fetch_response() sends If-None-Match / If-Modified-Since
+when given validators and reports a 304 as a body of None. run_with_deadline()
+runs a batch of downloads (or whole per-URL pipelines) concurrently under one
+overall deadline and returns a per-item result or exception.
+"""
+
+import asyncio
+import time
+from typing import Awaitable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import httpx
+
+# Leading bytes of the formats Pillow can decode: (offset, signature, format)
+IMAGE_SIGNATURES = [
+    (0, b"\xff\xd8\xff", "jpeg"),
+    (0, b"\x89PNG\r\n\x1a\n", "png"),
+    (0, b"GIF87a", "gif"),
+    (0, b"GIF89a", "gif"),
+    (8, b"WEBP", "webp"),  # after b"RIFF" + 4-byte size
+    (0, b"BM", "bmp"),
+    (0, b"II*\x00", "tiff"),
+    (0, b"MM\x00*", "tiff"),
+]
+SNIFF_BYTES = 12
+
+
+class Fetched(NamedTuple):
+    body: Optional[bytes]  # None for 304 Not Modified
+    etag: Optional[str]
+    last_modified: Optional[str]
+    cache_control: str
+
+
+class ImageFetchError(Exception):
+    """The URL did not yield a usable image"""
+
+
+class ImageTooLarge(ImageFetchError):
+    pass
+
+
+class NotAnImage(ImageFetchError):
+    pass
+
+
+async def run_with_deadline(keys: List[str], coros: List[Awaitable], deadline: float
+                            ) -> List[Tuple[str, Union[object, Exception]]]:
+    """Run coros concurrently; anything unfinished after deadline seconds gets a TimeoutError"""
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    if not tasks:
+        return []
+    start = time.monotonic()
+    _, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    results = []
+    for key, task in zip(keys, tasks):
+        if task in pending:
+            results.append((key, asyncio.TimeoutError(
+                f"not finished within {time.monotonic() - start:.0f}s deadline")))
+        elif task.exception() is not None:
+            results.append((key, task.exception()))
+        else:
+            results.append((key, task.result()))
+    return results
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Image format from the first SNIFF_BYTES of a file, or None"""
+    for offset, signature, fmt in IMAGE_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            if fmt == "webp" and not head.startswith(b"RIFF"):
+                continue
+            return fmt
+    return None
+
+
+class ImageFetcher:
+    """Pooled httpx client that streams images with a byte cap and type sniffing"""
+
+    def __init__(self, headers: Dict[str, str], timeout: float, max_bytes: int,
+                 max_connections: int = 20):
+        self.max_bytes = max_bytes
+        self.client = httpx.AsyncClient(
+            headers=headers, timeout=timeout, follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections, keepalive_expiry=60),
+        )
+        self.counts = {"fetched": 0, "not_modified": 0, "bytes": 0, "too_large": 0,
+                       "not_image": 0, "failed": 0}
+
+    async def fetch(self, url: str) -> bytes:
+        """Image bytes for url; raises ImageFetchError / httpx errors"""
+        return (await self.fetch_response(url)).body
+
+    async def fetch_response(self, url: str, etag: Optional[str] = None,
+                             last_modified: Optional[str] = None) -> Fetched:
+        """Conditional fetch: body is None if the server answered 304 to the validators"""
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        try:
+            fetched = await self._fetch(url, headers)
+        except ImageTooLarge:
+            self.counts["too_large"] += 1
+            raise
+        except NotAnImage:
+            self.counts["not_image"] += 1
+            raise
+        except Exception:
+            self.counts["failed"] += 1
+            raise
+        if fetched.body is None:
+            self.counts["not_modified"] += 1
+        else:
+            self.counts["fetched"] += 1
+            self.counts["bytes"] += len(fetched.body)
+        return fetched
+
+    async def _fetch(self, url: str, headers: Dict[str, str]) -> Fetched:
+        async with self.client.stream("GET", url, headers=headers) as response:
+            validators = (response.headers.get("etag"), response.headers.get("last-modified"),
+                          response.headers.get("cache-control", ""))
+            if response.status_code == 304 and headers:
+                return Fetched(None, *validators)
+            if response.status_code != 200:
+                raise ImageFetchError(f"HTTP {response.status_code}")
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > self.max_bytes:
+                raise ImageTooLarge(f"image is {int(declared)} bytes, limit is {self.max_bytes}")
+
+            body = bytearray()
+            sniffed = False
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) > self.max_bytes:
+                    raise ImageTooLarge(f"image exceeds {self.max_bytes} bytes")
+                if not sniffed and len(body) >= SNIFF_BYTES:
+                    self._check_type(body, response)
+                    sniffed = True
+            if not sniffed:
+                self._check_type(body, response)
+            return Fetched(bytes(body), *validators)
+
+    @staticmethod
+    def _check_type(body: bytearray, response: httpx.Response):
+        if sniff_image_type(bytes(body[:SNIFF_BYTES])) is None:
+            content_type = response.headers.get("content-type", "unknown").split(";")[0]
+            raise NotAnImage(f"not an image (content-type {content_type})")
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stats(self) -> dict:
+        return dict(self.counts, max_bytes=self.max_bytes)
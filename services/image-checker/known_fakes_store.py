@@ -0,0 +1,230 @@
+"""
+Persistent known-fakes database shared by every worker process.
+
+Hashes are packed little-endian uint64 values in hashes.u64 and are read through
+a read-only memory map, so all uvicorn workers share the same page-cache pages.
+The row number of a hash is its position in that file. Metadata (id, dates,
+description, source URL) lives in SQLite, keyed by the same row, and is only
+read for matches.
+
+Tile hashes for crop-robust matching (tile_index.py) are TILE_DTYPE records in
+tiles.bin, mapped and indexed the same way. Each record carries its row, and
+fakes added by hash alone (bulk imports without an image) simply have no tiles.
+The tile index is private to each process (about 128 bytes per tile), so a store
+opened without tile_matching never maps tiles.bin nor builds it.
+
+Appends take an exclusive flock on the hash file, commit the metadata rows and
+then append the hashes, then the tiles. A hash therefore never appears without
+its metadata, nor a tile without its hash. A crash part-way through leaves rows
+whose hash was never written and torn trailing records. They are trimmed under
+the lock at the next open or append, so their row numbers are free again rather
+than making INSERT OR IGNORE drop new fakes as duplicates. Other workers notice
+the file growing on their next query and extend their mapping and index in place.
+Opening a store only maps the file and sorts the index tables, so cold start with
+a million entries takes a fraction of a second. Tile tables add about two seconds
+per 10k fakes with tiles.
+"""
+
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+from hamming_index import HammingIndex
+from tile_index import TILE_DTYPE, TileIndex
+
+HASH_DTYPE = np.dtype("<u8")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS known_fakes (
+    row INTEGER PRIMARY KEY,
+    phash TEXT NOT NULL UNIQUE,
+    fake_id TEXT NOT NULL,
+    original_date TEXT,
+    description TEXT,
+    original_url TEXT,
+    added_at REAL NOT NULL
+);
+"""
+
+
+class KnownFakesStore:
+    """Memory-mapped uint64 hashes + SQLite metadata + Hamming index"""
+
+    def __init__(self, directory: str, tile_matching: bool = False):
+        self.directory = directory
+        self.tile_matching = tile_matching
+        self.hash_path = os.path.join(directory, "hashes.u64")
+        self.db_path = os.path.join(directory, "known_fakes.sqlite3")
+        self.tile_path = os.path.join(directory, "tiles.bin")
+        self.index = HammingIndex()
+        self.tile_index = TileIndex()
+        self._hashes = np.zeros(0, dtype=HASH_DTYPE)
+        self._mapped_bytes = -1
+        self._tile_mapped_bytes = -1
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive cross-process lock on the hash file"""
+        with open(self.hash_path, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def open(self):
+        """Create or repair the store, then map it and build the index"""
+        os.makedirs(self.directory, exist_ok=True)
+        self._db().executescript(SCHEMA)
+        with self._locked() as f:
+            self._trim(f)
+        start = time.perf_counter()
+        self.refresh()
+        print(f"[ImageChecker] Known fakes: {len(self)} hashes, {len(self.tile_index)} tiles "
+              f"loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    def _trim(self, f) -> int:
+        """Drop what an interrupted append left behind; call with the lock held. Returns the row count."""
+        rows = os.fstat(f.fileno()).st_size // HASH_DTYPE.itemsize
+        f.truncate(rows * HASH_DTYPE.itemsize)  # drop a torn trailing write
+        with self._db() as conn:
+            conn.execute("DELETE FROM known_fakes WHERE row >= ?", (rows,))
+        with open(self.tile_path, "ab") as tiles:
+            tiles.truncate(os.fstat(tiles.fileno()).st_size // TILE_DTYPE.itemsize
+                           * TILE_DTYPE.itemsize)
+        return rows
+
+    def refresh(self):
+        """Pick up hashes and tiles appended since the last look (by this or another worker)"""
+        if (os.path.getsize(self.hash_path) == self._mapped_bytes
+                and (not self.tile_matching
+                     or os.path.getsize(self.tile_path) == self._tile_mapped_bytes)):
+            return
+        with self._refresh_lock:
+            size = os.path.getsize(self.hash_path)
+            if size != self._mapped_bytes:
+                hashes = _mapped(self.hash_path, HASH_DTYPE, size)
+                self.index.update(hashes)
+                self._hashes = hashes
+                self._mapped_bytes = size
+            if not self.tile_matching:
+                return
+            size = os.path.getsize(self.tile_path)
+            if size != self._tile_mapped_bytes:
+                self.tile_index.update(_mapped(self.tile_path, TILE_DTYPE, size))
+                self._tile_mapped_bytes = size
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add_many(self, entries: Iterable[Tuple[str, int, dict]]) -> Tuple[List[int], int]:
+        """
+        Append (phash hex, phash int, meta) entries, skipping phashes already stored
+        meta keys: original_date, desc, original_url, and optionally tiles (index tile
+        records from tile_index). Returns (new rows, duplicates).
+        """
+        entries = list(entries)
+        added: List[int] = []
+        duplicates = 0
+        with self._locked() as f:
+            next_row = self._trim(f)
+            conn = self._db()
+            values = []
+            tiles = []
+            with conn:
+                for phash, value, meta in entries:
+                    inserted = conn.execute(
+                        "INSERT OR IGNORE INTO known_fakes (row, phash, fake_id, original_date,"
+                        " description, original_url, added_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (next_row, phash, f"fake_{next_row + 1}", meta.get("original_date"),
+                         meta.get("desc"), meta.get("original_url"), time.time()),
+                    ).rowcount
+                    if not inserted:
+                        duplicates += 1
+                        continue
+                    added.append(next_row)
+                    values.append(value)
+                    if meta.get("tiles") is not None and len(meta["tiles"]):
+                        records = np.array(meta["tiles"], dtype=TILE_DTYPE)
+                        records["row"] = next_row
+                        tiles.append(records)
+                    next_row += 1
+            if values:
+                _append(f, np.array(values, dtype=HASH_DTYPE))
+            if tiles:
+                with open(self.tile_path, "ab") as tile_file:
+                    _append(tile_file, np.concatenate(tiles))
+        self.refresh()
+        return added, duplicates
+
+    def metadata(self, rows: List[int]) -> dict:
+        """row -> {"id", "original_date", "desc", "original_url"} for the given rows"""
+        if not rows:
+            return {}
+        placeholders = ",".join("?" * len(rows))
+        cursor = self._db().execute(
+            "SELECT row, fake_id, original_date, description, original_url FROM known_fakes"
+            f" WHERE row IN ({placeholders})", rows)
+        return {
+            row: {"id": fake_id, "original_date": date, "desc": desc, "original_url": url}
+            for row, fake_id, date, desc, url in cursor
+        }
+
+    def tile_matches(self, query_tiles: np.ndarray, limit: int = 5) -> List[Tuple[dict, dict]]:
+        """(metadata, tile match) for known fakes that share a region with the query, most votes first"""
+        if not self.tile_matching:
+            return []
+        self.refresh()
+        found = self.tile_index.match(query_tiles, limit)
+        meta = self.metadata([match["row"] for match in found])
+        return [(meta[match["row"]], match) for match in found if match["row"] in meta]
+
+    def within(self, query: int, threshold: int) -> List[Tuple[dict, int]]:
+        """(metadata, distance) for every known fake within threshold bits, nearest first"""
+        self.refresh()
+        return self._with_metadata(self.index.within(query, threshold))
+
+    def nearest(self, query: int, k: int) -> List[Tuple[dict, int]]:
+        """(metadata, distance) for the k nearest known fakes"""
+        self.refresh()
+        return self._with_metadata(self.index.nearest(query, k))
+
+    def _with_metadata(self, hits: List[Tuple[int, int]]) -> List[Tuple[dict, int]]:
+        meta = self.metadata([row for row, _ in hits])
+        return [(meta[row], distance) for row, distance in hits if row in meta]
+
+    def stats(self) -> dict:
+        return dict(self.index.stats(), directory=self.directory,
+                    mapped_bytes=max(0, self._mapped_bytes),
+                    tiles=dict(self.tile_index.stats(), enabled=self.tile_matching,
+                               mapped_bytes=max(0, self._tile_mapped_bytes)))
+
+
+def _mapped(path: str, dtype: np.dtype, size: int) -> np.ndarray:
+    """Read-only map of the whole records in a file"""
+    count = size // dtype.itemsize
+    if not count:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(count,))
+
+
+def _append(f, records: np.ndarray):
+    f.write(records.tobytes())
+    f.flush()
+    os.fsync(f.fileno())
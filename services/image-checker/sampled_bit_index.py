@@ -0,0 +1,134 @@
+"""
+Approximate radius search over 64-bit hashes by bit-sampling LSH, for the tile index.
+
+Multi-index hashing (hamming_index.py) is exact, but each of its 16-bit chunk
+probes returns about N / 65536 entries. Tile hashes are median-thresholded and
+strongly skewed, so they return many more than that. With millions of tiles and
+thousands of query windows, the candidates grow with the database.
+
+Here each of `tables` tables keys every hash on its own random subset of
+key_bits bit positions, and a query only looks up its exact key in each table.
+Two hashes d bits apart share a table's key with probability about
+(1 - d/64)^key_bits. So close pairs are found through at least one table with
+high probability, and unrelated pairs almost never are. Buckets holding more
+than max_bucket entries are skipped, like stop words: their keys are common to
+many unrelated tiles. Each query therefore verifies at most tables x max_bucket
+candidates, however large the database grows. Some close pairs are missed, which
+voting over many tiles absorbs.
+
+Tables are sorted uint32 key and entry-id arrays, 8 bytes per entry per table.
+As in HammingIndex, entries appended after the last full build go into a small
+delta index, rebuilt on each update, until it grows past rebuild_threshold.
+"""
+
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from hamming_index import HASH_BITS, popcount64
+
+# (sorted keys, entry ids in that order) per table
+Tables = List[Tuple[np.ndarray, np.ndarray]]
+
+
+def _key_lut(positions: np.ndarray) -> np.ndarray:
+    """8 x 256 table: the key bits contributed by each value of each little-endian hash byte"""
+    lut = np.zeros((HASH_BITS // 8, 256), dtype=np.uint32)
+    byte_values = np.arange(256, dtype=np.uint32)
+    for key_bit, position in enumerate(positions.tolist()):
+        byte, bit = divmod(position, 8)
+        lut[byte] |= ((byte_values >> np.uint32(bit)) & np.uint32(1)) << np.uint32(key_bit)
+    return lut
+
+
+class SampledBitIndex:
+    """Approximate threshold queries over a growing uint64 array of hashes"""
+
+    def __init__(self, tables: int = 16, key_bits: int = 22, max_bucket: int = 64,
+                 rebuild_threshold: int = 65536, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.key_bits = key_bits
+        self.max_bucket = max_bucket
+        self.rebuild_threshold = rebuild_threshold
+        self._luts = [_key_lut(np.sort(rng.choice(HASH_BITS, key_bits, replace=False)))
+                      for _ in range(tables)]
+        # (values, built, main tables, delta tables), replaced whole so a query
+        # running in another thread always sees one consistent snapshot
+        self._state = (np.zeros(0, dtype=np.uint64), 0, [], [])
+
+    def __len__(self):
+        return len(self._state[0])
+
+    def _keys(self, values: np.ndarray) -> Iterator[np.ndarray]:
+        """Key of every value, one table at a time"""
+        by_byte = np.ascontiguousarray(values, dtype="<u8").view(np.uint8).reshape(-1, HASH_BITS // 8)
+        for lut in self._luts:
+            key = lut[0][by_byte[:, 0]]
+            for byte in range(1, HASH_BITS // 8):
+                key |= lut[byte][by_byte[:, byte]]
+            yield key
+
+    def _tables(self, values: np.ndarray, start: int) -> Tables:
+        tables = []
+        for key in self._keys(values[start:]):
+            order = np.argsort(key).astype(np.uint32)
+            tables.append((key[order], order + np.uint32(start)))
+        return tables
+
+    def update(self, values: np.ndarray):
+        """
+        Point the index at values, which must extend the previous array
+        New entries are indexed as a delta until there are enough to rebuild.
+        """
+        _, built, main, _ = self._state
+        if len(values) - built > self.rebuild_threshold or len(values) < built:
+            built, main = len(values), self._tables(values, 0)
+        self._state = (values, built, main, self._tables(values, built))
+
+    def within_many(self, queries: np.ndarray, threshold: int
+                    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pairs within threshold bits that share a key in some table
+        Returns parallel arrays (query position, entry, distance), unordered.
+        """
+        queries = np.asarray(queries, dtype=np.uint64)
+        values, _, main, delta = self._state
+        n = len(values)
+        empty = np.zeros(0, dtype=np.intp)
+        if not len(queries) or not n:
+            return empty, empty, empty
+
+        query_ids, entries = [], []
+        query_keys = list(self._keys(queries))
+        for tables in (main, delta):
+            for (keys, order), query_key in zip(tables, query_keys):
+                lo = np.searchsorted(keys, query_key, side="left")
+                counts = np.searchsorted(keys, query_key, side="right") - lo
+                counts[counts > self.max_bucket] = 0
+                # Expand every query's [lo, hi) range of sorted positions
+                ends = np.cumsum(counts)
+                positions = np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - counts - lo, counts)
+                entries.append(order[positions])
+                query_ids.append(np.repeat(np.arange(len(queries)), counts))
+        if not entries:
+            return empty, empty, empty
+
+        # Verify first, then drop pairs found through more than one table (far fewer survive)
+        query_ids = np.concatenate(query_ids).astype(np.int64)
+        entries = np.concatenate(entries).astype(np.int64)
+        keep = popcount64(values[entries] ^ queries[query_ids]) <= threshold
+        pairs = np.unique(query_ids[keep] * n + entries[keep])
+        query_ids, entries = pairs // n, pairs % n
+        return query_ids, entries, popcount64(values[entries] ^ queries[query_ids]).astype(np.intp)
+
+    def stats(self) -> dict:
+        values, built, main, delta = self._state
+        return {
+            "entries": len(values),
+            "indexed": built,
+            "delta": len(values) - built,
+            "tables": len(self._luts),
+            "key_bits": self.key_bits,
+            "max_bucket": self.max_bucket,
+            "table_bytes": sum(keys.nbytes + order.nbytes for keys, order in main + delta),
+        }
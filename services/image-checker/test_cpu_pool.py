@@ -0,0 +1,69 @@
+"""
+CpuPool admission and timeouts.
+
+Run from services/image-checker (needs requirements-dev.txt):
+    python -m pytest -q test_cpu_pool.py
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from cpu_pool import CpuPool, PoolSaturated, TaskTimeout
+
+
+def make_pool(**kwargs) -> CpuPool:
+    options = dict(workers=2, max_pending=8, task_timeout=1.0, max_pixels=10_000_000)
+    options.update(kwargs)
+    return CpuPool(**options)
+
+
+def test_queued_tasks_are_not_timed_out():
+    # Eight 0.6 s tasks on two workers take 2.4 s in all, well past the 1 s timeout,
+    # but no single task runs for longer than 0.6 s once it has a worker
+    async def main():
+        pool = make_pool()
+        pool.start()
+        try:
+            results = await asyncio.gather(*(pool.run(time.sleep, 0.6) for _ in range(8)),
+                                           return_exceptions=True)
+            return results, pool.stats()
+        finally:
+            pool.shutdown()
+
+    results, stats = asyncio.run(main())
+    assert results == [None] * 8
+    assert stats["timeouts"] == 0 and stats["recycled"] == 0 and stats["completed"] == 8
+
+
+def test_saturated_pool_refuses_interactive_tasks():
+    async def main():
+        pool = make_pool(max_pending=2)
+        pool.start()
+        try:
+            running = [asyncio.ensure_future(pool.run(time.sleep, 0.3)) for _ in range(2)]
+            await asyncio.sleep(0)
+            with pytest.raises(PoolSaturated):
+                await pool.run(time.sleep, 0)
+            await asyncio.gather(*running)
+        finally:
+            pool.shutdown()
+
+    asyncio.run(main())
+
+
+def test_overrunning_task_times_out_and_pool_recovers():
+    async def main():
+        pool = make_pool(task_timeout=0.5)
+        pool.start()
+        try:
+            with pytest.raises(TaskTimeout):
+                await pool.run(time.sleep, 3)
+            await pool.run(time.sleep, 0)
+            return pool.stats()
+        finally:
+            pool.shutdown()
+
+    stats = asyncio.run(main())
+    assert stats["timeouts"] == 1 and stats["recycled"] == 1 and stats["completed"] == 1
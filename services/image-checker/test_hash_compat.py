@@ -0,0 +1,78 @@
+"""
+analyze_image() hashes against imagehash, the library the known-fakes database was built with.
+
+Run from services/image-checker (needs requirements-dev.txt):
+    python -m pytest -q test_hash_compat.py
+"""
+
+import io
+
+import imagehash
+import pytest
+from PIL import Image
+
+from benchmark_matching import synthetic_photo
+from image_analysis import WORKING_SIZE, analyze_image
+
+# Draft decoding of JPEGs larger than twice WORKING_SIZE, and the reduced input to the
+# colour hash, may move a hash by a couple of bits; everything else must be exact
+APPROXIMATE_BITS = 3
+
+
+def distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def reference(data: bytes) -> dict:
+    img = Image.open(io.BytesIO(data))
+    return {
+        "phash": str(imagehash.phash(img)),
+        "dhash": str(imagehash.dhash(img)),
+        "ahash": str(imagehash.average_hash(img)),
+        "colorhash": str(imagehash.colorhash(img, binbits=3)),
+    }
+
+
+def encoded(seed: int, size, fmt: str, mode: str = "RGB", **params) -> bytes:
+    img = synthetic_photo(seed, *size)
+    if mode == "P":
+        img = img.convert("P", palette=Image.ADAPTIVE)
+    elif mode != "RGB":
+        img = img.convert(mode)
+    out = io.BytesIO()
+    img.save(out, fmt, **params)
+    return out.getvalue()
+
+
+FIXTURES = [
+    ("png_rgb", lambda seed: encoded(seed, (1200, 800), "PNG")),
+    ("png_palette", lambda seed: encoded(seed, (640, 900), "PNG", "P")),
+    ("png_rgba", lambda seed: encoded(seed, (700, 700), "PNG", "RGBA")),
+    ("png_gray", lambda seed: encoded(seed, (1000, 600), "PNG", "L")),
+    ("gif", lambda seed: encoded(seed, (500, 400), "GIF", "P")),
+    ("webp_lossless", lambda seed: encoded(seed, (900, 700), "WEBP", lossless=True)),
+    ("bmp", lambda seed: encoded(seed, (300, 300), "BMP")),
+    ("jpeg_small", lambda seed: encoded(seed, (480, 360), "JPEG", quality=85)),
+]
+LARGE_JPEG = lambda seed: encoded(seed, (2400, 1600), "JPEG", quality=85)
+
+
+@pytest.mark.parametrize("name,make", FIXTURES, ids=[name for name, _ in FIXTURES])
+@pytest.mark.parametrize("seed", range(3))
+def test_hashes_match_imagehash(name, make, seed):
+    data = make(seed)
+    expected = reference(data)
+    hashes = analyze_image(data)["hashes"]
+    for kind in ("phash", "dhash", "ahash"):
+        assert hashes[kind] == expected[kind], kind
+    assert distance(hashes["colorhash"], expected["colorhash"]) <= APPROXIMATE_BITS
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_draft_decoded_jpeg_stays_close_to_imagehash(seed):
+    data = LARGE_JPEG(seed)
+    assert min(Image.open(io.BytesIO(data)).size) >= 2 * WORKING_SIZE
+    expected = reference(data)
+    hashes = analyze_image(data)["hashes"]
+    for kind in expected:
+        assert distance(hashes[kind], expected[kind]) <= APPROXIMATE_BITS, kind
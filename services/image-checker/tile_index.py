@@ -0,0 +1,260 @@
+"""
+Tile hashes for finding known fakes that were cropped, captioned or watermarked.
+
+One global pHash changes completely when a photo is cropped or a caption covers
+part of it, but most of the photo's regions survive unchanged. Each known fake
+therefore also gets a hash for every square tile of a multi-scale grid
+(TILE_SCALES tiles across the short side, with 50% overlap). A query image is
+cut into densely overlapping sliding windows over a ladder of sizes, so that
+some window lands within a few percent of every surviving tile. Each window's
+hash is looked up in a bit-sampling index (sampled_bit_index.py). Its exact-key
+lookups verify a bounded number of candidates per window, so the cost grows with
+the number of query windows. The only part that grows with the number of known
+fakes is the binary search into each table. The multi-index Hamming index used
+for the global hashes does not work here: on skewed tile hashes its candidates
+grow with the database.
+
+Tile hashes threshold 8x8 box means at their median after subtracting the
+best-fit plane. Unlike a DCT pHash, which changes about a quarter of its bits
+when a tile shifts by 5%, they stay within a few bits under that much
+misalignment. Removing the plane keeps smooth light gradients, which most tiles
+share, from dominating the bits.
+
+A window-tile match also implies where the query sits inside the fake (scale
+and offset). Matches are binned by fake and placement, and votes count only the
+distinct tiles that agree with the fullest bin for that fake, which drops chance
+matches. The placement gives the matched region in both images. Windows that
+match many tiles (plain gradients, repeated texture) say little about which fake
+they came from, so they are ignored, as stop words are in text search.
+
+Tiles travel as TILE_DTYPE records (hash, row, rect as 16-bit fractions of the
+image width and height), which is also the on-disk layout of the known fakes'
+tile file. Tiles with little texture (sky, water, flat caption bars) hash
+unreliably, so they are skipped on both sides.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+from PIL import Image
+
+from sampled_bit_index import SampledBitIndex
+
+TILE_SCALES = (2, 3, 4)       # index tiles per short side
+QUERY_MIN_FRACTION = 0.2      # query windows, as a fraction of the short side
+QUERY_MAX_FRACTION = 0.85
+QUERY_SIZE_RATIO = 1.1        # geometric step between query window sizes
+QUERY_STRIDE = 1 / 6          # query window step, as a fraction of the window
+TILE_WORKING_SIZE = 256       # short side of the grey image tiles are cut from
+TILE_MIN_STD = 6.0            # grey-level spread below which a tile is too flat to hash
+CELLS = 8                     # 8x8 box means -> 64-bit hash
+
+TILE_DTYPE = np.dtype([("hash", "<u8"), ("row", "<u4"),
+                       ("x0", "<u2"), ("y0", "<u2"), ("x1", "<u2"), ("y1", "<u2")])
+RECT_SCALE = 65535
+RECT_FIELDS = ("x0", "y0", "x1", "y1")
+
+
+def _plane_residual() -> np.ndarray:
+    """Matrix taking flattened cells to their residual after a least-squares plane fit"""
+    ys, xs = np.mgrid[0:CELLS, 0:CELLS]
+    basis = np.column_stack([np.ones(CELLS * CELLS), xs.ravel(), ys.ravel()])
+    return np.eye(CELLS * CELLS) - basis @ np.linalg.pinv(basis)
+
+
+PLANE_RESIDUAL = _plane_residual()
+
+# Placement (log2 scale, x offset, y offset) bin size for voting, and the spread
+# around the winning bin's median placement still counted as agreeing
+PLACEMENT_BIN = np.array([0.5, 0.2, 0.2])
+PLACEMENT_TOLERANCE = np.array([0.2, 0.07, 0.07])
+
+
+def _tile_hashes(gray: np.ndarray, squares: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash of each square (x, y, side) in pixels, from box means over an integral image
+    Returns (hashes, keep) where keep marks tiles with enough texture to hash.
+    """
+    integral = np.zeros((gray.shape[0] + 1, gray.shape[1] + 1), dtype=np.float64)
+    integral[1:, 1:] = gray.cumsum(0).cumsum(1)
+    steps = np.arange(CELLS + 1) / CELLS
+    xs = np.rint(squares[:, 0:1] + squares[:, 2:3] * steps).astype(np.intp)  # N x 9 cell edges
+    ys = np.rint(squares[:, 1:2] + squares[:, 2:3] * steps).astype(np.intp)
+    corners = integral[ys[:, :, None], xs[:, None, :]]
+    sums = corners[:, 1:, 1:] - corners[:, :-1, 1:] - corners[:, 1:, :-1] + corners[:, :-1, :-1]
+    areas = np.diff(ys)[:, :, None] * np.diff(xs)[:, None, :]
+    cells = (sums / np.maximum(areas, 1)).reshape(len(squares), -1)
+    keep = cells.std(axis=1) >= TILE_MIN_STD
+    residual = cells @ PLANE_RESIDUAL.T
+    bits = residual > np.median(residual, axis=1)[:, None]
+    hashes = np.packbits(bits, axis=1).view(">u8").ravel().astype(np.uint64)
+    return hashes, keep
+
+
+def _working_gray(gray) -> np.ndarray:
+    """PIL grey image -> float array with short side TILE_WORKING_SIZE"""
+    scale = TILE_WORKING_SIZE / min(gray.size)
+    if scale < 1:
+        gray = gray.resize((max(1, round(gray.size[0] * scale)), max(1, round(gray.size[1] * scale))),
+                           Image.BICUBIC)
+    return np.asarray(gray, dtype=np.float64)
+
+
+def _positions(length: int, side: float, step: float) -> np.ndarray:
+    """Window starts from 0 to length - side every step, always including the far edge"""
+    last = length - side
+    if last <= 0:
+        return np.zeros(1)
+    return np.unique(np.append(np.arange(0, last, step), last))
+
+
+def _squares(width: int, height: int, side: float, step: float) -> np.ndarray:
+    xs = _positions(width, side, step)
+    ys = _positions(height, side, step)
+    grid = np.stack(np.meshgrid(xs, ys), -1).reshape(-1, 2)
+    return np.column_stack([grid, np.full(len(grid), side)])
+
+
+def _as_fractions(squares: np.ndarray, width: int, height: int) -> np.ndarray:
+    x, y, side = squares[:, 0], squares[:, 1], squares[:, 2]
+    return np.column_stack([x / width, y / height, (x + side) / width, (y + side) / height])
+
+
+def _hash_squares(pixels: np.ndarray, squares: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    height, width = pixels.shape
+    hashes, keep = _tile_hashes(pixels, squares)
+    return hashes[keep], _as_fractions(squares[keep], width, height).astype(np.float32)
+
+
+def index_tiles(gray) -> np.ndarray:
+    """Tile records for a known fake: TILE_SCALES grids with 50% overlap"""
+    pixels = _working_gray(gray)
+    height, width = pixels.shape
+    short = min(width, height)
+    squares = np.concatenate([_squares(width, height, short / s, short / s / 2) for s in TILE_SCALES])
+    return pack_tiles(0, *_hash_squares(pixels, squares))
+
+
+def query_tiles(gray) -> np.ndarray:
+    """Tile records for an image being checked: sliding windows over a ladder of sizes"""
+    pixels = _working_gray(gray)
+    height, width = pixels.shape
+    short = min(width, height)
+    sizes = []
+    fraction = QUERY_MIN_FRACTION
+    while fraction <= QUERY_MAX_FRACTION * 1.001:
+        sizes.append(short * fraction)
+        fraction *= QUERY_SIZE_RATIO
+    squares = np.concatenate([_squares(width, height, side, side * QUERY_STRIDE) for side in sizes])
+    return pack_tiles(0, *_hash_squares(pixels, squares))
+
+
+def pack_tiles(row: int, hashes: np.ndarray, rects: np.ndarray) -> np.ndarray:
+    """TILE_DTYPE records from hashes and [x0, y0, x1, y1] fraction rects"""
+    records = np.zeros(len(hashes), dtype=TILE_DTYPE)
+    records["hash"] = hashes
+    records["row"] = row
+    scaled = np.clip(np.rint(rects * RECT_SCALE), 0, RECT_SCALE).astype(np.uint16)
+    for i, field in enumerate(RECT_FIELDS):
+        records[field] = scaled[:, i]
+    return records
+
+
+def tile_rects(records: np.ndarray) -> np.ndarray:
+    """[x0, y0, x1, y1] fractions of TILE_DTYPE records"""
+    return np.column_stack([records[f] for f in RECT_FIELDS]) / RECT_SCALE
+
+
+class TileIndex:
+    """Tile hashes of every known fake, with placement-consistent voting"""
+
+    def __init__(self, threshold: int = 7, min_votes: int = 9, max_window_matches: int = 50,
+                 rebuild_threshold: int = 65536):
+        self.threshold = threshold
+        self.min_votes = min_votes
+        self.max_window_matches = max_window_matches
+        self.index = SampledBitIndex(rebuild_threshold=rebuild_threshold)
+        self._records = np.zeros(0, dtype=TILE_DTYPE)
+        self._tiles_per_row = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._records)
+
+    def update(self, records: np.ndarray):
+        """Point at the (grown) tile records array"""
+        self._records = records
+        self.index.update(records["hash"])
+        self._tiles_per_row = np.bincount(records["row"]) if len(records) else np.zeros(0, np.int64)
+
+    def match(self, query: np.ndarray, limit: int = 5) -> List[dict]:
+        """
+        Known fakes sharing placement-consistent tiles with the query tile records,
+        most votes first. Each result: row, votes, score (share of the fake's tiles
+        found), query_region and original_region as [x0, y0, x1, y1] fractions.
+        """
+        if not len(query) or not len(self._records):
+            return []
+        query_ids, entries, _ = self.index.within_many(query["hash"], self.threshold)
+        common = np.bincount(query_ids, minlength=len(query)) > self.max_window_matches
+        keep = ~common[query_ids]
+        query_ids, entries = query_ids[keep], entries[keep]
+        if len(entries) < self.min_votes:
+            return []
+        tiles = self._records[entries]
+        rows = tiles["row"].astype(np.int64)
+        originals = tile_rects(tiles)
+        queries = tile_rects(query[query_ids])
+
+        # Placement of the query in the fake implied by each match: scale and query origin
+        scale_x = (originals[:, 2] - originals[:, 0]) / (queries[:, 2] - queries[:, 0])
+        scale_y = (originals[:, 3] - originals[:, 1]) / (queries[:, 3] - queries[:, 1])
+        placements = np.column_stack([
+            np.log2(scale_x),
+            originals[:, 0] - queries[:, 0] * scale_x,
+            originals[:, 1] - queries[:, 1] * scale_y,
+        ])
+
+        # Fullest placement bin per fake, counting each of its tiles once
+        bins = np.floor(placements / PLACEMENT_BIN).astype(np.int64)
+        _, first, cell = np.unique(np.column_stack([rows, bins]), axis=0,
+                                   return_index=True, return_inverse=True)
+        cell = cell.ravel()
+        cell_votes = np.bincount(np.unique(np.column_stack([cell, entries]), axis=0)[:, 0])
+        # A cluster can straddle bin edges, so bins with half the votes still seed a refinement
+        candidates = np.flatnonzero(cell_votes >= max(1, self.min_votes // 2))
+        candidates = candidates[np.argsort(-cell_votes[candidates], kind="stable")]
+        _, fullest = np.unique(rows[first[candidates]], return_index=True)
+
+        results = []
+        for c in candidates[fullest].tolist():
+            # Inliers: this fake's matches close to the median placement of the winning bin,
+            # re-centred once on the inliers themselves
+            row = int(rows[first[c]])
+            mine = rows == row
+            inliers = cell == c
+            for _ in range(2):
+                centre = np.median(placements[inliers], axis=0)
+                inliers = mine & np.all(np.abs(placements - centre) <= PLACEMENT_TOLERANCE, axis=1)
+                if not inliers.any():
+                    break
+            votes = len(np.unique(entries[inliers]))
+            if votes < self.min_votes:
+                continue
+            results.append({
+                "row": row,
+                "votes": votes,
+                "score": round(votes / max(1, int(self._tiles_per_row[row])), 3),
+                "query_region": _bbox(queries[inliers]),
+                "original_region": _bbox(originals[inliers]),
+            })
+        results.sort(key=lambda r: (-r["votes"], r["row"]))
+        return results[:limit]
+
+    def stats(self) -> dict:
+        return dict(self.index.stats(), threshold=self.threshold, min_votes=self.min_votes,
+                    max_window_matches=self.max_window_matches)
+
+
+def _bbox(rects: np.ndarray) -> List[float]:
+    return [round(float(v), 3) for v in (rects[:, 0].min(), rects[:, 1].min(),
+                                         rects[:, 2].max(), rects[:, 3].max())]
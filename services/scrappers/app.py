@@ -1,14 +1,70 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, HTTPException, Query
 from pydantic import BaseModel
-import requests
-from bs4 import BeautifulSoup
-from dateutil import parser as dateparser
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional
+import asyncio
+import functools
+import os
+import time
 import urllib.parse
-from datetime import datetime
+from datetime import datetime, timedelta
 import re
 
+from article_archive import ArticleArchive
+from article_index import ArticleIndex
+from http_pool import PooledFetcher
+from parsers import rss_parser, section_parser
+from query_cache import QueryCache, normalize_query
+from source_scheduler import QUEUE_BUDGET, SourceScheduler, SourceUnavailable
+
 app = FastAPI(title="Mumbai News Scrapers")
 
+# /search returns whatever has arrived by this deadline (backend verifyClaim gives up at 10 s)
+SEARCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_DEADLINE_SECONDS", "8"))
+SOURCE_TIMEOUT_SECONDS = float(os.getenv("SOURCE_TIMEOUT_SECONDS", "7"))
+
+# Per-host politeness rate, p95-derived timeouts (capped at SOURCE_TIMEOUT_SECONDS) and
+# circuit breakers, so a dead or throttling site is skipped instead of waited on
+SCHEDULER = SourceScheduler(
+    max_timeout=SOURCE_TIMEOUT_SECONDS,
+    min_timeout=float(os.getenv("MIN_SOURCE_TIMEOUT_SECONDS", "1")),
+    rate_per_second=float(os.getenv("HOST_RATE_PER_SECOND", "2")),
+    burst=float(os.getenv("HOST_BURST", "10")),
+    failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3")),
+    cooldown_seconds=float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30")),
+    batch_reserve=float(os.getenv("HOST_BATCH_RESERVE", "5")),
+)
+
+# Section pages and the broad Mumbai feed are polled in the background into ARTICLE_INDEX
+FEED_POLLING = os.getenv("FEED_POLLING", "on").lower() in ("on", "true", "1")
+FEED_POLL_INTERVAL_SECONDS = float(os.getenv("FEED_POLL_INTERVAL_SECONDS", "300"))
+ARTICLE_INDEX = ArticleIndex(
+    max_articles=int(os.getenv("INDEX_MAX_ARTICLES", "5000")),
+    half_life_hours=float(os.getenv("RECENCY_HALF_LIFE_HOURS", "48")),
+)
+
+# /search/batch: queries per request, concurrent query-dependent fetches, overall deadline
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "100"))
+SEARCH_BATCH_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "4"))
+SEARCH_BATCH_DEADLINE_SECONDS = float(os.getenv("SEARCH_BATCH_DEADLINE_SECONDS", "30"))
+
+# Every parsed article is also kept on disk (FTS5), for date-range searches and restarts
+ARCHIVE_PATH = os.getenv("ARCHIVE_PATH", "data/articles.sqlite3")
+ARCHIVE = ArticleArchive(
+    ARCHIVE_PATH,
+    batch_size=int(os.getenv("ARCHIVE_BATCH_SIZE", "200")),
+    flush_seconds=float(os.getenv("ARCHIVE_FLUSH_SECONDS", "1")),
+)
+
+# Viral claims hit /search with near-identical text many times a minute
+SEARCH_CACHE = QueryCache(
+    max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "1000")),
+    ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "60")),
+)
+
+TOI_MUMBAI_URL = "https://timesofindia.indiatimes.com/city/mumbai"
+HT_MUMBAI_URL = "https://www.hindustantimes.com/cities/mumbai-news"
+GOOGLE_NEWS_MUMBAI_RSS = "https://news.google.com/rss/search?q=mumbai&hl=en-IN&gl=IN&ceid=IN:en"
+
 class Result(BaseModel):
     source: str
     url: str
@@ -20,137 +76,400 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 }
 
-def fetch_google_news(query: str, max_results: int = 10):
+class NewsSource(NamedTuple):
+    name: str
+    fetch: Callable[[str, int], Awaitable[List[dict]]]
+    max_results: int
+    host: str
+    # Query-independent sources: fetch(query, n) == select(await fetch_page(), query, n),
+    # so /search/batch downloads the page once for all of its queries
+    fetch_page: Optional[Callable[[], Awaitable[List[dict]]]] = None
+    select: Optional[Callable[[List[dict], str, int], List[dict]]] = None
+
+# Registered news sources, fetched concurrently by /search
+SOURCES: Dict[str, NewsSource] = {}
+
+def register_source(name: str, max_results: int, url: str):
+    """Decorator adding an async fetcher(query, max_results) for url's host to SOURCES"""
+    def decorator(fetch):
+        SOURCES[name] = NewsSource(name, fetch, max_results, urllib.parse.urlsplit(url).netloc)
+        return fetch
+    return decorator
+
+def register_page_source(name: str, max_results: int, url: str, parse: Callable[[bytes], List[dict]]):
+    """Decorator adding a section page source; decorates select(articles, query, max_results)"""
+    def decorator(select):
+        async def fetch_page() -> List[dict]:
+            return await FETCHER.get_parsed(url, parse)
+
+        async def fetch(query: str, max_results: int) -> List[dict]:
+            return select(await fetch_page(), query, max_results)
+
+        SOURCES[name] = NewsSource(
+            name, fetch, max_results, urllib.parse.urlsplit(url).netloc, fetch_page, select
+        )
+        return select
+    return decorator
+
+# Keep-alive client per upstream host, shared by the live fetchers and the feed pollers
+FETCHER = PooledFetcher(headers=HEADERS, timeout=SOURCE_TIMEOUT_SECONDS, scheduler=SCHEDULER)
+
+# Parser backend per source (PARSER_<SOURCE>=bs4|lxml); chosen once so FETCHER cache keys stay stable
+parse_google_news_rss = rss_parser("google_news")
+parse_times_of_india_articles = section_parser("times_of_india")
+parse_hindustan_times_articles = section_parser("hindustan_times")
+
+@functools.lru_cache(maxsize=None)
+def google_news_parser(max_results: int) -> Callable[[bytes], List[dict]]:
+    """RSS parse that stops after max_results items, one callable per limit"""
+    return functools.partial(parse_google_news_rss, max_results=max_results)
+
+def filter_times_of_india(articles: List[dict], query: str) -> List[dict]:
+    """Keep TOI headlines relevant to the query or to Mumbai commuting/weather"""
+    return [
+        r for r in articles
+        if query.lower() in r['title'].lower() or any(kw in r['title'].lower() for kw in ['mumbai', 'local', 'train', 'traffic', 'rain', 'flood'])
+    ]
+
+def filter_hindustan_times(articles: List[dict], query: str) -> List[dict]:
+    """Keep HT headlines relevant to the query or mentioning Mumbai"""
+    return [
+        r for r in articles
+        if query.lower() in r['title'].lower() or 'mumbai' in r['title'].lower()
+    ]
+
+@register_source("google_news", max_results=10, url=GOOGLE_NEWS_MUMBAI_RSS)
+async def fetch_google_news(query: str, max_results: int = 10):
     """Fetch news from Google News RSS feed"""
-    results = []
+    encoded_query = urllib.parse.quote(f"mumbai {query}")
+    rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
+    return await FETCHER.get_parsed(rss_url, google_news_parser(max_results))
+
+# The section pages are query-independent, so their parse is shared with the feed pollers
+@register_page_source("times_of_india", max_results=5, url=TOI_MUMBAI_URL,
+                      parse=parse_times_of_india_articles)
+def select_times_of_india(articles: List[dict], query: str, max_results: int = 5):
+    """Mumbai news from Times of India"""
+    return filter_times_of_india(articles[:max_results], query)
+
+@register_page_source("hindustan_times", max_results=5, url=HT_MUMBAI_URL,
+                      parse=parse_hindustan_times_articles)
+def select_hindustan_times(articles: List[dict], query: str, max_results: int = 5):
+    """Mumbai news from Hindustan Times"""
+    return filter_hindustan_times(articles[:max_results], query)
+
+class NewsFeed(NamedTuple):
+    name: str
+    url: str
+    parse: Callable[[bytes], List[dict]]
+
+# Query-independent pages polled in the background into ARTICLE_INDEX
+FEEDS: Dict[str, NewsFeed] = {}
+FEED_STATUS: Dict[str, dict] = {}
+
+def register_feed(name: str, url: str, parse: Callable[[bytes], List[dict]]):
+    FEEDS[name] = NewsFeed(name, url, parse)
+    FEED_STATUS[name] = {"status": "pending", "last_polled": None, "articles_added": 0}
+
+register_feed("google_news_mumbai", GOOGLE_NEWS_MUMBAI_RSS, parse_google_news_rss)
+register_feed("times_of_india", TOI_MUMBAI_URL, parse_times_of_india_articles)
+register_feed("hindustan_times", HT_MUMBAI_URL, parse_hindustan_times_articles)
+
+async def poll_feed(feed: NewsFeed):
+    """Fetch a feed every FEED_POLL_INTERVAL_SECONDS and index any new articles"""
+    status = FEED_STATUS[feed.name]
+    while True:
+        try:
+            articles = await FETCHER.get_parsed(feed.url, feed.parse)
+            added = ingest(articles)
+            status.update({"status": "ok", "error": None})
+            status["articles_added"] += added
+            if added:
+                print(f"[Scraper] Feed {feed.name}: indexed {added} new articles")
+        except SourceUnavailable as e:
+            status.update({"status": "skipped", "error": str(e)})
+        except Exception as e:
+            print(f"[Scraper] Feed {feed.name} poll error: {e}")
+            status.update({"status": "error", "error": str(e) or type(e).__name__})
+        status["last_polled"] = datetime.now().isoformat()
+        await asyncio.sleep(FEED_POLL_INTERVAL_SECONDS)
+
+def ingest(articles: List[dict]) -> int:
+    """Add parsed articles to the in-memory index and queue them for the archive"""
+    articles = [a for a in articles if a['title']]
+    ARCHIVE.add_many(articles)
+    return ARTICLE_INDEX.add_many(articles)
+
+poller_tasks: List[asyncio.Task] = []
+
+@app.on_event("startup")
+async def open_archive():
+    if ARCHIVE_PATH and await asyncio.to_thread(ARCHIVE.start):
+        # Warm the index with what was seen before the restart
+        recent = await asyncio.to_thread(ARCHIVE.recent, ARTICLE_INDEX.max_articles)
+        print(f"[Scraper] Archive: indexed {ARTICLE_INDEX.add_many(recent)} stored articles")
+
+@app.on_event("startup")
+async def start_feed_pollers():
+    if FEED_POLLING:
+        poller_tasks.extend(asyncio.create_task(poll_feed(feed)) for feed in FEEDS.values())
+
+@app.on_event("shutdown")
+async def close_http_clients():
+    for task in poller_tasks:
+        task.cancel()
+    await FETCHER.aclose()
+    await asyncio.to_thread(ARCHIVE.close)
+
+async def run_source(source: NewsSource, query: str, status: dict,
+                     fetch: Optional[Awaitable[List[dict]]] = None) -> List[dict]:
+    """Run one source fetcher (or the given fetch for it), recording its outcome in status"""
+    start = time.perf_counter()
     try:
-        encoded_query = urllib.parse.quote(f"mumbai {query}")
-        rss_url = f"https://news.google.com/rss/search?q={encoded_query}&hl=en-IN&gl=IN&ceid=IN:en"
-        
-        response = requests.get(rss_url, headers=HEADERS, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'lxml-xml')
-            items = soup.find_all('item', limit=max_results)
-            
-            for item in items:
-                title = item.find('title').text if item.find('title') else ''
-                link = item.find('link').text if item.find('link') else ''
-                pub_date = item.find('pubDate').text if item.find('pubDate') else ''
-                source_elem = item.find('source')
-                source_name = source_elem.text if source_elem else 'Google News'
-                
-                # Parse date
-                try:
-                    parsed_date = dateparser.parse(pub_date)
-                    pub_date_iso = parsed_date.isoformat() if parsed_date else datetime.now().isoformat()
-                except:
-                    pub_date_iso = datetime.now().isoformat()
-                
-                results.append({
-                    'source': source_name,
-                    'url': link,
-                    'title': title,
-                    'snippet': title,  # Google News RSS doesn't include description
-                    'published_at': pub_date_iso
-                })
+        results = await (fetch if fetch is not None else source.fetch(query, source.max_results))
+        status.update({"status": "ok", "count": len(results)})
+        return results
+    except SourceUnavailable as e:
+        status.update({"status": "skipped", "error": str(e)})
+        raise
     except Exception as e:
-        print(f"Google News fetch error: {e}")
+        error = str(e) or type(e).__name__
+        print(f"[Scraper] {source.name} fetch error: {error}")
+        status.update({"status": "error", "error": error})
+        raise
+    finally:
+        status["elapsed_ms"] = int((time.perf_counter() - start) * 1000)
+
+async def fetch_all_sources(query: str, deadline: Optional[float] = None):
+    """
+    Fetch every registered source concurrently under one overall deadline
+    Returns the results that arrived in time plus a per-source status map
+    """
+    deadline = SEARCH_DEADLINE_SECONDS if deadline is None else deadline
+    statuses = {name: {"status": "timeout", "count": 0} for name in SOURCES}
+    tasks = {
+        asyncio.create_task(run_source(source, query, statuses[name])): name
+        for name, source in SOURCES.items()
+    }
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+        statuses[tasks[task]]["elapsed_ms"] = int(deadline * 1000)
     
-    return results
+    all_results = []
+    for task in tasks:  # registration order, so ranking ties stay stable
+        if task in done and task.exception() is None:
+            all_results.extend(task.result())
+    return all_results, statuses
 
-def fetch_times_of_india(query: str, max_results: int = 5):
-    """Fetch Mumbai news from Times of India"""
-    results = []
-    try:
-        # TOI Mumbai section
-        url = f"https://timesofindia.indiatimes.com/city/mumbai"
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            # Find article links
-            articles = soup.select('div.col_l_6 a, div.col_r_6 a, .uwU81 a')[:max_results]
-            
-            for article in articles:
-                title = article.get_text(strip=True)
-                link = article.get('href', '')
-                if not link.startswith('http'):
-                    link = f"https://timesofindia.indiatimes.com{link}"
-                
-                # Filter by query
-                if query.lower() in title.lower() or any(kw in title.lower() for kw in ['mumbai', 'local', 'train', 'traffic', 'rain', 'flood']):
-                    results.append({
-                        'source': 'Times of India',
-                        'url': link,
-                        'title': title,
-                        'snippet': title,
-                        'published_at': datetime.now().isoformat()
-                    })
-    except Exception as e:
-        print(f"TOI fetch error: {e}")
+async def run_search(q: str) -> dict:
+    """
+    Search for Mumbai news
+    Answers from the background-polled article index; only when that has nothing
+    relevant are the sources fetched live (and their articles indexed).
+    """
+    results = ARTICLE_INDEX.search(q, limit=15)
+    if results:
+        print(f"[Scraper] Query: '{q}' -> Found {len(results)} results in index")
+        return {"results": results, "mode": "index"}
+    
+    live_results, statuses = await fetch_all_sources(q)
+    ingest(live_results)
+    results = rank_live_results(q, live_results)
+    
+    print(f"[Scraper] Query: '{q}' -> Found {len(results)} results live")
     
+    return {"results": results, "mode": "live", "sources": statuses}
+
+def rank_live_results(q: str, live_results: List[dict]) -> List[dict]:
+    """Rank freshly fetched (and already indexed) articles for q"""
+    results = ARTICLE_INDEX.search(q, limit=15)
+    if not results:
+        # Nothing shares a term with the query; trust the sources' own ranking
+        seen_urls = set()
+        for r in live_results:
+            if r['url'] not in seen_urls:
+                seen_urls.add(r['url'])
+                results.append(r)
+        results = results[:15]
     return results
 
-def fetch_hindustan_times(query: str, max_results: int = 5):
-    """Fetch Mumbai news from Hindustan Times"""
-    results = []
+async def fetch_batch_sources(queries: List[str], deadline: Optional[float] = None):
+    """
+    Fetch live results for many queries under one overall deadline
+    Query-independent pages are fetched once for the whole batch; query-dependent
+    sources run once per query, at most SEARCH_BATCH_CONCURRENCY at a time.
+    Returns ({query: results}, {query: per-source statuses}, upstream requests sent).
+    """
+    deadline = SEARCH_BATCH_DEADLINE_SECONDS if deadline is None else deadline
+    semaphore = asyncio.Semaphore(SEARCH_BATCH_CONCURRENCY)
+    statuses = {q: {name: {"status": "timeout", "count": 0} for name in SOURCES} for q in queries}
+    page_statuses = {}
+    page_tasks: Dict[str, asyncio.Task] = {}
+    query_tasks: Dict[tuple, asyncio.Task] = {}
+
+    async def bounded(source: NewsSource, q: str) -> List[dict]:
+        async with semaphore:
+            return await run_source(source, q, statuses[q][source.name])
+
+    # Batches pace themselves under the per-host rate limits instead of being turned away
+    budget = QUEUE_BUDGET.set(deadline)
+    for name, source in SOURCES.items():
+        if source.fetch_page is not None:
+            page_statuses[name] = {"status": "timeout", "count": 0}
+            page_tasks[name] = asyncio.create_task(
+                run_source(source, "", page_statuses[name], source.fetch_page()))
+        else:
+            for q in queries:
+                query_tasks[(q, name)] = asyncio.create_task(bounded(source, q))
+    QUEUE_BUDGET.reset(budget)
+
+    tasks = [*page_tasks.values(), *query_tasks.values()]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+    for name, task in page_tasks.items():
+        if task in pending:
+            page_statuses[name]["elapsed_ms"] = int(deadline * 1000)
+    for (q, name), task in query_tasks.items():
+        if task in pending:
+            statuses[q][name]["elapsed_ms"] = int(deadline * 1000)
+
+    def result(task: asyncio.Task) -> Optional[List[dict]]:
+        return task.result() if task in done and task.exception() is None else None
+
+    pages = {name: result(task) for name, task in page_tasks.items()}
+    ingest([a for articles in pages.values() if articles for a in articles])
+
+    live_results = {}
+    for q in queries:
+        results = []
+        for name, source in SOURCES.items():  # registration order, as in fetch_all_sources
+            if name in page_tasks:
+                status = statuses[q][name] = dict(page_statuses[name])
+                if pages[name] is not None:
+                    selected = source.select(pages[name], q, source.max_results)
+                    status["count"] = len(selected)
+                    results.extend(selected)
+            else:
+                fetched = result(query_tasks[(q, name)]) or []
+                ingest(fetched)
+                results.extend(fetched)
+        live_results[q] = results
+    sent = sum(1 for status in [*page_statuses.values(), *(
+        statuses[q][name] for q, name in query_tasks)] if status["status"] in ("ok", "error"))
+    return live_results, statuses, sent
+
+def parse_date_param(name: str, value: Optional[str], end_of_day: bool = False) -> Optional[float]:
+    """ISO date/datetime query parameter -> epoch seconds; a bare date 'until' covers that day"""
+    if not value:
+        return None
     try:
-        url = "https://www.hindustantimes.com/cities/mumbai-news"
-        response = requests.get(url, headers=HEADERS, timeout=10)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            articles = soup.select('h3.hdg3 a, .cartHolder a')[:max_results]
-            
-            for article in articles:
-                title = article.get_text(strip=True)
-                link = article.get('href', '')
-                if not link.startswith('http'):
-                    link = f"https://www.hindustantimes.com{link}"
-                
-                if query.lower() in title.lower() or 'mumbai' in title.lower():
-                    results.append({
-                        'source': 'Hindustan Times',
-                        'url': link,
-                        'title': title,
-                        'snippet': title,
-                        'published_at': datetime.now().isoformat()
-                    })
-    except Exception as e:
-        print(f"HT fetch error: {e}")
-    
-    return results
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be an ISO date or datetime")
+    if end_of_day and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.timestamp()
+
+async def search_archive(q: str, since: Optional[str], until: Optional[str]) -> dict:
+    """Search the on-disk archive, optionally restricted to a published_at range"""
+    if not ARCHIVE.available:
+        raise HTTPException(status_code=503, detail="Article archive is not available")
+    since_ts = parse_date_param("since", since)
+    until_ts = parse_date_param("until", until, end_of_day=True)
+    results = await asyncio.to_thread(ARCHIVE.search, q, 15, since_ts, until_ts)
+    print(f"[Scraper] Query: '{q}' -> Found {len(results)} results in archive")
+    return {"results": results, "mode": "archive", "since": since, "until": until}
 
 @app.get("/search")
-async def search(q: str = Query(..., description="Search query for Mumbai news")):
-    """Search for Mumbai news across multiple sources in real-time"""
-    all_results = []
-    
-    # Fetch from multiple sources
-    all_results.extend(fetch_google_news(q, max_results=10))
-    all_results.extend(fetch_times_of_india(q, max_results=5))
-    all_results.extend(fetch_hindustan_times(q, max_results=5))
-    
-    # Remove duplicates based on URL
-    seen_urls = set()
-    unique_results = []
-    for r in all_results:
-        if r['url'] not in seen_urls:
-            seen_urls.add(r['url'])
-            unique_results.append(r)
-    
-    # Sort by relevance (simple keyword matching)
-    query_words = set(q.lower().split())
-    def relevance_score(r):
-        title_lower = r['title'].lower()
-        return sum(1 for word in query_words if word in title_lower)
-    
-    unique_results.sort(key=relevance_score, reverse=True)
-    
-    print(f"[Scraper] Query: '{q}' -> Found {len(unique_results)} results")
-    
-    return {"results": unique_results[:15]}
+async def search(
+    q: str = Query(..., description="Search query for Mumbai news"),
+    mode: Optional[str] = Query(None, description="'archive' to search every stored article"),
+    since: Optional[str] = Query(None, description="Archive: published on/after (ISO date)"),
+    until: Optional[str] = Query(None, description="Archive: published before (ISO date, inclusive day)"),
+):
+    """Search for Mumbai news, cached and coalesced per normalized query"""
+    if mode == "archive" or since or until:
+        return await search_archive(q, since, until)
+    key = normalize_query(q) or q.strip().lower()
+    response, age = await SEARCH_CACHE.get_or_compute(
+        key, lambda: run_search(q), should_cache=lambda r: bool(r["results"])
+    )
+    return dict(response, cache={"hit": age is not None, "age_seconds": age})
+
+class SearchBatchRequest(BaseModel):
+    queries: List[str]
+
+@app.post("/search/batch")
+async def search_batch(request: SearchBatchRequest):
+    """
+    Search many queries at once, sharing upstream fetches between them
+    Each query is answered from the search cache or the article index when possible;
+    the rest go live together, downloading each section page once for the batch.
+    """
+    if len(request.queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400, detail=f"At most {SEARCH_BATCH_MAX_QUERIES} queries per batch")
+
+    keys = [normalize_query(q) or q.strip().lower() for q in request.queries]
+    answers: Dict[str, tuple] = {}  # key -> (response, cache age)
+    live: Dict[str, str] = {}       # key -> first query text with that key
+    for q, key in zip(request.queries, keys):
+        if key in answers or key in live:
+            continue
+        cached = SEARCH_CACHE.peek(key)
+        if cached is not None:
+            answers[key] = cached
+            continue
+        results = ARTICLE_INDEX.search(q, limit=15)
+        if results:
+            answers[key] = ({"results": results, "mode": "index"}, None)
+            SEARCH_CACHE.put(key, answers[key][0])
+        else:
+            live[key] = q
+
+    fetches = 0
+    if live:
+        live_results, statuses, fetches = await fetch_batch_sources(list(live.values()))
+        for key, q in live.items():
+            response = {
+                "results": rank_live_results(q, live_results[q]),
+                "mode": "live",
+                "sources": statuses[q],
+            }
+            if response["results"]:
+                SEARCH_CACHE.put(key, response)
+            answers[key] = (response, None)
+
+    print(f"[Scraper] Batch: {len(request.queries)} queries, {len(live)} live, {fetches} upstream fetches")
+    return {
+        "results": [
+            dict(answers[key][0], query=q,
+                 cache={"hit": answers[key][1] is not None, "age_seconds": answers[key][1]})
+            for q, key in zip(request.queries, keys)
+        ],
+        "batch": {
+            "queries": len(request.queries),
+            "unique": len(answers),
+            "live": len(live),
+            "upstream_fetches": fetches,
+        },
+    }
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy", "service": "mumbai-news-scraper"}
+    host_stats = SCHEDULER.stats()
+    return {
+        "status": "healthy",
+        "service": "mumbai-news-scraper",
+        "index": ARTICLE_INDEX.stats(),
+        "search_cache": SEARCH_CACHE.stats(),
+        "archive": ARCHIVE.stats(),
+        "http": FETCHER.stats(),
+        "sources": {
+            name: dict(host=source.host, **host_stats.get(source.host, {}))
+            for name, source in SOURCES.items()
+        },
+        "feeds": FEED_STATUS
+    }
@@ -0,0 +1,226 @@
+"""
+On-disk archive of every scraped article, searchable with SQLite FTS5.
+
+Articles are keyed by URL and keep their source, title, snippet, real
+published_at (empty when the page did not carry one) and the time they were
+first seen. Writes are queued and applied in batches by a single writer thread,
+so ingestion never blocks the event loop or readers. WAL mode lets searches run
+while a batch commits. Searches rank by FTS5 bm25 over title + snippet and can
+be restricted to a published_at range, so old stories stay findable after they
+drop off the section pages and across restarts.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+from article_index import published_timestamp, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    source TEXT NOT NULL,
+    title TEXT NOT NULL,
+    snippet TEXT NOT NULL,
+    published_at TEXT NOT NULL,
+    published_ts REAL,
+    first_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS articles_published_ts ON articles (published_ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5 (
+    title, snippet, content='articles', content_rowid='id',
+    tokenize='porter unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts (rowid, title, snippet) VALUES (new.id, new.title, new.snippet);
+END;
+"""
+
+# A URL first seen without a date (e.g. on a section page) gains one if a later parse has it
+UPSERT = """
+INSERT INTO articles (url, source, title, snippet, published_at, published_ts, first_seen)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (url) DO UPDATE SET
+    published_at = excluded.published_at, published_ts = excluded.published_ts
+WHERE articles.published_ts IS NULL AND excluded.published_ts IS NOT NULL
+"""
+
+COLUMNS = "a.source, a.url, a.title, a.snippet, a.published_at, a.first_seen"
+
+
+def row_to_article(row: tuple) -> dict:
+    source, url, title, snippet, published_at, first_seen = row[:6]
+    return {
+        'source': source,
+        'url': url,
+        'title': title,
+        'snippet': snippet,
+        'published_at': published_at,
+        'first_seen': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(first_seen)),
+    }
+
+
+class ArticleArchive:
+    """SQLite FTS5 article store with a batched background writer"""
+
+    def __init__(self, path: str, batch_size: int = 200, flush_seconds: float = 1.0,
+                 max_pending: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[Optional[dict]]" = queue.Queue(maxsize=max_pending)
+        self._local = threading.local()
+        self._writer: Optional[threading.Thread] = None
+        self.available = False
+        self.error: Optional[str] = None
+        self.written = 0
+        self.dropped = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _reader(self) -> sqlite3.Connection:
+        """One read connection per thread (searches run in the default executor)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    def start(self) -> bool:
+        """Create the schema and start the writer; False if SQLite lacks FTS5 or the path is unusable"""
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self._connect()
+            conn.executescript(SCHEMA)
+            conn.close()
+        except (OSError, sqlite3.Error) as e:
+            self.error = str(e)
+            print(f"[Scraper] Article archive unavailable: {e}")
+            return False
+        self.available = True
+        self._writer = threading.Thread(target=self._write_loop, name="article-archive", daemon=True)
+        self._writer.start()
+        return True
+
+    def add_many(self, articles: List[dict]):
+        """Queue articles for the writer; never blocks (drops and counts when the queue is full)"""
+        if not self.available:
+            return
+        for article in articles:
+            if not article.get('url') or not article.get('title'):
+                continue
+            try:
+                self._queue.put_nowait(article)
+            except queue.Full:
+                self.dropped += 1
+
+    def _write_loop(self):
+        conn = self._connect()
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_seconds
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            if batch:
+                self._write(conn, batch)
+        conn.close()
+
+    def _write(self, conn: sqlite3.Connection, batch: List[dict]):
+        now = time.time()
+        rows = []
+        for article in batch:
+            published_at = article.get('published_at') or ''
+            published_ts = published_timestamp(article, None) if published_at else None
+            rows.append((
+                article['url'], article.get('source', ''), article['title'],
+                article.get('snippet') or article['title'],
+                published_at if published_ts is not None else '', published_ts, now,
+            ))
+        try:
+            with conn:
+                conn.executemany(UPSERT, rows)
+            self.written += len(rows)
+        except sqlite3.Error as e:
+            print(f"[Scraper] Article archive write error: {e}")
+
+    def search(self, query: str, limit: int = 15, since: Optional[float] = None,
+               until: Optional[float] = None) -> List[dict]:
+        """
+        Rank archived articles matching any query term by bm25
+        since/until are epoch seconds bounding published_at (inclusive/exclusive).
+        """
+        terms = sorted(set(tokenize(query)))
+        if not self.available or not terms:
+            return []
+        sql = [f"SELECT {COLUMNS}, bm25(articles_fts) AS rank FROM articles_fts "
+               "JOIN articles a ON a.id = articles_fts.rowid WHERE articles_fts MATCH ?"]
+        params: list = [" OR ".join(f'"{term}"' for term in terms)]
+        if since is not None:
+            sql.append("AND a.published_ts >= ?")
+            params.append(since)
+        if until is not None:
+            sql.append("AND a.published_ts < ?")
+            params.append(until)
+        sql.append("ORDER BY rank LIMIT ?")
+        params.append(limit)
+        rows = self._reader().execute(" ".join(sql), params).fetchall()
+        return [dict(row_to_article(row), score=round(-row[6], 4)) for row in rows]
+
+    def recent(self, limit: int) -> List[dict]:
+        """Most recently seen articles, newest last, for warming the in-memory index"""
+        if not self.available or limit <= 0:
+            return []
+        rows = self._reader().execute(
+            f"SELECT {COLUMNS} FROM articles a ORDER BY a.id DESC LIMIT ?", (limit,)
+        ).fetchall()
+        articles = [row_to_article(row) for row in reversed(rows)]
+        for article in articles:
+            del article['first_seen']
+        return articles
+
+    def close(self, timeout: float = 5.0):
+        """Flush queued articles and stop the writer"""
+        if self._writer is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            print("[Scraper] Article archive writer is backlogged, not waiting for it")
+            return
+        self._writer.join(timeout)
+        self._writer = None
+
+    def stats(self) -> dict:
+        if not self.available:
+            return {"available": False, "error": self.error}
+        try:
+            # Rows are never deleted, so the largest rowid is the row count without a table scan
+            articles = self._reader().execute("SELECT max(id) FROM articles").fetchone()[0] or 0
+        except sqlite3.Error as e:
+            articles = None
+            print(f"[Scraper] Article archive stats error: {e}")
+        return {
+            "available": True,
+            "path": self.path,
+            "articles": articles,
+            "pending_writes": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
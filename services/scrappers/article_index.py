@@ -0,0 +1,135 @@
+"""
+In-memory inverted index over scraped news articles.
+
+Articles are tokenised once when they are added. Queries are scored with BM25
+over title + snippet and damped by a recency decay, so /search can be answered
+without touching the network. The index keeps at most max_articles, evicting the
+oldest-added first, and deduplicates by URL.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+TOKEN_PATTERN = re.compile(r"\w+")
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'were', 'will',
+    'with', 'after', 'over', 'amid',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def published_timestamp(article: dict, default: float) -> float:
+    try:
+        return datetime.fromisoformat(article.get('published_at', '')).timestamp()
+    except (TypeError, ValueError):
+        return default
+
+
+class ArticleIndex:
+    """BM25 inverted index with recency decay and bounded size"""
+
+    def __init__(self, max_articles: int = 5000, half_life_hours: float = 48,
+                 recency_floor: float = 0.25, k1: float = 1.2, b: float = 0.75):
+        self.max_articles = max_articles
+        self.half_life_seconds = half_life_hours * 3600
+        self.recency_floor = recency_floor
+        self.k1 = k1
+        self.b = b
+
+        self._docs: "OrderedDict[int, dict]" = OrderedDict()  # doc id -> article
+        self._doc_terms: Dict[int, Dict[str, int]] = {}        # doc id -> term frequencies
+        self._doc_length: Dict[int, int] = {}
+        self._doc_time: Dict[int, float] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}         # term -> {doc id: tf}
+        self._url_to_doc: Dict[str, int] = {}
+        self._total_length = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, article: dict, now: Optional[float] = None) -> bool:
+        """Index an article; returns False if its URL is already indexed"""
+        url = article.get('url')
+        if not url:
+            return False
+        now = time.time() if now is None else now
+        terms: Dict[str, int] = {}
+        for token in tokenize(f"{article.get('title', '')} {article.get('snippet', '')}"):
+            terms[token] = terms.get(token, 0) + 1
+
+        with self._lock:
+            if url in self._url_to_doc:
+                return False
+            doc_id = self._next_id
+            self._next_id += 1
+            self._docs[doc_id] = article
+            self._doc_terms[doc_id] = terms
+            self._doc_length[doc_id] = sum(terms.values())
+            self._doc_time[doc_id] = published_timestamp(article, now)
+            self._url_to_doc[url] = doc_id
+            self._total_length += self._doc_length[doc_id]
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            while len(self._docs) > self.max_articles:
+                self._remove(next(iter(self._docs)))
+        return True
+
+    def add_many(self, articles: List[dict]) -> int:
+        return sum(1 for article in articles if self.add(article))
+
+    def _remove(self, doc_id: int):
+        article = self._docs.pop(doc_id)
+        self._url_to_doc.pop(article.get('url'), None)
+        self._total_length -= self._doc_length.pop(doc_id)
+        self._doc_time.pop(doc_id)
+        for term in self._doc_terms.pop(doc_id):
+            posting = self._postings[term]
+            del posting[doc_id]
+            if not posting:
+                del self._postings[term]
+
+    def search(self, query: str, limit: int = 15, now: Optional[float] = None) -> List[dict]:
+        """Rank articles matching any query term by BM25 x recency"""
+        now = time.time() if now is None else now
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not query_terms:
+                return []
+            avg_length = self._total_length / n or 1
+            scores: Dict[int, float] = {}
+            for term in query_terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_length[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+            for doc_id in scores:
+                age = max(0.0, now - self._doc_time[doc_id])
+                decay = 0.5 ** (age / self.half_life_seconds)
+                scores[doc_id] *= self.recency_floor + (1 - self.recency_floor) * decay
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [dict(self._docs[doc_id], score=round(score, 4)) for doc_id, score in ranked]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "articles": len(self._docs),
+                "max_articles": self.max_articles,
+                "terms": len(self._postings),
+            }
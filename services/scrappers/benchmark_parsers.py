@@ -0,0 +1,144 @@
+"""
+Offline benchmark for the scraper parser backends.
+
+Runs every backend in parsers.py over the recorded pages in fixtures/, checks
+that they produce the same result dicts, and reports parse latency plus the peak
+memory traced while parsing. Nothing touches the network. Results are written as
+JSON so runs can be compared across commits.
+
+Usage (from services/scrappers):
+    python benchmark_parsers.py --repeat 200 --output parser-bench.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from parsers import RSS_BACKENDS, SECTION_BACKENDS, rss_parser, section_parser
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+class Case(NamedTuple):
+    name: str
+    fixture: str
+    parsers: Dict[str, Callable[..., List[dict]]]
+    max_results: Optional[int]
+
+
+CASES = [
+    # Background poll of the broad feed parses every item
+    Case("google_news_feed", "google_news_mumbai.xml",
+         {b: rss_parser("google_news", b) for b in RSS_BACKENDS}, None),
+    # Live /search only keeps the first 10 items
+    Case("google_news_top10", "google_news_mumbai.xml",
+         {b: rss_parser("google_news", b) for b in RSS_BACKENDS}, 10),
+    Case("times_of_india", "times_of_india_mumbai.html",
+         {b: section_parser("times_of_india", b) for b in SECTION_BACKENDS}, None),
+    Case("hindustan_times", "hindustan_times_mumbai.html",
+         {b: section_parser("hindustan_times", b) for b in SECTION_BACKENDS}, None),
+]
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def time_parser(parse: Callable, content: bytes, max_results: Optional[int], repeat: int) -> Dict:
+    parse(content, max_results)  # warm up imports and compiled selectors
+    latencies = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        parse(content, max_results)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    return {
+        "mean_ms": round(statistics.fmean(latencies), 4),
+        "p50_ms": round(percentile(latencies, 50), 4),
+        "p99_ms": round(percentile(latencies, 99), 4),
+    }
+
+
+def peak_memory(parse: Callable, content: bytes, max_results: Optional[int]) -> int:
+    """Peak Python-heap bytes traced during one parse (libxml2's own C heap is not traced)"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        parse(content, max_results)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_case(case: Case, repeat: int) -> Dict:
+    with open(os.path.join(FIXTURES_DIR, case.fixture), "rb") as f:
+        content = f.read()
+
+    outputs = {name: parse(content, case.max_results) for name, parse in case.parsers.items()}
+    reference_name, reference = next(iter(outputs.items()))
+    result = {
+        "fixture": case.fixture,
+        "fixture_bytes": len(content),
+        "max_results": case.max_results,
+        "results": len(reference),
+        "equivalent": all(out == reference for out in outputs.values()),
+        "reference_backend": reference_name,
+        "backends": {},
+    }
+    for name, parse in case.parsers.items():
+        stats = time_parser(parse, content, case.max_results, repeat)
+        stats["peak_memory_kb"] = round(peak_memory(parse, content, case.max_results) / 1024, 1)
+        result["backends"][name] = stats
+    return result
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline scraper parser benchmark")
+    parser.add_argument("--repeat", type=int, default=200, help="timed parses per backend and case")
+    parser.add_argument("--output", default="parser-benchmark-results.json")
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": vars(args),
+        "cases": {case.name: bench_case(case, args.repeat) for case in CASES},
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    failed = False
+    for name, case in results["cases"].items():
+        if not case["equivalent"]:
+            failed = True
+            print(f"{name}: backends DISAGREE on the parsed results")
+        for backend, stats in case["backends"].items():
+            print(f"{name:20s} {backend:5s} p50 {stats['p50_ms']:.3f} ms  "
+                  f"mean {stats['mean_ms']:.3f} ms  peak {stats['peak_memory_kb']:.0f} KiB")
+    print(f"Results written to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Pooled, keep-alive HTTP access to news sources with conditional GETs.
+
+Each upstream host gets its own long-lived httpx.AsyncClient, so DNS, TCP and TLS
+setup are paid once per connection instead of once per fetch, and HTTP/2 is used
+when the h2 package is installed. Pages fetched with get_parsed() remember their
+ETag / Last-Modified validators together with the parsed result; a 304 answer
+returns that result without downloading or parsing the body again. Requests go
+through an optional SourceScheduler, which rate-limits each host, times out
+requests from observed latency and skips hosts whose circuit breaker is open.
+"""
+
+import asyncio
+import importlib.util
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from source_scheduler import SourceScheduler
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class _CachedPage:
+    __slots__ = ("etag", "last_modified", "parsed")
+
+    def __init__(self, etag: Optional[str], last_modified: Optional[str], parsed: Any):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.parsed = parsed
+
+
+class PooledFetcher:
+    """Per-host keep-alive clients plus a validator cache for parsed pages"""
+
+    def __init__(self, headers: Dict[str, str], timeout: float,
+                 max_connections_per_host: int = 10, max_cached_pages: int = 256,
+                 scheduler: Optional[SourceScheduler] = None):
+        self.headers = headers
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_connections_per_host,
+            keepalive_expiry=60,
+        )
+        self.max_cached_pages = max_cached_pages
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._pages: "OrderedDict[tuple, _CachedPage]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def make_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            headers=self.headers, timeout=self.timeout, limits=self.limits,
+            http2=HTTP2_AVAILABLE, follow_redirects=True,
+        )
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        host = urlsplit(url).netloc
+        client = self._clients.get(host)
+        if client is None:
+            client = self._clients[host] = self.make_client()
+            self._stats[host] = {"requests": 0, "not_modified": 0, "bytes": 0}
+        return client
+
+    async def _send(self, url: str, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+        client = self.client_for(url)
+        if self.scheduler is None:
+            return await client.get(url, headers=headers)
+        return await self.scheduler.run(
+            urlsplit(url).netloc, lambda: client.get(url, headers=headers),
+            is_failure=lambda response: response.status_code >= 500 or response.status_code == 429,
+        )
+
+    def _record(self, url: str, response: httpx.Response):
+        stats = self._stats[urlsplit(url).netloc]
+        stats["requests"] += 1
+        stats["bytes"] += len(response.content)
+        if response.status_code == 304:
+            stats["not_modified"] += 1
+
+    async def get(self, url: str) -> bytes:
+        """GET a page, raising on non-2xx so the source is reported as failed"""
+        response = await self._send(url)
+        self._record(url, response)
+        response.raise_for_status()
+        return response.content
+
+    async def get_parsed(self, url: str, parse: Callable[[bytes], Any]) -> Any:
+        """
+        Conditionally GET a page and return parse(body)
+        Parsing runs in a worker thread; on 304 the previous parse result is reused.
+        """
+        key = (url, parse)
+        cached = self._pages.get(key)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        response = await self._send(url, headers)
+        self._record(url, response)
+        if response.status_code == 304 and cached is not None:
+            self._pages.move_to_end(key)
+            return cached.parsed
+        response.raise_for_status()
+
+        parsed = await asyncio.to_thread(parse, response.content)
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self._pages[key] = _CachedPage(etag, last_modified, parsed)
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_cached_pages:
+                self._pages.popitem(last=False)
+        else:
+            self._pages.pop(key, None)
+        return parsed
+
+    async def aclose(self):
+        clients, self._clients = list(self._clients.values()), {}
+        await asyncio.gather(*(client.aclose() for client in clients), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "http2": HTTP2_AVAILABLE,
+            "cached_pages": len(self._pages),
+            "hosts": self._stats,
+        }
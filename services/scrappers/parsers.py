@@ -0,0 +1,245 @@
+"""
+Pluggable parsers for news section pages and RSS feeds.
+
+Each source has a BeautifulSoup backend (the original implementation) and a
+faster lxml one: section pages are queried with compiled XPath equivalents of
+the CSS selectors, and RSS is read with an incremental iterparse that stops as
+soon as max_results items have been seen. Every backend returns the same result
+dicts. Section pages only carry a publication time for some sources (HT's
+dateTime line); where there is none published_at is left empty rather than
+stamped with the scrape time. The backend is picked per source with PARSER_<SOURCE> (e.g.
+PARSER_TIMES_OF_INDIA=bs4); the lxml backends are the default.
+"""
+
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import partial
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from bs4 import BeautifulSoup
+from dateutil import parser as dateparser
+from lxml import etree, html
+
+Parser = Callable[..., List[dict]]
+
+
+class SectionPage(NamedTuple):
+    source: str
+    base_url: str
+    css: str
+    xpath: etree.XPath
+    # Element of class date_class inside the headline's closest date_container ancestor
+    date_container: Optional[str] = None
+    date_class: Optional[str] = None
+    date_xpath: Optional[etree.XPath] = None
+
+
+def has_class(name: str) -> str:
+    """XPath predicate equivalent to the CSS class selector .name"""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+SECTION_PAGES: Dict[str, SectionPage] = {
+    "times_of_india": SectionPage(
+        source='Times of India',
+        base_url='https://timesofindia.indiatimes.com',
+        css='div.col_l_6 a, div.col_r_6 a, .uwU81 a',
+        xpath=etree.XPath(
+            f"//div[{has_class('col_l_6')}]//a | //div[{has_class('col_r_6')}]//a"
+            f" | //*[{has_class('uwU81')}]//a"
+        ),
+    ),
+    "hindustan_times": SectionPage(
+        source='Hindustan Times',
+        base_url='https://www.hindustantimes.com',
+        css='h3.hdg3 a, .cartHolder a',
+        xpath=etree.XPath(f"//h3[{has_class('hdg3')}]//a | //*[{has_class('cartHolder')}]//a"),
+        date_container='cartHolder',
+        date_class='dateTime',
+        date_xpath=etree.XPath(
+            f"(ancestor::*[{has_class('cartHolder')}][1]//*[{has_class('dateTime')}])[1]"
+        ),
+    ),
+}
+
+# Both section sites serve UTF-8; declaring it up front skips libxml2's charset guessing
+HTML_PARSER = html.HTMLParser(encoding='utf-8')
+SKIPPED_TEXT_TAGS = {'script', 'style', 'template'}
+DATE_PREFIXES = ('published on', 'updated on')
+IST = timezone(timedelta(hours=5, minutes=30))
+TIMEZONES = {'IST': IST}
+
+
+def section_date(text: str) -> str:
+    """ISO time from a listing line like 'Published on Oct 16, 2026 11:00 PM IST', else ''"""
+    text = text.strip()
+    for prefix in DATE_PREFIXES:
+        if text.lower().startswith(prefix):
+            text = text[len(prefix):]
+    text = text.strip()
+    if not text:
+        return ''
+    try:
+        # Fast path for HT's fixed format; dateutil is ~20x slower per headline
+        return datetime.strptime(text, '%b %d, %Y %I:%M %p IST').replace(tzinfo=IST).isoformat()
+    except ValueError:
+        pass
+    try:
+        return dateparser.parse(text, tzinfos=TIMEZONES).isoformat()
+    except (ValueError, OverflowError):
+        return ''
+
+
+def section_result(page: SectionPage, title: str, link: str, date_text: str) -> dict:
+    if not link.startswith('http'):
+        link = f"{page.base_url}{link}"
+    return {
+        'source': page.source,
+        'url': link,
+        'title': title,
+        'snippet': title,
+        'published_at': section_date(date_text)
+    }
+
+
+def parse_section_bs4(page: SectionPage, content: bytes, max_results: Optional[int] = None) -> List[dict]:
+    """Parse headline links from a section page with BeautifulSoup"""
+    soup = BeautifulSoup(content, 'html.parser')
+    results = []
+    for article in soup.select(page.css)[:max_results]:
+        date_text = ''
+        if page.date_container:
+            container = article.find_parent(class_=page.date_container)
+            date_elem = container.select_one(f'.{page.date_class}') if container else None
+            date_text = date_elem.get_text(strip=True) if date_elem else ''
+        results.append(section_result(
+            page, article.get_text(strip=True), article.get('href', ''), date_text))
+    return results
+
+
+def element_text(element) -> str:
+    """Same text as bs4's get_text(strip=True): stripped strings, no script/style/comments"""
+    parts = []
+    for node in element.iter():
+        if isinstance(node.tag, str) and node.tag not in SKIPPED_TEXT_TAGS and node.text:
+            parts.append(node.text.strip())
+        if node is not element and node.tail:
+            parts.append(node.tail.strip())
+    return ''.join(parts)
+
+
+def parse_section_lxml(page: SectionPage, content: bytes, max_results: Optional[int] = None) -> List[dict]:
+    """Parse headline links from a section page with lxml and a compiled XPath"""
+    if not content.strip():
+        return []
+    root = html.document_fromstring(content, parser=HTML_PARSER)
+    results = []
+    for article in page.xpath(root)[:max_results]:
+        date_elems = page.date_xpath(article) if page.date_xpath is not None else []
+        results.append(section_result(
+            page, element_text(article), article.get('href', ''),
+            element_text(date_elems[0]) if date_elems else ''))
+    return results
+
+
+def rss_date(pub_date: str) -> str:
+    try:
+        parsed_date = parsedate_to_datetime(pub_date)
+        if parsed_date.tzinfo is not None:
+            return parsed_date.isoformat()
+    except (TypeError, ValueError, IndexError):
+        pass
+    # Not strict RFC 822 (or no zone): fall back to the lenient parser the bs4 backend uses
+    try:
+        parsed_date = dateparser.parse(pub_date)
+        return parsed_date.isoformat() if parsed_date else datetime.now().isoformat()
+    except (ValueError, OverflowError):
+        return datetime.now().isoformat()
+
+
+def rss_result(title: str, link: str, pub_date: str, source_name: str) -> dict:
+    return {
+        'source': source_name,
+        'url': link,
+        'title': title,
+        'snippet': title,  # Google News RSS doesn't include description
+        'published_at': rss_date(pub_date)
+    }
+
+
+def parse_rss_bs4(content: bytes, max_results: Optional[int] = None) -> List[dict]:
+    """Parse RSS items by building a full BeautifulSoup tree"""
+    results = []
+    soup = BeautifulSoup(content, 'lxml-xml')
+    for item in soup.find_all('item', limit=max_results):
+        title = item.find('title')
+        link = item.find('link')
+        pub_date = item.find('pubDate')
+        source_elem = item.find('source')
+        results.append(rss_result(
+            title.text if title else '',
+            link.text if link else '',
+            pub_date.text if pub_date else '',
+            source_elem.text if source_elem else 'Google News',
+        ))
+    return results
+
+
+def parse_rss_iterparse(content: bytes, max_results: Optional[int] = None) -> List[dict]:
+    """Stream RSS items with iterparse, stopping after max_results and freeing each item"""
+    results = []
+    if max_results is not None and max_results <= 0:
+        return results
+    items = etree.iterparse(
+        io.BytesIO(content), events=('end',), tag='item',
+        resolve_entities=False, no_network=True, recover=True,
+    )
+    try:
+        for _, item in items:
+            source_elem = item.find('source')
+            results.append(rss_result(
+                item.findtext('title') or '',
+                item.findtext('link') or '',
+                item.findtext('pubDate') or '',
+                (source_elem.text or '') if source_elem is not None else 'Google News',
+            ))
+            item.clear()
+            while item.getprevious() is not None:
+                del item.getparent()[0]
+            if max_results is not None and len(results) >= max_results:
+                break
+    except etree.XMLSyntaxError:
+        # Truncated or empty feed: keep whatever items parsed cleanly
+        pass
+    return results
+
+
+SECTION_BACKENDS: Dict[str, Parser] = {
+    "bs4": parse_section_bs4,
+    "lxml": parse_section_lxml,
+}
+RSS_BACKENDS: Dict[str, Parser] = {
+    "bs4": parse_rss_bs4,
+    "lxml": parse_rss_iterparse,
+}
+
+
+def backend_name(source: str, default: str = "lxml") -> str:
+    name = os.getenv(f"PARSER_{source.upper()}", default).lower()
+    if name not in SECTION_BACKENDS:
+        print(f"[Scraper] Unknown parser backend '{name}' for {source}, using {default}")
+        return default
+    return name
+
+
+def section_parser(source: str, backend: Optional[str] = None) -> Parser:
+    """parse(content, max_results=None) for a section page in SECTION_PAGES"""
+    backend = backend or backend_name(source)
+    return partial(SECTION_BACKENDS[backend], SECTION_PAGES[source])
+
+
+def rss_parser(source: str, backend: Optional[str] = None) -> Parser:
+    """parse(content, max_results=None) for an RSS feed"""
+    return RSS_BACKENDS[backend or backend_name(source)]
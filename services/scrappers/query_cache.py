@@ -0,0 +1,106 @@
+"""
+Short-lived /search result cache with request coalescing.
+
+Results are cached per normalized query with a TTL and an LRU size bound.
+Concurrent misses for the same key are coalesced (single-flight): the first
+caller runs the upstream fetch and every other caller awaits the same task.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from article_index import tokenize
+
+
+def normalize_query(query: str) -> str:
+    """Order- and case-insensitive key, so near-identical claim texts share results"""
+    return ' '.join(sorted(set(tokenize(query))))
+
+
+class QueryCache:
+    """TTL + LRU cache whose misses are computed once per key at a time"""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, key: str) -> Optional[Tuple[float, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def _store(self, key: str, value: Any):
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def peek(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, age_seconds) if key is cached and fresh, counting it as a hit"""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry[1], round(time.monotonic() - entry[0], 3)
+
+    def put(self, key: str, value: Any):
+        """Cache a value computed outside get_or_compute (e.g. by a batch)"""
+        self._store(key, value)
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]],
+                             should_cache: Callable[[Any], bool] = lambda value: True
+                             ) -> Tuple[Any, Optional[float]]:
+        """
+        Return (value, age_seconds); age is None when this call fetched it fresh
+        A cancelled caller does not cancel the shared fetch for the other waiters.
+        """
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1], round(time.monotonic() - entry[0], 3)
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+
+            def finished(t: asyncio.Task):
+                self._inflight.pop(key, None)
+                if not t.cancelled() and t.exception() is None and should_cache(t.result()):
+                    self._store(key, t.result())
+
+            task.add_done_callback(finished)
+        return await asyncio.shield(task), None
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        lookups = self.hits + self.misses + self.coalesced
+        ages = [now - stored_at for stored_at, _ in self._entries.values()]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "in_flight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            "oldest_entry_age_seconds": round(max(ages), 1) if ages else None,
+        }
@@ -0,0 +1,297 @@
+"""
+Per-host fetch scheduling: politeness rate limits, adaptive timeouts and
+circuit breakers.
+
+Every upstream host gets a token bucket (requests per second with a burst), a
+window of recent latencies whose p95 sets the next request's timeout, and a
+circuit breaker. After failure_threshold consecutive failures, or a high error
+rate over the recent window, the breaker opens. While it is open, requests fail
+immediately instead of waiting on a dead site. Once the cool-down has passed, a
+single probe request is let through (half-open). Its outcome closes the breaker
+or reopens it with a doubled cool-down.
+
+Interactive requests reserve a token and queue briefly behind earlier ones.
+Batch requests (see QUEUE_BUDGET) instead wait until a token is free above a
+reserve kept for interactive traffic, so a long batch paces itself at the host
+rate without putting the bucket in debt that a /search would then be refused for.
+"""
+
+import asyncio
+import contextvars
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Callers that would rather wait than be turned away (e.g. a batch with its own deadline)
+# set this to how long a request may queue for a token; tasks created after inherit it.
+# Such requests only take tokens above the scheduler's interactive reserve.
+QUEUE_BUDGET: contextvars.ContextVar = contextvars.ContextVar("queue_budget", default=None)
+
+
+class SourceUnavailable(Exception):
+    """The request was not sent because the host is rate limited or its breaker is open"""
+
+
+class CircuitOpenError(SourceUnavailable):
+    pass
+
+
+class RateLimitedError(SourceUnavailable):
+    pass
+
+
+class TokenBucket:
+    """Politeness limit: rate tokens per second, holding at most burst"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """
+        Take a token, returning how long to wait before using it
+        Returns None (and takes nothing) if that wait would exceed max_wait.
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        wait = max(0.0, (1 - self.tokens) / self.rate)
+        if wait > max_wait:
+            return None
+        self.tokens -= 1  # may go negative: later callers queue behind this one
+        return wait
+
+    def take_above(self, reserve: float) -> float:
+        """
+        Take a token if that still leaves reserve tokens, returning 0.0
+        Otherwise takes nothing and returns how long until it would.
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        shortfall = min(reserve, self.burst - 1) + 1 - self.tokens
+        if shortfall <= 0:
+            self.tokens -= 1
+            return 0.0
+        return shortfall / self.rate
+
+
+class CircuitBreaker:
+    """closed -> open after repeated failures -> half_open probe after cool-down"""
+
+    def __init__(self, failure_threshold: int = 3, error_rate_threshold: float = 0.5,
+                 min_calls: int = 10, window: int = 20,
+                 cooldown_seconds: float = 30, max_cooldown_seconds: float = 600):
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = min_calls
+        self.base_cooldown = cooldown_seconds
+        self.max_cooldown = max_cooldown_seconds
+        self.cooldown = cooldown_seconds
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.trips = 0
+        self.opened_at: Optional[float] = None
+        self.outcomes: deque = deque(maxlen=window)  # True = failure
+        self._probing = False
+
+    def error_rate(self) -> float:
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def allow(self) -> bool:
+        """Whether a request may go out now; in half_open only one probe at a time"""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def release(self):
+        """Give back a half_open probe slot that was never used"""
+        self._probing = False
+
+    def record(self, failed: bool):
+        self.outcomes.append(failed)
+        probe = self.state == "half_open"
+        self._probing = False
+        if not failed:
+            self.consecutive_failures = 0
+            if probe:
+                self.state = "closed"
+                self.cooldown = self.base_cooldown
+                self.outcomes.clear()
+            return
+
+        self.consecutive_failures += 1
+        if probe:
+            self._open(min(self.max_cooldown, self.cooldown * 2))
+        elif self.state == "closed" and (
+            self.consecutive_failures >= self.failure_threshold
+            or (len(self.outcomes) >= self.min_calls
+                and self.error_rate() >= self.error_rate_threshold)
+        ):
+            self._open(self.cooldown)
+
+    def _open(self, cooldown: float):
+        self.state = "open"
+        self.cooldown = cooldown
+        self.opened_at = time.monotonic()
+        self.trips += 1
+
+    def retry_in(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "trips": self.trips,
+            "cooldown_seconds": round(self.cooldown, 1),
+            "retry_in_seconds": round(self.retry_in(), 1),
+        }
+
+
+class HostState:
+    """Rate limit, latency window and breaker for one upstream host"""
+
+    def __init__(self, scheduler: "SourceScheduler"):
+        self.bucket = TokenBucket(scheduler.rate_per_second, scheduler.burst)
+        self.breaker = CircuitBreaker(
+            failure_threshold=scheduler.failure_threshold,
+            cooldown_seconds=scheduler.cooldown_seconds,
+        )
+        self.latencies: deque = deque(maxlen=scheduler.latency_window)
+        self.counts = {"requests": 0, "failures": 0, "timeouts": 0,
+                       "rejected_open": 0, "rejected_rate": 0}
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class SourceScheduler:
+    """Runs requests per host under a token bucket, an adaptive timeout and a breaker"""
+
+    def __init__(self, max_timeout: float, min_timeout: float = 1.0,
+                 timeout_multiplier: float = 2.0, min_samples: int = 5,
+                 latency_window: int = 50, rate_per_second: float = 2.0, burst: float = 10,
+                 max_queue_seconds: float = 1.0, failure_threshold: int = 3,
+                 cooldown_seconds: float = 30, batch_reserve: Optional[float] = None):
+        self.max_timeout = max_timeout
+        self.min_timeout = min(min_timeout, max_timeout)
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.latency_window = latency_window
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_queue_seconds = max_queue_seconds
+        # Tokens per host that queued (batch) requests leave for interactive ones
+        self.batch_reserve = burst / 2 if batch_reserve is None else batch_reserve
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._hosts: Dict[str, HostState] = {}
+
+    def host(self, host: str) -> HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = HostState(self)
+        return state
+
+    def timeout_for(self, state: HostState) -> float:
+        """multiplier x observed p95, clamped; the ceiling until enough samples (and for probes)"""
+        if len(state.latencies) < self.min_samples or state.breaker.state != "closed":
+            return self.max_timeout
+        p95 = state.percentile(95)
+        return min(self.max_timeout, max(self.min_timeout, p95 * self.timeout_multiplier))
+
+    async def run(self, host: str, request: Callable[[], Awaitable[T]],
+                  is_failure: Callable[[T], bool] = lambda result: False) -> T:
+        """
+        Send one request to host, or raise SourceUnavailable without sending it
+        Exceptions, timeouts and results matching is_failure count against the breaker.
+        """
+        state = self.host(host)
+        budget = QUEUE_BUDGET.get()
+        if budget is not None and not await self._queue_for_token(state, budget):
+            state.counts["rejected_rate"] += 1
+            raise RateLimitedError(f"rate limit for {host} exceeded")
+        if not state.breaker.allow():
+            state.counts["rejected_open"] += 1
+            raise CircuitOpenError(
+                f"circuit open for {host}, retry in {state.breaker.retry_in():.0f}s")
+        wait = 0.0 if budget is not None else state.bucket.reserve(self.max_queue_seconds)
+        if wait is None:
+            state.counts["rejected_rate"] += 1
+            state.breaker.release()
+            raise RateLimitedError(f"rate limit for {host} exceeded")
+
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            timeout = self.timeout_for(state)
+            state.counts["requests"] += 1
+            start = time.monotonic()
+            result = await asyncio.wait_for(request(), timeout)
+        except asyncio.CancelledError:
+            # The caller gave up (e.g. the /search deadline); says nothing about the host
+            state.breaker.release()
+            raise
+        except asyncio.TimeoutError:
+            state.counts["timeouts"] += 1
+            # A timed-out call still says the host is at least this slow, so p95 can grow back
+            state.latencies.append(timeout)
+            self._record(state, failed=True)
+            raise
+        except Exception:
+            self._record(state, failed=True)
+            raise
+        state.latencies.append(time.monotonic() - start)
+        self._record(state, failed=is_failure(result))
+        return result
+
+    async def _queue_for_token(self, state: HostState, budget: float) -> bool:
+        """Wait up to budget seconds for a token above the interactive reserve; False if none came"""
+        deadline = time.monotonic() + budget
+        while True:
+            wait = state.bucket.take_above(self.batch_reserve)
+            if not wait:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+    def _record(self, state: HostState, failed: bool):
+        if failed:
+            state.counts["failures"] += 1
+        state.breaker.record(failed)
+
+    def stats(self) -> dict:
+        hosts = {}
+        for name, state in self._hosts.items():
+            p50, p95 = state.percentile(50), state.percentile(95)
+            hosts[name] = dict(
+                state.counts,
+                error_rate=round(state.breaker.error_rate(), 3),
+                p50_ms=round(p50 * 1000) if p50 is not None else None,
+                p95_ms=round(p95 * 1000) if p95 is not None else None,
+                timeout_seconds=round(self.timeout_for(state), 2),
+                tokens=round(max(0.0, state.bucket.tokens), 1),
+                breaker=state.breaker.stats(),
+            )
+        return hosts